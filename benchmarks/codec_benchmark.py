@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This script benchmarks the encoding and decoding of the messages of the protocols the skill speaks."""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from aea.helpers.search.models import Constraint, ConstraintType, Description, Query
+from aea.helpers.transaction.base import (
+    RawMessage,
+    RawTransaction,
+    SignedMessage,
+    SignedTransaction,
+    State,
+    Terms,
+    TransactionDigest,
+    TransactionReceipt,
+)
+from aea.protocols.base import Message
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message as SolanaMessage
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+
+from packages.fetchai.protocols.default.message import DefaultMessage
+from packages.fetchai.protocols.fipa.message import FipaMessage
+from packages.open_aea.protocols.signing.message import SigningMessage
+from packages.valory.protocols.contract_api.message import ContractApiMessage
+from packages.valory.protocols.ledger_api.message import LedgerApiMessage
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "codec_baseline.json")
+LEDGER_ID = "solana"
+CONTRACT_ID = "dassy23/spl_token_program:0.1.0"
+PROGRAM_ADDRESS = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+DIALOGUE_REFERENCE = ("a" * 64, "b" * 64)
+
+
+def struct_compatible(value: Any) -> Any:
+    """
+    Make a JSON value the protobuf structs of the codecs can hold, which rejects the lists mixing types.
+
+    The agent passes such lists in process, where nothing is encoded: the short vectors of the JSON of
+    solders are prefixed with their length in a list, e.g. `[[2], 0, 1]`, and the recipients of a
+    distribution are `[owner, amount]` pairs. The prefixes are dropped and the numbers of the pairs
+    written as strings, so that the payloads keep their size and shape.
+
+    :param value: the JSON value
+    :return: the value, without lists of mixed types
+    """
+    if isinstance(value, dict):
+        return {key: struct_compatible(item) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+    items = [struct_compatible(item) for item in value]
+    if len({type(item) for item in items}) < 2:
+        return items
+    if isinstance(items[0], list) and len(items[0]) == 1:
+        return items[1:]
+    return [item if isinstance(item, str) else str(item) for item in items]
+
+
+class CodecCase(NamedTuple):
+    """A message of a protocol to encode and decode."""
+
+    name: str
+    message: Message
+
+
+class Payloads:
+    """This class makes the payloads of the agent: signed transactions, receipts and the kwargs of its mints and distributions."""
+
+    def __init__(self, recipients: int = 64) -> None:
+        """
+        Initialize the payloads.
+
+        :param recipients: the number of recipients of a distribution batch, and of token balances of a receipt
+        """
+        self.recipients = recipients
+        self.agent = Keypair()
+        self.owners = [str(Keypair().pubkey()) for _ in range(recipients)]
+        self.mint = str(Keypair().pubkey())
+        self.signature = str(self.agent.sign_message(b"mint"))
+
+    def transaction(self, instructions: int = 1) -> Dict[str, Any]:
+        """Get the JSON of a signed transaction of some instructions, as the ledger api takes it."""
+        payer = self.agent.pubkey()
+        message = SolanaMessage(
+            [
+                transfer(TransferParams(from_pubkey=payer, to_pubkey=Keypair().pubkey(), lamports=1))
+                for _ in range(instructions)
+            ],
+            payer,
+        )
+        return struct_compatible(json.loads(Transaction([self.agent], message, Hash.default()).to_json()))
+
+    def distribution_kwargs(self) -> Dict[str, Any]:
+        """Get the kwargs of the raw transaction of a distribution batch."""
+        return struct_compatible({
+            "payer_address": str(self.agent.pubkey()),
+            "authority_address": str(self.agent.pubkey()),
+            "mint_address": self.mint,
+            "recipients": [[owner, 1000 + index] for index, owner in enumerate(self.owners)],
+            "transfer": False,
+        })
+
+    def balances(self) -> Dict[str, Any]:
+        """Get the state of the token balances of the agent."""
+        return {
+            "balances": {owner: 1000 + index for index, owner in enumerate(self.owners)},
+            "slot": 250000000,
+        }
+
+    def receipt(self) -> Dict[str, Any]:
+        """Get the receipt of a distribution batch, with the token balances of every recipient."""
+        token_balances = [
+            [
+                {
+                    "accountIndex": index + 1,
+                    "mint": self.mint,
+                    "owner": owner,
+                    "programId": PROGRAM_ADDRESS,
+                    "uiTokenAmount": {
+                        "amount": str(amount),
+                        "decimals": 0,
+                        "uiAmount": float(amount),
+                        "uiAmountString": str(amount),
+                    },
+                }
+                for index, owner in enumerate(self.owners)
+            ]
+            for amount in (0, 1000)
+        ]
+        return {
+            "slot": 250000000,
+            "blockTime": 1700000000,
+            "meta": {
+                "err": None,
+                "fee": 5000,
+                "computeUnitsConsumed": 4500 * self.recipients,
+                "preBalances": [1000000000] * (self.recipients + 1),
+                "postBalances": [999995000] + [1000000000] * self.recipients,
+                "preTokenBalances": token_balances[0],
+                "postTokenBalances": token_balances[1],
+                "innerInstructions": [],
+                "logMessages": [
+                    f"Program {PROGRAM_ADDRESS} invoke [1]",
+                    "Program log: Instruction: MintTo",
+                    f"Program {PROGRAM_ADDRESS} consumed 4500 of 200000 compute units",
+                    f"Program {PROGRAM_ADDRESS} success",
+                ] * self.recipients,
+                "rewards": [],
+                "status": {"Ok": None},
+            },
+            "transaction": self.transaction(),
+        }
+
+    def terms(self) -> Terms:
+        """Get the terms the agent signs its transactions with."""
+        address = str(self.agent.pubkey())
+        return Terms(
+            ledger_id=LEDGER_ID,
+            sender_address=address,
+            counterparty_address=address,
+            amount_by_currency_id={},
+            quantities_by_good_id={},
+            nonce="",
+        )
+
+
+def build_cases(recipients: int = 64, signing_batch_size: int = 8) -> List[CodecCase]:
+    """
+    Make a message of every performative of the protocols of the skill, and large variants of the ones carrying transactions, receipts or kwargs.
+
+    :param recipients: the number of recipients of a distribution batch
+    :param signing_batch_size: the number of transactions signed in a single request
+    :return: the cases, named `<protocol>/<performative>[/<variant>]`
+    """
+    payloads = Payloads(recipients)
+    address = str(payloads.agent.pubkey())
+    transaction = payloads.transaction()
+    distribution_transaction = payloads.transaction(min(recipients, 20))
+    signature = payloads.signature
+    terms = payloads.terms()
+    cases: List[CodecCase] = []
+
+    def add(name: str, message_class: Callable[..., Message], performative: Any, **content: Any) -> None:
+        cases.append(CodecCase(
+            f"{message_class.protocol_id.author}/{message_class.protocol_id.name}/{name}",
+            message_class(performative=performative, dialogue_reference=DIALOGUE_REFERENCE, message_id=2, target=1, **content),
+        ))
+
+    performative = DefaultMessage.Performative
+    add("bytes", DefaultMessage, performative.BYTES, content=b"\x00" * 1024)
+    add("error", DefaultMessage, performative.ERROR, error_code=DefaultMessage.ErrorCode.INVALID_MESSAGE,
+        error_msg="invalid message", error_data={"message": b"\x00" * 256})
+    add("end", DefaultMessage, performative.END)
+
+    performative = FipaMessage.Performative
+    info = {"address": address, "status": "settled", "transaction_digest": signature}
+    add("cfp", FipaMessage, performative.CFP, query=Query([Constraint("amount", ConstraintType("==", 5))]))
+    add("propose", FipaMessage, performative.PROPOSE,
+        proposal=Description({"ledger_id": LEDGER_ID, "mint": payloads.mint, "amount": 5, "price": 0}))
+    add("accept", FipaMessage, performative.ACCEPT)
+    add("accept_w_inform", FipaMessage, performative.ACCEPT_W_INFORM, info={"address": address})
+    add("decline", FipaMessage, performative.DECLINE)
+    add("match_accept", FipaMessage, performative.MATCH_ACCEPT)
+    add("match_accept_w_inform", FipaMessage, performative.MATCH_ACCEPT_W_INFORM, info={"status": "queued"})
+    add("inform", FipaMessage, performative.INFORM, info=info)
+    add("end", FipaMessage, performative.END)
+
+    performative = SigningMessage.Performative
+    add("sign_transaction", SigningMessage, performative.SIGN_TRANSACTION, terms=terms,
+        raw_transaction=RawTransaction(LEDGER_ID, transaction))
+    add("sign_transactions", SigningMessage, performative.SIGN_TRANSACTIONS, terms=terms,
+        raw_transactions=SigningMessage.RawTransactions(
+            [RawTransaction(LEDGER_ID, transaction)] * signing_batch_size))
+    add("sign_message", SigningMessage, performative.SIGN_MESSAGE, terms=terms,
+        raw_message=RawMessage(LEDGER_ID, b"\x00" * 32))
+    add("signed_transaction", SigningMessage, performative.SIGNED_TRANSACTION,
+        signed_transaction=SignedTransaction(LEDGER_ID, transaction))
+    add("signed_transactions", SigningMessage, performative.SIGNED_TRANSACTIONS,
+        signed_transactions=SigningMessage.SignedTransactions(
+            [SignedTransaction(LEDGER_ID, transaction)] * signing_batch_size))
+    add("signed_message", SigningMessage, performative.SIGNED_MESSAGE,
+        signed_message=SignedMessage(LEDGER_ID, signature))
+    add("error", SigningMessage, performative.ERROR,
+        error_code=SigningMessage.ErrorCode.UNSUCCESSFUL_TRANSACTION_SIGNING)
+
+    performative = ContractApiMessage.Performative
+    contract = dict(ledger_id=LEDGER_ID, contract_id=CONTRACT_ID)
+    mint_kwargs = {
+        "payer_address": address,
+        "destination_owner_address": address,
+        "authority_address": address,
+        "mint_address": payloads.mint,
+        "amount": 1000,
+    }
+    add("get_deploy_transaction", ContractApiMessage, performative.GET_DEPLOY_TRANSACTION, **contract,
+        callable="get_deploy_transaction", kwargs=ContractApiMessage.Kwargs({"deployer_address": address}))
+    add("get_raw_transaction", ContractApiMessage, performative.GET_RAW_TRANSACTION, **contract,
+        contract_address=PROGRAM_ADDRESS, callable="mint_to", kwargs=ContractApiMessage.Kwargs(mint_kwargs))
+    add("get_raw_transaction/distribution", ContractApiMessage, performative.GET_RAW_TRANSACTION, **contract,
+        contract_address=PROGRAM_ADDRESS, callable="distribute",
+        kwargs=ContractApiMessage.Kwargs(payloads.distribution_kwargs()))
+    add("get_raw_message", ContractApiMessage, performative.GET_RAW_MESSAGE, **contract,
+        contract_address=PROGRAM_ADDRESS, callable="get_raw_message", kwargs=ContractApiMessage.Kwargs({}))
+    add("get_state", ContractApiMessage, performative.GET_STATE, **contract,
+        contract_address=PROGRAM_ADDRESS, callable="get_balances",
+        kwargs=ContractApiMessage.Kwargs({"owner_address": address}))
+    add("state", ContractApiMessage, performative.STATE, state=State(LEDGER_ID, payloads.balances()))
+    add("raw_transaction", ContractApiMessage, performative.RAW_TRANSACTION,
+        raw_transaction=RawTransaction(LEDGER_ID, transaction))
+    add("raw_transaction/distribution", ContractApiMessage, performative.RAW_TRANSACTION,
+        raw_transaction=RawTransaction(LEDGER_ID, distribution_transaction))
+    add("raw_message", ContractApiMessage, performative.RAW_MESSAGE, raw_message=RawMessage(LEDGER_ID, b"\x00" * 32))
+    add("error", ContractApiMessage, performative.ERROR, code=500, message="Blockhash not found", data=b"")
+
+    performative = LedgerApiMessage.Performative
+    add("get_balance", LedgerApiMessage, performative.GET_BALANCE, ledger_id=LEDGER_ID, address=address)
+    add("get_raw_transaction", LedgerApiMessage, performative.GET_RAW_TRANSACTION, terms=terms)
+    add("send_signed_transaction", LedgerApiMessage, performative.SEND_SIGNED_TRANSACTION,
+        signed_transaction=SignedTransaction(LEDGER_ID, transaction))
+    add("send_signed_transaction/distribution", LedgerApiMessage, performative.SEND_SIGNED_TRANSACTION,
+        signed_transaction=SignedTransaction(LEDGER_ID, distribution_transaction))
+    add("get_transaction_receipt", LedgerApiMessage, performative.GET_TRANSACTION_RECEIPT,
+        transaction_digest=TransactionDigest(LEDGER_ID, signature), retry_timeout=2, retry_attempts=30)
+    add("balance", LedgerApiMessage, performative.BALANCE, ledger_id=LEDGER_ID, balance=1000000000)
+    add("raw_transaction", LedgerApiMessage, performative.RAW_TRANSACTION,
+        raw_transaction=RawTransaction(LEDGER_ID, transaction))
+    add("transaction_digest", LedgerApiMessage, performative.TRANSACTION_DIGEST,
+        transaction_digest=TransactionDigest(LEDGER_ID, signature))
+    add("transaction_receipt/distribution", LedgerApiMessage, performative.TRANSACTION_RECEIPT,
+        transaction_receipt=TransactionReceipt(LEDGER_ID, payloads.receipt(), distribution_transaction))
+    add("get_state", LedgerApiMessage, performative.GET_STATE, ledger_id=LEDGER_ID, callable="get_slot",
+        args=(), kwargs=LedgerApiMessage.Kwargs({}))
+    add("state", LedgerApiMessage, performative.STATE, ledger_id=LEDGER_ID,
+        state=State(LEDGER_ID, {"slot": 250000000}))
+    add("error", LedgerApiMessage, performative.ERROR, code=410, message="expired",
+        data=json.dumps({"outcome": "expired", "signature": signature, "retryable": True}).encode())
+    return cases
+
+
+def _time_per_call(function: Callable[[], Any], min_time: float, repeat: int) -> float:
+    """Get the best time of a call, in seconds, over `repeat` runs of at least `min_time` seconds each."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _allocated(function: Callable[[], Any], repeat: int) -> int:
+    """Get the least peak memory a call allocates, in bytes, over `repeat` calls."""
+    peaks = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak - start)
+    return min(peaks)
+
+
+def calibrate(min_time: float = 0.05, repeat: int = 5) -> float:
+    """
+    Time a fixed workload, a JSON round trip of a document, to scale the timings of a machine or a run to another.
+
+    :param min_time: the shortest run to time, in seconds
+    :param repeat: the number of runs, of which the best is kept
+    :return: the time of the workload in microseconds
+    """
+    document = json.dumps({str(index): [index, str(index), {"index": index}] for index in range(256)})
+    return round(_time_per_call(lambda: json.loads(json.dumps(json.loads(document))), min_time, repeat) * 1e6, 2)
+
+
+def measure(case: CodecCase, min_time: float = 0.05, repeat: int = 5) -> Dict[str, float]:
+    """
+    Measure the encoding and decoding of a message.
+
+    :param case: the case
+    :param min_time: the shortest run to time, in seconds
+    :param repeat: the number of runs and of allocation measures, of which the best is kept
+    :return: the size of the encoded message in bytes, whether it is decoded to the message, the time of an encoding and of a decoding in microseconds, and the peak memory they allocate in bytes
+    """
+    serializer = case.message.serializer
+    encoded = serializer.encode(case.message)
+    return {
+        "size": len(encoded),
+        "lossless": serializer.decode(encoded) == case.message,
+        "encode_us": round(_time_per_call(lambda: serializer.encode(case.message), min_time, repeat) * 1e6, 2),
+        "decode_us": round(_time_per_call(lambda: serializer.decode(encoded), min_time, repeat) * 1e6, 2),
+        "encode_alloc": _allocated(lambda: serializer.encode(case.message), repeat),
+        "decode_alloc": _allocated(lambda: serializer.decode(encoded), repeat),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float = 0.2, speed: float = 1.0) -> List[str]:
+    """
+    Find the cases which got slower, allocate more, or are no longer decoded losslessly, compared with the baseline.
+
+    :param results: the results, by case
+    :param baseline: the results of the baseline, by case
+    :param tolerance: the relative increase allowed over the baseline
+    :param speed: the ratio of the calibration of the results to the one of the baseline, the timings of the baseline are scaled by
+    :return: a description of every regression
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        if baseline[name]["lossless"] and not result["lossless"]:
+            regressions.append(f"{name} is no longer decoded to the message it was encoded from")
+        for metric in ("encode_us", "decode_us", "encode_alloc", "decode_alloc"):
+            before, after = baseline[name][metric], result[metric]
+            if metric.endswith("_us"):
+                before = round(before * speed, 2)
+            if after > before * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {before} -> {after}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark, and save it as the baseline or compare it with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="the baseline file")
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative increase over the baseline reported as a regression")
+    parser.add_argument("--recipients", type=int, default=64, help="recipients of a distribution batch")
+    parser.add_argument("--signing-batch-size", type=int, default=8, help="transactions signed in a single request")
+    parser.add_argument("--min-time", type=float, default=0.05, help="shortest run to time, in seconds")
+    parser.add_argument("--filter", default="", help="only run the cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    baseline: Dict[str, Any] = {"results": {}}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    calibration = calibrate(args.min_time)
+    speed = calibration / baseline["calibration_us"] if "calibration_us" in baseline else 1.0
+    print(f"Calibration: {calibration} us, the baseline timings are scaled by {speed:.2f}.")
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<64} {'bytes':>8} {'lossless':>8} {'encode us':>10} {'decode us':>10} {'enc alloc':>10} {'dec alloc':>10}")
+    for case in build_cases(args.recipients, args.signing_batch_size):
+        if args.filter not in case.name:
+            continue
+        result = results[case.name] = measure(case, args.min_time)
+        before = baseline["results"].get(case.name)
+        change = "" if before is None else " ({:+.0%} / {:+.0%})".format(
+            result["encode_us"] / (before["encode_us"] * speed) - 1, result["decode_us"] / (before["decode_us"] * speed) - 1)
+        print(
+            f"{case.name:<64} {result['size']:>8} {str(result['lossless']):>8} {result['encode_us']:>10} {result['decode_us']:>10} "
+            f"{result['encode_alloc']:>10} {result['decode_alloc']:>10}{change}"
+        )
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(
+                {
+                    "calibration_us": calibration,
+                    "python": sys.version.split()[0],
+                    "recipients": args.recipients,
+                    "signing_batch_size": args.signing_batch_size,
+                    "results": results,
+                },
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+            baseline_file.write("\n")
+        print(f"Saved the baseline to {args.baseline}.")
+        return 0
+    regressions = compare(results, baseline["results"], args.tolerance, speed)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This script benchmarks the overhead of dispatching a contract request, with and without resolving its callable ahead."""
+
+import argparse
+import time
+from typing import Any
+from unittest.mock import Mock, PropertyMock, patch
+
+from aea.common import JSONLike
+from aea.configurations.base import ContractConfig, PublicId
+from aea.contracts.base import Contract
+from aea.crypto.registries.base import Registry
+from aea.helpers.async_utils import AsyncState
+
+from packages.valory.connections.ledger.contract_dispatcher import (
+    ContractApiRequestDispatcher,
+)
+from packages.valory.protocols.contract_api import ContractApiMessage
+from packages.valory.protocols.contract_api.custom_types import Kwargs
+
+
+class BenchmarkContract(Contract):
+    """A contract package whose callable does next to nothing, to measure the dispatch overhead."""
+
+    contract_id = PublicId.from_str("valory/benchmark:0.1.0")
+
+    @classmethod
+    def get_mint_info(
+        cls, ledger_api: Any, contract_address: str, mint_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """Get the info of a mint."""
+        return {mint_address: None}
+
+
+def main() -> None:
+    """Time a 'get_state' request, made from the registry every time and resolved ahead."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=2000, help="the requests dispatched each way")
+    args = parser.parse_args()
+
+    registry: Registry = Registry()
+    registry.register(
+        str(BenchmarkContract.contract_id),
+        entry_point=f"{__name__}:{BenchmarkContract.__name__}",
+        contract_config=ContractConfig("benchmark", "valory", "0.1.0"),
+    )
+    dispatcher = ContractApiRequestDispatcher(AsyncState(), connection_id="benchmark")
+    message = ContractApiMessage(
+        performative=ContractApiMessage.Performative.GET_STATE,
+        dialogue_reference=("1", ""),
+        ledger_id="solana",
+        contract_id=str(BenchmarkContract.contract_id),
+        contract_address="program",
+        callable="get_mint_info",
+        kwargs=Kwargs({"mint_address": "mint"}),
+    )
+    dialogue = Mock()
+    with patch.object(
+        ContractApiRequestDispatcher,
+        "contract_registry",
+        new_callable=PropertyMock,
+        return_value=registry,
+    ):
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            # what every request went through before the resolution cache
+            contract = registry.make(message.contract_id)
+            data = ContractApiRequestDispatcher._call_stub(  # pylint: disable=protected-access
+                Mock, message, contract)
+            if data is None:
+                ContractApiRequestDispatcher._validate_and_call_callable(  # pylint: disable=protected-access
+                    Mock, message, contract)
+        unresolved_time = (time.perf_counter() - start) / args.runs
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            dispatcher.dispatch_request(Mock, message, dialogue, lambda data, dialogue: data)
+        resolved_time = (time.perf_counter() - start) / args.runs
+
+    print(
+        f"Contract request overhead: unresolved {unresolved_time * 1e6:.1f} us, "
+        f"resolved {resolved_time * 1e6:.1f} us, {unresolved_time / resolved_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
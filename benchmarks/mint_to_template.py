@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This script benchmarks the MintTo transactions built from a compiled template against the ones of the builder."""
+
+import argparse
+import time
+from unittest import mock
+
+from aea_ledger_solana import SolanaApi, SolanaCrypto
+
+from packages.dassy23.contracts.spl_token_program.contract import MintToTemplate, TokenProgram
+
+
+PROGRAM_ADDRESS = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+BLOCKHASH = "GfVcyD4kkTrj4bKc7WA9sZCin9JDbdT4Zkd3EittNR1W"
+
+
+def main() -> None:
+    """Time the building of a MintTo transaction, by the builder and from the template."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=500, help="the transactions built each way")
+    args = parser.parse_args()
+
+    payer = str(SolanaCrypto().public_key)
+    mint = str(SolanaCrypto().public_key)
+    owner = str(SolanaCrypto().public_key)
+    ata = TokenProgram._ata_address(PROGRAM_ADDRESS, owner, mint)  # pylint: disable=protected-access
+    ledger_api = mock.Mock()
+    ledger_api.add_nonce.side_effect = lambda tx: SolanaApi.add_nonce(
+        mock.Mock(_generate_tx_nonce=lambda: BLOCKHASH), tx)
+
+    def build(amount: int) -> None:
+        instructions = TokenProgram._mint_to_instructions(  # pylint: disable=protected-access
+            PROGRAM_ADDRESS, payer, owner, payer, mint, amount, ata, True)
+        TokenProgram._build_transaction(ledger_api, payer, instructions)  # pylint: disable=protected-access
+
+    template = MintToTemplate(PROGRAM_ADDRESS, payer, payer, mint)
+    destination = bytes(ata)
+    template.build(destination, 1, BLOCKHASH)
+
+    start = time.perf_counter()
+    for amount in range(args.runs):
+        build(amount)
+    builder_time = (time.perf_counter() - start) / args.runs
+    start = time.perf_counter()
+    for amount in range(args.runs):
+        template.build(destination, amount, BLOCKHASH)
+    template_time = (time.perf_counter() - start) / args.runs
+
+    print(
+        f"MintTo build: builder {builder_time * 1e6:.1f} us, template {template_time * 1e6:.1f} us, "
+        f"{builder_time / template_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the smoke test of the cases of the codec benchmark."""
+
+import json
+
+from codec_benchmark import BASELINE_PATH, build_cases
+
+
+def test_cases_round_trip() -> None:
+    """Test every case is encoded and decoded back to its message, but the ones the baseline records as lossy."""
+    with open(BASELINE_PATH, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    cases = build_cases(recipients=4, signing_batch_size=2)
+    assert sorted(case.name for case in cases) == sorted(baseline)
+    for case in cases:
+        serializer = case.message.serializer
+        decoded = serializer.decode(serializer.encode(case.message))
+        assert decoded.performative == case.message.performative, case.name
+        # the contract api codec reads the nested lists of kwargs back as protobuf lists
+        assert (decoded == case.message) == baseline[case.name]["lossless"], case.name
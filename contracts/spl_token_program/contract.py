@@ -19,9 +19,16 @@
 
 """This module contains the scaffold contract definition."""
 
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, cast
+import asyncio
+import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union, cast
 import logging
 import json
+import os
+import time
 
 from aea.common import JSONLike
 from aea.configurations.base import PublicId
@@ -33,22 +40,288 @@ from spl.token.core import _TokenCore
 from spl.token._layouts import ACCOUNT_LAYOUT, MINT_LAYOUT, MULTISIG_LAYOUT
 import solana.system_program as sp
 from solana.rpc import types
+from solana.rpc.commitment import Confirmed
+from solana.transaction import AccountMeta
 import spl.token.instructions as spl_token
-from solders.transaction import Transaction as sTransaction
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.hash import Hash
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.rpc.responses import SimulateTransactionResp
+from solders.signature import Signature
+from solders.transaction import Transaction as sTransaction, VersionedTransaction
+
+from packages.dassy23.contracts.spl_token_program.transactions import parse_transaction
 
 
 DEFAULT_TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
 DEFAULT_ATA_PROGRAM_ID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+NONCE_ACCOUNT_LENGTH = 80
+KEY_LENGTH = 32
+ATA_CHUNK_SIZE = 2048
+# the accounts derived in this process, below which a worker process costs more than it saves
+ATA_IN_PROCESS_SIZE = 4096
+LOOKUP_TABLE_PROGRAM_ID = "AddressLookupTab1e1111111111111111111111111"
+LOOKUP_TABLE_META_SIZE = 56
+LOOKUP_TABLE_ACTIVE = (2 ** 64 - 1).to_bytes(8, "little")
+# the addresses one transaction can add to a lookup table
+LOOKUP_TABLE_EXTEND_SIZE = 20
+LOOKUP_TABLE_CACHE_TTL = 60.0
+COMPUTE_BUDGET_PROGRAM_ID = "ComputeBudget111111111111111111111111111111"
+# the units the SetComputeUnitLimit instruction itself takes, and the most a transaction can get
+COMPUTE_BUDGET_INSTRUCTION_UNITS = 150
+MAX_COMPUTE_UNITS = 1400000
+SIMULATION_WORKERS = 8
+# the MintTo templates kept, one per payer, mint, authority and nonce account
+MINT_TO_TEMPLATE_CACHE_SIZE = 1024
+# the lookup tables kept, each for `LOOKUP_TABLE_CACHE_TTL` seconds
+LOOKUP_TABLE_CACHE_SIZE = 256
 
 
 _default_logger = logging.getLogger(
     "aea.packages.dassy23.contracts.spl_token_program.contract")
 
 
+def _derive_ata_chunk(args: Tuple[bytes, bytes, bytes]) -> bytes:
+    """
+    Derive the associated token accounts of a chunk of owners for every mint.
+
+    It is module level, so that it can be sent to the worker processes.
+
+    :param args: the token program, the owners and the mints, as packed 32-byte keys.
+    :return: the associated token accounts, owner by owner then mint by mint, as packed 32-byte keys.
+    """
+    contract_key, owner_keys, mint_keys = args
+    ata_program = Pubkey.from_string(DEFAULT_ATA_PROGRAM_ID)
+    mints = [mint_keys[i:i + KEY_LENGTH] for i in range(0, len(mint_keys), KEY_LENGTH)]
+    atas = bytearray()
+    for i in range(0, len(owner_keys), KEY_LENGTH):
+        owner = owner_keys[i:i + KEY_LENGTH]
+        for mint in mints:
+            address, _ = Pubkey.find_program_address([owner, contract_key, mint], ata_program)
+            atas += bytes(address)
+    return bytes(atas)
+
+
+class AtaAddresses:
+    """
+    The associated token accounts of a list of owners for a list of mints.
+
+    They are held as packed 32-byte keys, and converted to base58 addresses only when accessed.
+    """
+
+    def __init__(self, owner_addresses: Sequence[str], mint_addresses: Sequence[str], keys: bytes) -> None:
+        """
+        Initialize the associated token accounts.
+
+        :param owner_addresses: the owners.
+        :param mint_addresses: the mints.
+        :param keys: the associated token accounts, owner by owner then mint by mint, as packed 32-byte keys.
+        """
+        self.owner_addresses = owner_addresses
+        self.mint_addresses = mint_addresses
+        self.keys = keys
+        self._owner_indexes: Optional[Dict[str, int]] = None
+        self._mint_indexes: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        """Get the number of associated token accounts."""
+        return len(self.keys) // KEY_LENGTH
+
+    def key(self, owner_index: int, mint_index: int) -> bytes:
+        """Get the 32-byte key of the associated token account of an owner for a mint, by position."""
+        start = (owner_index * len(self.mint_addresses) + mint_index) * KEY_LENGTH
+        return self.keys[start:start + KEY_LENGTH]
+
+    def address(self, owner_index: int, mint_index: int) -> str:
+        """Get the address of the associated token account of an owner for a mint, by position."""
+        return str(Pubkey.from_bytes(self.key(owner_index, mint_index)))
+
+    def get(self, owner_address: str, mint_address: str) -> str:
+        """Get the address of the associated token account of an owner for a mint."""
+        if self._owner_indexes is None or self._mint_indexes is None:
+            self._owner_indexes = {owner: i for i, owner in enumerate(self.owner_addresses)}
+            self._mint_indexes = {mint: i for i, mint in enumerate(self.mint_addresses)}
+        return self.address(self._owner_indexes[owner_address], self._mint_indexes[mint_address])
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        """Iterate over the owner, the mint and the associated token account address of every pair."""
+        for owner_index, owner_address in enumerate(self.owner_addresses):
+            for mint_index, mint_address in enumerate(self.mint_addresses):
+                yield owner_address, mint_address, self.address(owner_index, mint_index)
+
+
+class SimulationRequest:
+    """
+    A `simulateTransaction` request, without signature verification, of a transaction of any version.
+
+    The request of solders only takes legacy transactions. Like it, this one is posted by the RPC
+    providers through its `to_json`.
+    """
+
+    def __init__(self, transaction: Union[sTransaction, VersionedTransaction]) -> None:
+        """Initialize the request."""
+        self.transaction = transaction
+
+    def to_json(self) -> str:
+        """Get the JSON-RPC body of the request."""
+        return json.dumps({
+            "jsonrpc": "2.0",
+            "id": 0,
+            "method": "simulateTransaction",
+            "params": [
+                base64.b64encode(bytes(self.transaction)).decode(),
+                {"sigVerify": False, "encoding": "base64", "commitment": "confirmed"},
+            ],
+        })
+
+
+class LRUCache:
+    """
+    A cache of the `size` most recently used entries, shared by the threads of the executor.
+
+    The contract methods are classmethods, called from any thread of the ledger connection, so
+    their caches are class level: they are bounded, not to grow with every payer or table ever
+    seen, and locked, not to be read while another thread reorders them.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initialize the cache."""
+        self.size = size
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        """Get an entry, None if it is not cached, and mark it as the most recently used."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        """Cache an entry, dropping the least recently used one if the cache is full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        """Drop an entry, if it is cached."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Get the number of entries."""
+        return len(self._entries)
+
+
+class MintToTemplate:
+    """
+    The compiled MintTo transactions of a payer, a mint and an authority, on a recent blockhash or a nonce account.
+
+    Only the destination, the amount and the blockhash change from one such transaction to the next:
+    the header, the other account keys and the program and account indexes stay the same. So the
+    transaction is compiled once by the builder, and then built by patching those in. The writable
+    accounts which do not sign are ordered by key, so the layout depends on where the destination
+    falls among them; each of the few possible layouts is compiled the first time it is needed.
+    """
+
+    def __init__(
+        self,
+        contract_address: str,
+        payer_address: str,
+        authority_address: str,
+        mint_address: str,
+        nonce_address: Optional[str] = None,
+        nonce_authority: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the template.
+
+        :param contract_address: the token program address.
+        :param payer_address: the fee payer wallet address.
+        :param authority_address: the mint authority.
+        :param mint_address: the mint.
+        :param nonce_address: the durable nonce account to build on, if any.
+        :param nonce_authority: the nonce authority, defaults to the payer.
+        """
+        self.contract_address = contract_address
+        self.payer_address = payer_address
+        self.authority_address = authority_address
+        self.mint_address = mint_address
+        self.nonce_address = nonce_address
+        self.nonce_authority = nonce_authority
+        self._writable_keys = [bytes(PublicKey(mint_address))]
+        if nonce_address is not None:
+            self._writable_keys.append(bytes(PublicKey(nonce_address)))
+        # compiled transaction, index of the destination key, index of the MintTo instruction
+        self._layouts: Dict[int, Tuple[JSONLike, int, int]] = {}
+        self._blockhash: Tuple[str, List[int]] = ("", [])
+
+    def build(self, destination: bytes, amount: int, blockhash: str) -> JSONLike:
+        """
+        Build a MintTo transaction.
+
+        :param destination: the associated token account to mint to, as a 32-byte key.
+        :param amount: the amount to mint.
+        :param blockhash: the recent blockhash, or the stored nonce of the nonce account.
+        :return: the tx, as the builder would have built it.
+        """
+        position = sum(destination > key for key in self._writable_keys)
+        layout = self._layouts.get(position)
+        if layout is None:
+            layout = self._compile(destination)
+            self._layouts[position] = layout
+        txn, destination_index, instruction_index = layout
+
+        if self._blockhash[0] != blockhash:
+            self._blockhash = (blockhash, list(bytes(Hash.from_string(blockhash))))
+        message = dict(txn["message"])
+        account_keys = list(message["accountKeys"])
+        account_keys[destination_index] = list(destination)
+        instructions = list(message["instructions"])
+        instruction = dict(instructions[instruction_index])
+        instruction["data"] = [[9], 7, *amount.to_bytes(8, "little")]
+        instructions[instruction_index] = instruction
+        message["accountKeys"] = account_keys
+        message["instructions"] = instructions
+        message["recentBlockhash"] = self._blockhash[1]
+        signatures = txn["signatures"]
+        return {"signatures": [signatures[0], *map(list, signatures[1:])], "message": message}
+
+    def _compile(self, destination: bytes) -> Tuple[JSONLike, int, int]:
+        """Compile the layout of a destination with the builder."""
+        instructions = TokenProgram._mint_to_instructions(  # pylint: disable=protected-access
+            self.contract_address, self.payer_address, self.payer_address, self.authority_address,
+            self.mint_address, 0, PublicKey(destination), True)
+        if self.nonce_address is None:
+            txn = TokenProgram._transaction(  # pylint: disable=protected-access
+                self.payer_address, instructions)
+        else:
+            txn = TokenProgram._durable_transaction(  # pylint: disable=protected-access
+                self.payer_address, instructions, self.nonce_address, self.nonce_authority,
+                SYSTEM_PROGRAM_ID)
+        message = txn["message"]
+        return txn, message["accountKeys"].index(list(destination)), len(message["instructions"]) - 1
+
+
 class TokenProgram(Contract):
     """The scaffold contract class for a smart contract."""
 
     contract_id = PublicId.from_str("dassy23/spl_token_program:0.1.0")
+    _mint_to_templates = LRUCache(MINT_TO_TEMPLATE_CACHE_SIZE)
+    _lookup_tables = LRUCache(LOOKUP_TABLE_CACHE_SIZE)
+    # the worker processes deriving associated token accounts, started once and kept
+    _ata_pool: Optional[Tuple[int, ProcessPoolExecutor]] = None
+    _ata_pool_lock = threading.Lock()
 
     @classmethod
     def get_dummy_val(
@@ -90,23 +363,51 @@ class TokenProgram(Contract):
                 DEFAULT_TOKEN_PROGRAM_ID))
             response = ledger_api.api.get_token_accounts_by_owner_json_parsed(
                 PublicKey(owner_address), opts=opts)
-            balances = [{
-                "mint": x.account.data.parsed['info']['mint'],
-                "amount": x.account.data.parsed['info']['tokenAmount']['amount'],
-                "decimals": x.account.data.parsed['info']['tokenAmount']['decimals']
-            } for x in response.value]
-            result = {
-                x['mint']:
-                    {
-                        "amount": int(x['amount']),
-                        "decimals": x['decimals']
-                }
-                for x in balances
-            }
-            return {"balances": result}
+            return cls._balances(response)
 
         raise NotImplementedError
 
+    @classmethod
+    async def async_get_balances(
+        cls, ledger_api: Any, contract_address,
+        owner_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the balances for a specific owner address, on the asyncio-native ledger api.
+
+        :param ledger_api: the asyncio-native ledger apis.
+        :param owner: the wallet owner address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+
+            opts = types.TokenAccountOpts(program_id=PublicKey(
+                DEFAULT_TOKEN_PROGRAM_ID))
+            response = await ledger_api.api.get_token_accounts_by_owner_json_parsed(
+                PublicKey(owner_address), opts=opts)
+            return cls._balances(response)
+
+        raise NotImplementedError
+
+    @staticmethod
+    def _balances(response: Any) -> JSONLike:
+        """Read the balances of the token accounts of an owner, with the slot they were read at."""
+        balances = [{
+            "mint": x.account.data.parsed['info']['mint'],
+            "amount": x.account.data.parsed['info']['tokenAmount']['amount'],
+            "decimals": x.account.data.parsed['info']['tokenAmount']['decimals']
+        } for x in response.value]
+        result = {
+            x['mint']:
+                {
+                    "amount": int(x['amount']),
+                    "decimals": x['decimals']
+            }
+            for x in balances
+        }
+        return {"balances": result, "slot": response.context.slot}
+
     @classmethod
     def get_mint_info(
         cls,
@@ -130,7 +431,31 @@ class TokenProgram(Contract):
             mint = ledger_api.api.get_account_info_json_parsed(
                 PublicKey(mint_address))
             info = None if mint.value == None else mint.value.data.parsed['info']
-            return {mint_address.to_base58().decode(): info}
+            return {str(PublicKey(mint_address)): info, "slot": mint.context.slot}
+
+        raise NotImplementedError
+
+    @classmethod
+    async def async_get_mint_info(
+        cls,
+        ledger_api: Any,
+        contract_address: Optional[str],
+        mint_address: str,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the info for a specific mint account, on the asyncio-native ledger api.
+
+        :param ledger_api: the asyncio-native ledger apis.
+        :param mint_address: the address of the mint.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            mint = await ledger_api.api.get_account_info_json_parsed(
+                PublicKey(mint_address))
+            info = None if mint.value == None else mint.value.data.parsed['info']
+            return {str(PublicKey(mint_address)): info, "slot": mint.context.slot}
 
         raise NotImplementedError
 
@@ -155,20 +480,629 @@ class TokenProgram(Contract):
         :return: the tx  # noqa: DAR202
         """
         if ledger_api.identifier == SolanaApi.identifier:
-            atas = {}
-            for mint_address in mint_addresses:
-                seeds = [
-                    bytes(PublicKey(owner_address)),
-                    bytes(PublicKey(contract_address)),
-                    bytes(PublicKey(mint_address)),
-
-                ]
-                address = PublicKey.find_program_address(
-                    seeds=seeds, program_id=PublicKey(DEFAULT_ATA_PROGRAM_ID))
-                atas[mint_address] = (address[0].to_base58()).decode()
-            return {"atas": atas}
+            atas = cls.derive_ata_addresses(contract_address, [owner_address], mint_addresses, processes=1)
+            return {"atas": {mint_address: atas.address(0, i) for i, mint_address in enumerate(mint_addresses)}}
+        raise NotImplementedError
+
+    @classmethod
+    def derive_ata_addresses(
+        cls,
+        contract_address: str,
+        owner_addresses: Sequence[str],
+        mint_addresses: Sequence[str],
+        processes: Optional[int] = None,
+        chunk_size: int = ATA_CHUNK_SIZE,
+    ) -> AtaAddresses:
+        """
+        Derive the associated token accounts of every owner for every mint, without a ledger.
+
+        The owners are split in chunks of `chunk_size`, whose program address searches are spread
+        over a pool of worker processes, as they are bound by the CPU. The pool is started on the
+        first call and kept for the next ones. Fewer than `ATA_IN_PROCESS_SIZE` accounts are
+        derived in this process, as starting on a worker would take longer.
+
+        :param contract_address: the token program address.
+        :param owner_addresses: the owners.
+        :param mint_addresses: the mints.
+        :param processes: the number of worker processes, the number of CPUs by default. With 1, or with a single chunk, they are derived in this process.
+        :param chunk_size: the number of owners sent to a worker process at once.
+        :return: the associated token accounts.
+        """
+        contract_key = bytes(Pubkey.from_string(contract_address))
+        mint_keys = b"".join(bytes(Pubkey.from_string(mint)) for mint in mint_addresses)
+        # packed as the workers take them, not all ahead
+        chunks = (
+            (
+                contract_key,
+                b"".join(bytes(Pubkey.from_string(owner)) for owner in owner_addresses[i:i + chunk_size]),
+                mint_keys,
+            )
+            for i in range(0, len(owner_addresses), chunk_size)
+        )
+        chunk_count = -(-len(owner_addresses) // chunk_size)
+        if processes == 1 or chunk_count <= 1 or len(owner_addresses) * len(mint_addresses) < ATA_IN_PROCESS_SIZE:
+            keys = b"".join(map(_derive_ata_chunk, chunks))
+        else:
+            workers = processes or os.cpu_count() or 1
+            # a few tasks per worker, to balance them without a round trip per chunk
+            keys = b"".join(cls._ata_executor(workers).map(
+                _derive_ata_chunk, chunks, chunksize=max(1, chunk_count // (workers * 4))))
+        return AtaAddresses(owner_addresses, mint_addresses, keys)
+
+    @classmethod
+    def _ata_executor(cls, workers: int) -> ProcessPoolExecutor:
+        """Get the pool of worker processes deriving associated token accounts, starting it again if its size changed."""
+        with cls._ata_pool_lock:
+            if cls._ata_pool is not None and cls._ata_pool[0] == workers:
+                return cls._ata_pool[1]
+            if cls._ata_pool is not None:
+                cls._ata_pool[1].shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers)
+            cls._ata_pool = (workers, executor)
+            return executor
+
+    @classmethod
+    def get_nonce_info(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        nonce_address: str,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the info for a specific durable nonce account.
+
+        :param ledger_api: the ledger apis.
+        :param nonce_address: the address of the nonce account.
+        :param kwargs: the keyword arguments.
+        :return: the nonce account info, with the stored nonce under 'blockhash', or None if it does not exist
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            account = ledger_api.api.get_account_info_json_parsed(
+                PublicKey(nonce_address))
+            info = None if account.value is None else account.value.data.parsed['info']
+            return {nonce_address: info}
+
+        raise NotImplementedError
+
+    @classmethod
+    async def async_get_nonce_info(
+        cls,
+        ledger_api: Any,
+        contract_address: Optional[str],
+        nonce_address: str,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the info for a specific durable nonce account, on the asyncio-native ledger api.
+
+        :param ledger_api: the asyncio-native ledger apis.
+        :param nonce_address: the address of the nonce account.
+        :param kwargs: the keyword arguments.
+        :return: the nonce account info, with the stored nonce under 'blockhash', or None if it does not exist
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            account = await ledger_api.api.get_account_info_json_parsed(
+                PublicKey(nonce_address))
+            info = None if account.value is None else account.value.data.parsed['info']
+            return {nonce_address: info}
+
+        raise NotImplementedError
+
+    @classmethod
+    def create_nonce_account(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        payer_address: str,
+        nonce_address: str,
+        nonce_authority: str,
+        seed: str,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Create a durable nonce account.
+
+        The nonce account address must be derived from the payer address, the seed and the system program.
+
+        :param ledger_api: the ledger apis.
+        :param payer_address: the fee payer wallet address.
+        :param nonce_address: the nonce account address.
+        :param nonce_authority: the wallet address allowed to advance the nonce.
+        :param seed: the seed the nonce account address is derived with.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            resp = ledger_api.api.get_minimum_balance_for_rent_exemption(
+                NONCE_ACCOUNT_LENGTH)
+
+            instructions = ssp.create_nonce_account_with_seed(
+                PublicKey(payer_address).to_solders(),
+                PublicKey(nonce_address).to_solders(),
+                PublicKey(payer_address).to_solders(),
+                seed,
+                PublicKey(nonce_authority).to_solders(),
+                resp.value,
+            )
+            txn = Transaction(fee_payer=PublicKey(payer_address))
+            for instruction in instructions:
+                txn.add(TransactionInstruction.from_solders(instruction))
+
+            tx = txn._solders.to_json()
+            return ledger_api.add_nonce(json.loads(tx))
+
+        raise NotImplementedError
+
+    @classmethod
+    def transfer_lamports(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        payer_address: str,
+        recipients: Sequence[Sequence[Any]],
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Transfer lamports from the payer to several accounts, e.g. to top up fee payers.
+
+        :param ledger_api: the ledger apis.
+        :param payer_address: the wallet address paying the fees and the lamports.
+        :param recipients: the (address, lamports) pairs to transfer to.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            instructions = [
+                sp.transfer(
+                    sp.TransferParams(
+                        from_pubkey=PublicKey(payer_address),
+                        to_pubkey=PublicKey(address),
+                        lamports=int(lamports),
+                    )
+                )
+                for address, lamports in recipients
+            ]
+            return ledger_api.add_nonce(cls._transaction(payer_address, instructions))
+
+        raise NotImplementedError
+
+    @classmethod
+    def simulate_transactions(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        transactions: Sequence[JSONLike],
+        compute_unit_margin: float = 1.1,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Simulate unsigned transactions, concurrently, and set the compute unit limit of the ones which succeed.
+
+        The signatures are not verified, and the blockhash is kept, so an expired one shows as a
+        `BlockhashNotFound` error. A legacy transaction which succeeds, and has no compute budget
+        instruction yet, gets one limiting it to the units it consumed times `compute_unit_margin`.
+
+        :param ledger_api: the ledger apis.
+        :param transactions: the unsigned transactions.
+        :param compute_unit_margin: the factor the consumed units are multiplied by to get the limit.
+        :param kwargs: the keyword arguments.
+        :return: the outcome of every transaction under 'results', with its 'err', the 'units_consumed',
+            the 'logs' and the 'transaction' to sign
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            if len(transactions) == 0:
+                return {"results": []}
+            with ThreadPoolExecutor(min(len(transactions), SIMULATION_WORKERS)) as executor:
+                responses = list(executor.map(
+                    lambda txn: cls._simulate(ledger_api.api, txn), transactions))
+            return {"results": [
+                cls._simulation_result(txn, response, compute_unit_margin)
+                for txn, response in zip(transactions, responses)]}
+
+        raise NotImplementedError
+
+    @classmethod
+    async def async_simulate_transactions(
+        cls,
+        ledger_api: Any,
+        contract_address: Optional[str],
+        transactions: Sequence[JSONLike],
+        compute_unit_margin: float = 1.1,
+        **kwargs: Any
+    ) -> JSONLike:
+        """Simulate transactions like `simulate_transactions`, on the asyncio-native ledger api, which may batch the requests."""
+        if ledger_api.identifier == SolanaApi.identifier:
+            responses = await asyncio.gather(*(
+                cls._simulate(ledger_api.api, txn) for txn in transactions))
+            return {"results": [
+                cls._simulation_result(txn, response, compute_unit_margin)
+                for txn, response in zip(transactions, responses)]}
+
+        raise NotImplementedError
+
+    @classmethod
+    def _simulate(cls, api: Any, txn: JSONLike) -> Any:
+        """
+        Simulate a transaction on a solana client, sync or async, routed or not.
+
+        A legacy transaction goes through the `simulate_transaction` of the client. It only takes
+        legacy ones, so a versioned transaction is posted as a `SimulationRequest` by its provider.
+
+        :param api: the solana client.
+        :param txn: the unsigned transaction.
+        :return: the SimulateTransactionResp, or the awaitable of it on an async client.
+        """
+        transaction = parse_transaction(txn)
+        if isinstance(transaction, sTransaction):
+            return api.simulate_transaction(
+                Transaction.from_solders(transaction), sig_verify=False, commitment=Confirmed)
+        return api._provider.make_request(  # pylint: disable=protected-access
+            SimulationRequest(transaction), SimulateTransactionResp)
+
+    @classmethod
+    def _simulation_result(
+        cls, txn: JSONLike, response: SimulateTransactionResp, compute_unit_margin: float
+    ) -> JSONLike:
+        """Read the outcome of a simulated transaction, setting its compute unit limit if it succeeded."""
+        value = response.value
+        result = {
+            "err": None if value.err is None else str(value.err),
+            "units_consumed": value.units_consumed,
+            "logs": value.logs or [],
+            "transaction": txn,
+        }
+        if value.err is None and value.units_consumed is not None and "header" in txn["message"]:
+            units = min(
+                int(value.units_consumed * compute_unit_margin) + COMPUTE_BUDGET_INSTRUCTION_UNITS,
+                MAX_COMPUTE_UNITS,
+            )
+            result["transaction"] = cls._with_compute_unit_limit(txn, units)
+        return result
+
+    @staticmethod
+    def _with_compute_unit_limit(txn: JSONLike, units: int) -> JSONLike:
+        """Add a SetComputeUnitLimit instruction to a legacy transaction, after the nonce advance of a durable one."""
+        transaction = Transaction.from_solders(sTransaction.from_json(json.dumps(txn)))
+        instructions = list(transaction.instructions)
+        if any(str(instruction.program_id) == COMPUTE_BUDGET_PROGRAM_ID for instruction in instructions):
+            return txn
+        limit = TransactionInstruction(
+            keys=[],
+            program_id=PublicKey(COMPUTE_BUDGET_PROGRAM_ID),
+            data=bytes([2]) + units.to_bytes(4, "little"),
+        )
+        # an AdvanceNonceAccount instruction must stay the first one
+        is_durable = (
+            len(instructions) > 0
+            and str(instructions[0].program_id) == SYSTEM_PROGRAM_ID
+            and bytes(instructions[0].data)[:4] == (4).to_bytes(4, "little")
+        )
+        instructions.insert(1 if is_durable else 0, limit)
+        budgeted = Transaction(
+            recent_blockhash=transaction.recent_blockhash, fee_payer=transaction.fee_payer)
+        for instruction in instructions:
+            budgeted.add(instruction)
+        return json.loads(budgeted._solders.to_json())
+
+    @classmethod
+    def get_lookup_table_address(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        authority_address: str,
+        recent_slot: Optional[int] = None,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the address of the lookup table `create_lookup_table` creates for an authority.
+
+        :param ledger_api: the ledger apis.
+        :param authority_address: the authority of the lookup table.
+        :param recent_slot: the recent slot the address is derived with, the current one when not given.
+        :param kwargs: the keyword arguments.
+        :return: the lookup table address and the slot to create it with
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            if recent_slot is None:
+                recent_slot = ledger_api.api.get_slot().value
+            address, _ = cls._lookup_table_address(authority_address, recent_slot)
+            return {"address": str(address), "recent_slot": recent_slot}
+
+        raise NotImplementedError
+
+    @classmethod
+    def get_lookup_table(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        lookup_table_address: str,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Get the addresses of an address lookup table, refreshing the cache the builders use.
+
+        :param ledger_api: the ledger apis.
+        :param lookup_table_address: the lookup table address.
+        :param kwargs: the keyword arguments.
+        :return: the addresses of the lookup table, or None if it does not exist or is deactivated
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            table = cls._lookup_table(ledger_api, lookup_table_address, refresh=True)
+            addresses = None if table is None else [str(address) for address in table.addresses]
+            return {lookup_table_address: addresses}
+
+        raise NotImplementedError
+
+    @classmethod
+    def create_lookup_table(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        payer_address: str,
+        authority_address: str,
+        recent_slot: int,
+        addresses: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Build a transaction creating an address lookup table, e.g. for the mint, the programs and the
+        frequent recipients, and adding the first addresses to it. Its address is the one
+        `get_lookup_table_address` returns for the same authority and slot.
+
+        :param ledger_api: the ledger apis.
+        :param payer_address: the fee payer wallet address.
+        :param authority_address: the authority of the lookup table, which signs its changes.
+        :param recent_slot: a recent slot, which the address of the lookup table is derived with.
+        :param addresses: the first addresses of the lookup table, at most `LOOKUP_TABLE_EXTEND_SIZE`.
+        :param kwargs: the keyword arguments, the nonce ones of `mint_to`.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            address, bump = cls._lookup_table_address(authority_address, recent_slot)
+            instructions = [TransactionInstruction(
+                keys=[
+                    AccountMeta(pubkey=PublicKey(address), is_signer=False, is_writable=True),
+                    AccountMeta(pubkey=PublicKey(authority_address), is_signer=True, is_writable=False),
+                    AccountMeta(pubkey=PublicKey(payer_address), is_signer=True, is_writable=True),
+                    AccountMeta(pubkey=PublicKey(SYSTEM_PROGRAM_ID), is_signer=False, is_writable=False),
+                ],
+                program_id=PublicKey(LOOKUP_TABLE_PROGRAM_ID),
+                data=(0).to_bytes(4, "little") + recent_slot.to_bytes(8, "little") + bytes([bump]),
+            )]
+            if addresses:
+                instructions.append(cls._extend_lookup_table_instruction(
+                    payer_address, authority_address, str(address), addresses))
+            return cls._build_transaction(
+                ledger_api,
+                payer_address,
+                instructions,
+                nonce_address=kwargs.get("nonce_address"),
+                nonce_authority=kwargs.get("nonce_authority"),
+                nonce=kwargs.get("nonce"),
+            )
+
+        raise NotImplementedError
+
+    @classmethod
+    def extend_lookup_table(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: Optional[str],
+        payer_address: str,
+        authority_address: str,
+        lookup_table_address: str,
+        addresses: List[str],
+        **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Build a transaction adding addresses to an address lookup table. The builders read the
+        lookup table again once it is extended, as its cached addresses are dropped.
+
+        :param ledger_api: the ledger apis.
+        :param payer_address: the fee payer wallet address.
+        :param authority_address: the authority of the lookup table.
+        :param lookup_table_address: the lookup table address.
+        :param addresses: the addresses to add, at most `LOOKUP_TABLE_EXTEND_SIZE`.
+        :param kwargs: the keyword arguments, the nonce ones of `mint_to`.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            instructions = [cls._extend_lookup_table_instruction(
+                payer_address, authority_address, lookup_table_address, addresses)]
+            cls._lookup_tables.pop(lookup_table_address)
+            return cls._build_transaction(
+                ledger_api,
+                payer_address,
+                instructions,
+                nonce_address=kwargs.get("nonce_address"),
+                nonce_authority=kwargs.get("nonce_authority"),
+                nonce=kwargs.get("nonce"),
+            )
+
         raise NotImplementedError
 
+    @staticmethod
+    def _lookup_table_address(authority_address: str, recent_slot: int) -> Tuple[Pubkey, int]:
+        """Derive the address and the bump seed of the lookup table of an authority and a slot."""
+        return Pubkey.find_program_address(
+            [bytes(PublicKey(authority_address)), recent_slot.to_bytes(8, "little")],
+            Pubkey.from_string(LOOKUP_TABLE_PROGRAM_ID))
+
+    @staticmethod
+    def _extend_lookup_table_instruction(
+        payer_address: str,
+        authority_address: str,
+        lookup_table_address: str,
+        addresses: List[str],
+    ) -> TransactionInstruction:
+        """Get the instruction adding addresses to a lookup table."""
+        if len(addresses) > LOOKUP_TABLE_EXTEND_SIZE:
+            raise ValueError(
+                f"At most {LOOKUP_TABLE_EXTEND_SIZE} addresses can be added to a lookup table at once.")
+        data = (2).to_bytes(4, "little") + len(addresses).to_bytes(8, "little")
+        return TransactionInstruction(
+            keys=[
+                AccountMeta(pubkey=PublicKey(lookup_table_address), is_signer=False, is_writable=True),
+                AccountMeta(pubkey=PublicKey(authority_address), is_signer=True, is_writable=False),
+                AccountMeta(pubkey=PublicKey(payer_address), is_signer=True, is_writable=True),
+                AccountMeta(pubkey=PublicKey(SYSTEM_PROGRAM_ID), is_signer=False, is_writable=False),
+            ],
+            program_id=PublicKey(LOOKUP_TABLE_PROGRAM_ID),
+            data=data + b"".join(bytes(PublicKey(address)) for address in addresses),
+        )
+
+    @classmethod
+    def _lookup_table(
+        cls, ledger_api: LedgerApi, lookup_table_address: str, refresh: bool = False
+    ) -> Optional[AddressLookupTableAccount]:
+        """Get a lookup table, from the cache unless it is older than `LOOKUP_TABLE_CACHE_TTL` seconds."""
+        cached = cls._lookup_tables.get(lookup_table_address)
+        if cached is not None and not refresh and time.monotonic() - cached[0] < LOOKUP_TABLE_CACHE_TTL:
+            return cached[1]
+        account = ledger_api.api.get_account_info(PublicKey(lookup_table_address)).value
+        table = None if account is None else cls._parse_lookup_table(lookup_table_address, bytes(account.data))
+        cls._lookup_tables.put(lookup_table_address, (time.monotonic(), table))
+        return table
+
+    @staticmethod
+    def _parse_lookup_table(lookup_table_address: str, data: bytes) -> Optional[AddressLookupTableAccount]:
+        """Parse the data of a lookup table account, None if it is deactivated."""
+        if len(data) < LOOKUP_TABLE_META_SIZE or data[:4] != (1).to_bytes(4, "little"):
+            raise ValueError(f"Account {lookup_table_address} is not an address lookup table.")
+        if data[4:12] != LOOKUP_TABLE_ACTIVE:
+            return None
+        keys = data[LOOKUP_TABLE_META_SIZE:]
+        return AddressLookupTableAccount(
+            Pubkey.from_string(lookup_table_address),
+            [Pubkey.from_bytes(keys[i:i + KEY_LENGTH]) for i in range(0, len(keys), KEY_LENGTH)])
+
+    @classmethod
+    def _versioned_transaction(cls, ledger_api: LedgerApi, txn: JSONLike, lookup_table_address: str) -> JSONLike:
+        """
+        Turn a transaction into a v0 one looking its accounts up in a lookup table, if that makes it smaller.
+
+        The signers stay in the message, as they cannot be looked up.
+        """
+        table = cls._lookup_table(ledger_api, lookup_table_address)
+        if table is None:
+            return txn
+        legacy = sTransaction.from_json(json.dumps(txn))
+        message = MessageV0.try_compile(
+            legacy.message.account_keys[0],
+            [instruction.to_solders() for instruction in Transaction.from_solders(legacy).instructions],
+            [table],
+            legacy.message.recent_blockhash,
+        )
+        if len(bytes(message)) >= len(bytes(legacy.message)):
+            return txn
+        signatures = [Signature.default()] * message.header.num_required_signatures
+        return json.loads(VersionedTransaction.populate(message, signatures).to_json())
+
+    @classmethod
+    def _build_transaction(
+        cls,
+        ledger_api: LedgerApi,
+        payer_address: str,
+        instructions: List[TransactionInstruction],
+        nonce_address: Optional[str] = None,
+        nonce_authority: Optional[str] = None,
+        nonce: Optional[str] = None,
+        lookup_table_address: Optional[str] = None,
+    ) -> JSONLike:
+        """
+        Build a transaction, either on a recent blockhash or on a durable nonce.
+
+        With a nonce account the transaction starts with an AdvanceNonceAccount instruction and uses the
+        stored nonce as its blockhash, so it stays valid until the nonce is advanced. With a lookup
+        table it is built as a v0 transaction referencing it, whenever that makes it smaller.
+
+        :param ledger_api: the ledger apis.
+        :param payer_address: the fee payer wallet address.
+        :param instructions: the instructions of the transaction.
+        :param nonce_address: the durable nonce account address, if any.
+        :param nonce_authority: the nonce authority, defaults to the payer.
+        :param nonce: the stored nonce, fetched from the nonce account when not given.
+        :param lookup_table_address: the address lookup table to build a v0 transaction with, if any.
+        :return: the tx
+        """
+        if nonce_address is None:
+            txn = ledger_api.add_nonce(cls._transaction(payer_address, instructions))
+        else:
+            if nonce is None:
+                nonce = cls._stored_nonce(
+                    nonce_address, cls.get_nonce_info(ledger_api, None, nonce_address))
+            txn = cls._durable_transaction(
+                payer_address, instructions, nonce_address, nonce_authority, nonce)
+        if lookup_table_address is None:
+            return txn
+        return cls._versioned_transaction(ledger_api, txn, lookup_table_address)
+
+    @classmethod
+    async def _async_build_transaction(
+        cls,
+        ledger_api: Any,
+        payer_address: str,
+        instructions: List[TransactionInstruction],
+        nonce_address: Optional[str] = None,
+        nonce_authority: Optional[str] = None,
+        nonce: Optional[str] = None,
+    ) -> JSONLike:
+        """Build a transaction like `_build_transaction`, on the asyncio-native ledger api."""
+        if nonce_address is None:
+            return await ledger_api.add_nonce(cls._transaction(payer_address, instructions))
+
+        if nonce is None:
+            nonce = cls._stored_nonce(
+                nonce_address, await cls.async_get_nonce_info(ledger_api, None, nonce_address))
+        return cls._durable_transaction(
+            payer_address, instructions, nonce_address, nonce_authority, nonce)
+
+    @staticmethod
+    def _transaction(payer_address: str, instructions: List[TransactionInstruction]) -> JSONLike:
+        """Build a transaction, without a blockhash."""
+        txn = Transaction(fee_payer=PublicKey(payer_address))
+        for instruction in instructions:
+            txn.add(instruction)
+        return json.loads(txn._solders.to_json())
+
+    @staticmethod
+    def _stored_nonce(nonce_address: str, nonce_info: JSONLike) -> str:
+        """Read the stored nonce from the info of a nonce account."""
+        info = nonce_info[nonce_address]
+        if info is None:
+            raise ValueError(
+                f"Nonce account {nonce_address} does not exist.")
+        return info['blockhash']
+
+    @staticmethod
+    def _durable_transaction(
+        payer_address: str,
+        instructions: List[TransactionInstruction],
+        nonce_address: str,
+        nonce_authority: Optional[str],
+        nonce: str,
+    ) -> JSONLike:
+        """Build a transaction on a durable nonce."""
+        txn = Transaction(recent_blockhash=nonce,
+                          fee_payer=PublicKey(payer_address))
+        txn.add(
+            sp.nonce_advance(
+                sp.AdvanceNonceParams(
+                    nonce_pubkey=PublicKey(nonce_address),
+                    authorized_pubkey=PublicKey(
+                        nonce_authority or payer_address),
+                )
+            )
+        )
+        for instruction in instructions:
+            txn.add(instruction)
+        return json.loads(txn._solders.to_json())
+
     @classmethod
     def create_token_mint(
         cls,
@@ -289,58 +1223,229 @@ class TokenProgram(Contract):
         Implement this method in the sub class if you want
         to handle the contract requests manually.
 
+        Pass `nonce_address` to build the transaction on a durable nonce instead of a recent
+        blockhash, so it can be signed ahead of time. Once the associated token account exists, the
+        transaction is built from the compiled `MintToTemplate` of the payer, mint and authority.
+
         :param ledger_api: the ledger apis.
         :param contract_address: the contract address.
-        :param kwargs: the keyword arguments.
+        :param kwargs: the keyword arguments. Possible kwargs are:
+            `nonce_address`: the durable nonce account to build on
+            `nonce_authority`: the nonce authority, defaults to the payer
+            `nonce`: the stored nonce, fetched from the nonce account when not given
         :return: the tx  # noqa: DAR202
         """
 
         if ledger_api.identifier == SolanaApi.identifier:
-            seeds = [
-                bytes(PublicKey(destination_owner_address)),
-                bytes(PublicKey(contract_address)),
-                bytes(PublicKey(mint_address)),
+            ata = cls._ata_address(
+                contract_address, destination_owner_address, mint_address)
+            ata_exists = ledger_api.get_state(ata.to_base58().decode()) is not None
+            nonce_address = kwargs.get("nonce_address")
+            if ata_exists:
+                if nonce_address is None:
+                    blockhash = ledger_api._generate_tx_nonce()  # pylint: disable=protected-access
+                else:
+                    blockhash = kwargs.get("nonce") or cls._stored_nonce(
+                        nonce_address, cls.get_nonce_info(ledger_api, None, nonce_address))
+                return cls._mint_to_template(
+                    contract_address, payer_address, authority_address, mint_address,
+                    nonce_address, kwargs.get("nonce_authority"),
+                ).build(bytes(ata), amount, blockhash)
+
+            instructions = cls._mint_to_instructions(
+                contract_address, payer_address, destination_owner_address, authority_address,
+                mint_address, amount, ata, ata_exists)
+            return cls._build_transaction(
+                ledger_api,
+                payer_address,
+                instructions,
+                nonce_address=kwargs.get("nonce_address"),
+                nonce_authority=kwargs.get("nonce_authority"),
+                nonce=kwargs.get("nonce"),
+            )
 
-            ]
-            address_pk = PublicKey.find_program_address(
-                seeds=seeds, program_id=PublicKey(DEFAULT_ATA_PROGRAM_ID))
-            address = (address_pk[0].to_base58()).decode()
-            sa = SolanaApi()
-            ata = sa.get_state(address)
-            if ata is None:
-                txn = Transaction(fee_payer=PublicKey(payer_address))
-                txn.add(
-                    spl_token.create_associated_token_account(
-                        payer=PublicKey(payer_address), owner=PublicKey(destination_owner_address), mint=PublicKey(mint_address)
-                    ))
-                txn.add(
-                    spl_token.mint_to(
-                        spl_token.MintToParams(
-                            program_id=PublicKey(contract_address),
-                            mint=PublicKey(mint_address),
-                            dest=PublicKey(address),
-                            mint_authority=PublicKey(authority_address),
-                            amount=amount,
-                        )
-                    )
-                )
-                tx = txn._solders.to_json()
-                return ledger_api.add_nonce(json.loads(tx))
+        raise NotImplementedError
 
-            else:
-                txn = Transaction(fee_payer=PublicKey(payer_address)).add(
-                    spl_token.mint_to(
-                        spl_token.MintToParams(
-                            program_id=PublicKey(contract_address),
-                            mint=PublicKey(mint_address),
-                            dest=address_pk[0],
-                            mint_authority=PublicKey(authority_address),
-                            amount=amount
-                        )
-                    )
+    @ classmethod
+    async def async_mint_to(
+        cls,
+        ledger_api: Any,
+        contract_address: str,
+        payer_address: str,
+        destination_owner_address: str,
+        authority_address: str,
+        mint_address: str,
+        amount: int,
+        ** kwargs: Any
+    ) -> JSONLike:
+        """
+        Build the transaction of `mint_to`, on the asyncio-native ledger api.
+
+        :param ledger_api: the asyncio-native ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments, as for `mint_to`.
+        :return: the tx  # noqa: DAR202
+        """
+
+        if ledger_api.identifier == SolanaApi.identifier:
+            ata = cls._ata_address(
+                contract_address, destination_owner_address, mint_address)
+            ata_exists = await ledger_api.get_state(ata.to_base58().decode()) is not None
+            nonce_address = kwargs.get("nonce_address")
+            if ata_exists:
+                if nonce_address is None:
+                    blockhash = await ledger_api.get_latest_blockhash()
+                else:
+                    blockhash = kwargs.get("nonce") or cls._stored_nonce(
+                        nonce_address, await cls.async_get_nonce_info(ledger_api, None, nonce_address))
+                return cls._mint_to_template(
+                    contract_address, payer_address, authority_address, mint_address,
+                    nonce_address, kwargs.get("nonce_authority"),
+                ).build(bytes(ata), amount, blockhash)
+
+            instructions = cls._mint_to_instructions(
+                contract_address, payer_address, destination_owner_address, authority_address,
+                mint_address, amount, ata, ata_exists)
+            return await cls._async_build_transaction(
+                ledger_api,
+                payer_address,
+                instructions,
+                nonce_address=kwargs.get("nonce_address"),
+                nonce_authority=kwargs.get("nonce_authority"),
+                nonce=kwargs.get("nonce"),
+            )
+
+        raise NotImplementedError
+
+    @classmethod
+    def _mint_to_template(
+        cls,
+        contract_address: str,
+        payer_address: str,
+        authority_address: str,
+        mint_address: str,
+        nonce_address: Optional[str],
+        nonce_authority: Optional[str],
+    ) -> MintToTemplate:
+        """Get the MintTo template of a payer, a mint and an authority, compiling it the first time."""
+        key = (contract_address, payer_address, authority_address, mint_address, nonce_address, nonce_authority)
+        template = cls._mint_to_templates.get(key)
+        if template is None:
+            template = MintToTemplate(
+                contract_address, payer_address, authority_address, mint_address, nonce_address, nonce_authority)
+            cls._mint_to_templates.put(key, template)
+        return template
+
+    @staticmethod
+    def _ata_address(contract_address: str, owner_address: str, mint_address: str) -> PublicKey:
+        """Derive the associated token account of an owner for a mint."""
+        seeds = [
+            bytes(PublicKey(owner_address)),
+            bytes(PublicKey(contract_address)),
+            bytes(PublicKey(mint_address)),
+
+        ]
+        address_pk = PublicKey.find_program_address(
+            seeds=seeds, program_id=PublicKey(DEFAULT_ATA_PROGRAM_ID))
+        return address_pk[0]
+
+    @staticmethod
+    def _mint_to_instructions(
+        contract_address: str,
+        payer_address: str,
+        destination_owner_address: str,
+        authority_address: str,
+        mint_address: str,
+        amount: int,
+        ata: PublicKey,
+        ata_exists: bool,
+    ) -> List[TransactionInstruction]:
+        """Get the instructions minting to an owner, creating its associated token account first if needed."""
+        instructions = []
+        if not ata_exists:
+            instructions.append(
+                spl_token.create_associated_token_account(
+                    payer=PublicKey(payer_address), owner=PublicKey(destination_owner_address), mint=PublicKey(mint_address)
+                ))
+        instructions.append(
+            spl_token.mint_to(
+                spl_token.MintToParams(
+                    program_id=PublicKey(contract_address),
+                    mint=PublicKey(mint_address),
+                    dest=ata,
+                    mint_authority=PublicKey(authority_address),
+                    amount=amount
                 )
-                tx = txn._solders.to_json()
-                return ledger_api.add_nonce(json.loads(tx))
+            )
+        )
+        return instructions
+
+    @ classmethod
+    def distribute(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: str,
+        payer_address: str,
+        authority_address: str,
+        mint_address: str,
+        recipients: List[List[Any]],
+        transfer: bool = False,
+        ** kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Build a single transaction paying several recipients. Each gets its associated token account
+        created if it does not exist yet, then the amount minted to it, or transferred to it from the
+        associated token account of the authority with `transfer`. As the account creation is
+        idempotent, nothing but the blockhash is read from the ledger.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param payer_address: the fee payer wallet address.
+        :param authority_address: the mint authority, or the owner of the tokens transferred.
+        :param mint_address: the mint.
+        :param recipients: the owner address and the amount of every recipient.
+        :param transfer: whether to transfer the tokens of the authority rather than mint them.
+        :param kwargs: the keyword arguments, the nonce ones of `mint_to`.
+        :return: the tx  # noqa: DAR202
+        """
+        if ledger_api.identifier == SolanaApi.identifier:
+            owners = [owner for owner, _ in recipients]
+            atas = cls.derive_ata_addresses(contract_address, owners, [mint_address], processes=1)
+            source = cls._ata_address(contract_address, authority_address, mint_address) if transfer else None
+            instructions = []
+            for index, (owner, amount) in enumerate(recipients):
+                ata = PublicKey(atas.address(index, 0))
+                # CreateIdempotent, which succeeds when the account already exists
+                instructions.append(spl_token.create_associated_token_account(
+                    payer=PublicKey(payer_address), owner=PublicKey(owner), mint=PublicKey(mint_address)
+                )._replace(data=bytes([1])))
+                if source is None:
+                    instructions.append(spl_token.mint_to(spl_token.MintToParams(
+                        program_id=PublicKey(contract_address),
+                        mint=PublicKey(mint_address),
+                        dest=ata,
+                        mint_authority=PublicKey(authority_address),
+                        amount=amount,
+                    )))
+                else:
+                    instructions.append(spl_token.transfer(spl_token.TransferParams(
+                        program_id=PublicKey(contract_address),
+                        source=source,
+                        dest=ata,
+                        owner=PublicKey(authority_address),
+                        amount=amount,
+                    )))
+            return cls._build_transaction(
+                ledger_api,
+                payer_address,
+                instructions,
+                nonce_address=kwargs.get("nonce_address"),
+                nonce_authority=kwargs.get("nonce_authority"),
+                nonce=kwargs.get("nonce"),
+                lookup_table_address=kwargs.get("lookup_table_address"),
+            )
 
         raise NotImplementedError
 
@@ -387,8 +1492,7 @@ class TokenProgram(Contract):
                 seeds=source_address, program_id=PublicKey(DEFAULT_ATA_PROGRAM_ID))
             source_address = (address_pk[0].to_base58()).decode()
 
-            sa = SolanaApi()
-            ata = sa.get_state(dest_address)
+            ata = ledger_api.get_state(dest_address)
 
             if ata is None:
                 txn = Transaction(fee_payer=PublicKey(payer_address))
@@ -414,7 +1518,7 @@ class TokenProgram(Contract):
                             program_id=PublicKey(contract_address),
                             source=PublicKey(source_address),
                             dest=PublicKey(dest_address),
-                            owner=PublicKey(source_owner_address),
+                            owner=PublicKey(sender_owner_address),
                             amount=amount
                         )
                     )
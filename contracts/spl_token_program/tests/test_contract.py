@@ -22,10 +22,11 @@
 # type: ignore # noqa: E800
 # pylint: skip-file
 
+import json
 import re
+import sys
 import time
 from pathlib import Path
-from typing import cast
 from unittest import mock
 from typing import Dict, Generator, Optional, Tuple, Union, cast
 from aea.common import JSONLike
@@ -43,6 +44,12 @@ from aea.test_tools.test_contract import BaseContractTestCase
 from aea_ledger_solana import SolanaCrypto, SolanaApi, SolanaFaucetApi, PublicKey, Transaction, sTransaction
 from spl.token._layouts import ACCOUNT_LAYOUT, MINT_LAYOUT, MULTISIG_LAYOUT
 
+from packages.dassy23.contracts.spl_token_program.transactions import (
+    is_versioned_transaction,
+    parse_transaction,
+    transaction_signature,
+)
+
 
 PACKAGE_DIR = Path(__file__).parent.parent
 MAX_FLAKY_RERUNS = 3
@@ -310,3 +317,521 @@ class TestContractCommon:
 
         assert state == None
         ##
+
+
+class TestDurableNonce:
+    """Test building transactions on a durable nonce, without a ledger."""
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup."""
+        configuration = cast(
+            ContractConfig,
+            load_component_configuration(ComponentType.CONTRACT, PACKAGE_DIR),
+        )
+        configuration._directory = PACKAGE_DIR  # pylint: disable=protected-access
+        if str(configuration.public_id) not in contract_registry.specs:
+            Contract.from_config(configuration)
+        cls.contract = contract_registry.make(str(configuration.public_id))
+
+        cls.payer = SolanaCrypto()
+        cls.nonce_address = PublicKey.create_with_seed(
+            cls.payer.public_key, "nonce0", PublicKey("11111111111111111111111111111111")).to_base58().decode()
+        cls.mint_address = PublicKey.create_with_seed(
+            cls.payer.public_key, "seed", PublicKey("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")).to_base58().decode()
+        cls.nonce = "GfVcyD4kkTrj4bKc7WA9sZCin9JDbdT4Zkd3EittNR1W"
+
+        cls.ledger_api = mock.Mock()
+        cls.ledger_api.configure_mock(identifier=SolanaApi.identifier)
+        cls.ledger_api.get_state.return_value = {"exists": True}
+        account = mock.Mock()
+        account.value.data.parsed = {"info": {"authority": cls.payer.address, "blockhash": cls.nonce}}
+        cls.ledger_api.api.get_account_info_json_parsed.return_value = account
+
+    def _mint_to(self, **kwargs) -> JSONLike:
+        return self.contract.mint_to(
+            ledger_api=self.ledger_api,
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            payer_address=self.payer.address,
+            destination_owner_address=self.payer.address,
+            mint_address=self.mint_address,
+            authority_address=self.payer.address,
+            amount=3,
+            nonce_address=self.nonce_address,
+            **kwargs,
+        )
+
+    def test_mint_to_on_given_nonce(self) -> None:
+        """Test the AdvanceNonceAccount instruction comes first and the nonce is used as the blockhash."""
+        txn = self._mint_to(nonce=self.nonce)
+        stxn = sTransaction.from_json(json.dumps(txn))
+        assert str(stxn.message.recent_blockhash) == self.nonce
+        assert stxn.uses_durable_nonce() is not None
+        assert len(stxn.message.instructions) == 2
+        self.ledger_api.add_nonce.assert_not_called()
+
+    def test_mint_to_fetches_nonce(self) -> None:
+        """Test the stored nonce is read from the nonce account when it is not given."""
+        txn = self._mint_to()
+        stxn = sTransaction.from_json(json.dumps(txn))
+        assert str(stxn.message.recent_blockhash) == self.nonce
+        self.ledger_api.api.get_account_info_json_parsed.assert_called()
+
+    def test_mint_to_signs_ahead(self) -> None:
+        """Test a durable mint can be signed without a recent blockhash."""
+        txn = self._mint_to(nonce=self.nonce)
+        signed = self.payer.sign_transaction(txn)
+        assert signed["signatures"] != txn["signatures"]
+
+    @pytest.mark.asyncio
+    async def test_async_mint_to(self) -> None:
+        """Test the asyncio-native variant awaits the ledger api and builds the same transaction."""
+        async_api = mock.Mock(identifier=SolanaApi.identifier)
+        async_api.get_state = mock.AsyncMock(return_value={"exists": True})
+        async_api.api.get_account_info_json_parsed = mock.AsyncMock(
+            return_value=self.ledger_api.api.get_account_info_json_parsed.return_value)
+        txn = await self.contract.async_mint_to(
+            ledger_api=async_api,
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            payer_address=self.payer.address,
+            destination_owner_address=self.payer.address,
+            mint_address=self.mint_address,
+            authority_address=self.payer.address,
+            amount=3,
+            nonce_address=self.nonce_address,
+        )
+        assert txn == self._mint_to()
+        async_api.get_state.assert_awaited_once()
+        async_api.api.get_account_info_json_parsed.assert_awaited_once()
+
+    def test_get_nonce_info(self) -> None:
+        """Test the nonce account info is returned by address."""
+        info = self.contract.get_nonce_info(
+            ledger_api=self.ledger_api,
+            contract_address=None,
+            nonce_address=self.nonce_address,
+        )
+        assert info[self.nonce_address]["blockhash"] == self.nonce
+
+    def test_get_balances_slot(self) -> None:
+        """Test the balances are returned by mint, with the slot they were read at."""
+        token_account = mock.Mock()
+        token_account.account.data.parsed = {
+            "info": {"mint": self.mint_address, "tokenAmount": {"amount": "7", "decimals": 0}}}
+        self.ledger_api.api.get_token_accounts_by_owner_json_parsed.return_value = mock.Mock(
+            value=[token_account], context=mock.Mock(slot=1234))
+        balances = self.contract.get_balances(
+            ledger_api=self.ledger_api,
+            contract_address=None,
+            owner_address=self.payer.address,
+        )
+        assert balances == {"balances": {self.mint_address: {"amount": 7, "decimals": 0}}, "slot": 1234}
+
+    def test_create_nonce_account(self) -> None:
+        """Test the nonce account is created with seed and initialized in one transaction."""
+        self.ledger_api.api.get_minimum_balance_for_rent_exemption.return_value = mock.Mock(value=1447680)
+        self.ledger_api.add_nonce.side_effect = lambda tx: tx
+        txn = self.contract.create_nonce_account(
+            ledger_api=self.ledger_api,
+            contract_address=None,
+            payer_address=self.payer.address,
+            nonce_address=self.nonce_address,
+            nonce_authority=self.payer.address,
+            seed="nonce0",
+        )
+        stxn = sTransaction.from_json(json.dumps(txn))
+        assert len(stxn.message.instructions) == 2
+
+    def test_transfer_lamports(self) -> None:
+        """Test several accounts are topped up by the payer in one transaction."""
+        self.ledger_api.add_nonce.side_effect = lambda tx: tx
+        recipients = [[str(SolanaCrypto().public_key), lamports] for lamports in (1000, 2000)]
+        txn = self.contract.transfer_lamports(
+            ledger_api=self.ledger_api,
+            contract_address=None,
+            payer_address=self.payer.address,
+            recipients=recipients,
+        )
+        stxn = sTransaction.from_json(json.dumps(txn))
+        assert str(stxn.message.account_keys[0]) == self.payer.address
+        for instruction, (address, lamports) in zip(stxn.message.instructions, recipients):
+            assert str(stxn.message.account_keys[instruction.accounts[1]]) == address
+            assert bytes(instruction.data)[4:] == lamports.to_bytes(8, "little")
+
+    @staticmethod
+    def _simulation(err: Optional[str], units: int):
+        from solders.rpc.responses import SimulateTransactionResp
+
+        return SimulateTransactionResp.from_json(json.dumps({
+            "jsonrpc": "2.0", "id": 0,
+            "result": {"context": {"slot": 1}, "value": {
+                "err": err, "logs": ["log"], "accounts": None, "unitsConsumed": units, "returnData": None}},
+        }))
+
+    def test_simulate_transactions(self) -> None:
+        """Test a succeeding transaction gets a compute unit limit after its nonce advance, and a failing one is kept."""
+        txn = self._mint_to(nonce=self.nonce)
+        self.ledger_api.api.simulate_transaction.side_effect = [
+            self._simulation(None, 3000), self._simulation("BlockhashNotFound", 0)]
+        results = self.contract.simulate_transactions(
+            self.ledger_api, None, [txn, txn], compute_unit_margin=1.5)["results"]
+        assert [result["err"] for result in results] == [None, "TransactionErrorFieldless.BlockhashNotFound"]
+        assert results[1]["transaction"] == txn
+        stxn = sTransaction.from_json(json.dumps(results[0]["transaction"]))
+        assert stxn.uses_durable_nonce() is not None
+        budget = stxn.message.instructions[1]
+        assert str(stxn.message.account_keys[budget.program_id_index]) == "ComputeBudget111111111111111111111111111111"
+        assert bytes(budget.data) == bytes([2]) + (4500 + 150).to_bytes(4, "little")
+        assert len(stxn.message.instructions) == 3
+
+    @pytest.mark.parametrize("routed", [False, True])
+    def test_simulate_on_local_rpc(self, routed: bool) -> None:
+        """Test the transactions are simulated through the RPC client, routed or not, on a local stand-in answering every request."""
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        import logging
+        from solders.hash import Hash
+        from solders.message import MessageV0
+        from solders.pubkey import Pubkey
+        from solders.signature import Signature
+        from solders.transaction import VersionedTransaction
+        from packages.valory.connections.ledger.router import LedgerApiRouter, RoutedLedgerApi
+
+        requests = []
+
+        class StandIn(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if request["method"] == "getLatestBlockhash":
+                    value = {"blockhash": TestDurableNonce.nonce, "lastValidBlockHeight": 100}
+                else:
+                    requests.append(request)
+                    failing = len(requests) % 2 == 0
+                    value = {
+                        "err": "BlockhashNotFound" if failing else None, "logs": [], "accounts": None,
+                        "unitsConsumed": 0 if failing else 2000, "returnData": None}
+                body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": {
+                    "context": {"slot": 1}, "value": value}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            address = f"http://127.0.0.1:{server.server_port}"
+            if routed:
+                ledger_api = RoutedLedgerApi(LedgerApiRouter(
+                    lambda address: SolanaApi(address=address), [address], logging.getLogger(__name__)))
+            else:
+                ledger_api = SolanaApi(address=address)
+            txn = self._mint_to(nonce=self.nonce)
+            versioned = json.loads(VersionedTransaction.populate(
+                MessageV0.try_compile(Pubkey.from_string(self.payer.address), [], [], Hash.from_string(self.nonce)),
+                [Signature.default()]).to_json())
+            results = self.contract.simulate_transactions(ledger_api, None, [txn] * 3 + [versioned])["results"]
+            if routed:
+                ledger_api.close()
+        finally:
+            server.shutdown()
+        assert {request["method"] for request in requests} == {"simulateTransaction"}
+        assert len(requests) == 4
+        assert sorted(result["err"] is None for result in results) == [False, False, True, True]
+        assert all(result["units_consumed"] == 2000 for result in results if result["err"] is None)
+
+    @pytest.mark.asyncio
+    async def test_async_simulate_transactions(self) -> None:
+        """Test the asyncio-native variant simulates every transaction at once."""
+        txn = self._mint_to(nonce=self.nonce)
+        async_api = mock.Mock(identifier=SolanaApi.identifier)
+        async_api.api.simulate_transaction = mock.AsyncMock(return_value=self._simulation(None, 3000))
+        results = await self.contract.async_simulate_transactions(async_api, None, [txn] * 3)
+        assert async_api.api.simulate_transaction.await_count == 3
+        assert all(result["units_consumed"] == 3000 for result in results["results"])
+
+
+class TestAtaAddresses:
+    """Test deriving associated token accounts in bulk, without a ledger."""
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup."""
+        configuration = cast(
+            ContractConfig,
+            load_component_configuration(ComponentType.CONTRACT, PACKAGE_DIR),
+        )
+        configuration._directory = PACKAGE_DIR  # pylint: disable=protected-access
+        if str(configuration.public_id) not in contract_registry.specs:
+            Contract.from_config(configuration)
+        cls.contract = contract_registry.make(str(configuration.public_id))
+        cls.ledger_api = mock.Mock()
+        cls.ledger_api.configure_mock(identifier=SolanaApi.identifier)
+
+    def test_known_addresses(self) -> None:
+        """Test the derived addresses match the ones of the ledger."""
+        owner = "F1Xx2knK9233VLKouxAVeZRKygKqeLiLVhfY6RtRkHTj"
+        mints = ["EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v", "So11111111111111111111111111111111111111112"]
+        atas = self.contract.derive_ata_addresses("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", [owner], mints)
+        assert len(atas) == 2
+        assert atas.get(owner, mints[0]) == "HtSwUNdUvZGzqNP8eWrv57Z6U3X6UztFEpVdszxwaTCw"
+        assert atas.address(0, 1) == "GtgntmHXSQ9dCbhuyXFESc3FwKnpWeTQszj2mRYzsvCH"
+        assert bytes(PublicKey(atas.address(0, 1))) == atas.key(0, 1)
+
+        addresses = self.contract.get_ata_addresses(
+            ledger_api=self.ledger_api,
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            owner_address=owner,
+            mint_addresses=mints,
+        )
+        assert addresses["atas"][mints[1]] == "GtgntmHXSQ9dCbhuyXFESc3FwKnpWeTQszj2mRYzsvCH"
+
+    def test_process_pool(self) -> None:
+        """Test the chunks derived in worker processes come back in order, the pool kept for the next calls."""
+        owners = [str(SolanaCrypto().public_key) for _ in range(25)]
+        mints = [str(SolanaCrypto().public_key) for _ in range(3)]
+        in_process = self.contract.derive_ata_addresses(
+            "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", owners, mints, processes=2, chunk_size=4)
+        # too few to be worth a worker process
+        assert self.contract._ata_pool is None
+        with mock.patch.object(sys.modules[self.contract.__module__], "ATA_IN_PROCESS_SIZE", 0):
+            pooled = self.contract.derive_ata_addresses(
+                "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", owners, mints, processes=2, chunk_size=4)
+            pool = self.contract._ata_pool
+            assert self.contract.derive_ata_addresses(
+                "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", owners, mints, processes=2, chunk_size=4
+            ).keys == pooled.keys
+            assert self.contract._ata_pool is pool
+        assert pooled.keys == in_process.keys
+        assert len(pooled) == 75
+        owner, mint, address = list(pooled)[-1]
+        assert (owner, mint) == (owners[-1], mints[-1])
+        assert address == self.contract._ata_address(
+            "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", owner, mint).to_base58().decode()
+
+    def test_distribute(self) -> None:
+        """Test a batch of recipients gets one idempotent account creation and one mint each, in a single transaction."""
+        payer = SolanaCrypto()
+        nonce_address = PublicKey.create_with_seed(
+            payer.public_key, "nonce0", PublicKey("11111111111111111111111111111111")).to_base58().decode()
+        recipients = [[str(SolanaCrypto().public_key), amount] for amount in range(1, 9)]
+        txn = self.contract.distribute(
+            ledger_api=self.ledger_api,
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            payer_address=payer.address,
+            authority_address=payer.address,
+            mint_address=str(SolanaCrypto().public_key),
+            recipients=recipients,
+            nonce_address=nonce_address,
+            nonce="GfVcyD4kkTrj4bKc7WA9sZCin9JDbdT4Zkd3EittNR1W",
+        )
+        stxn = sTransaction.from_json(json.dumps(txn))
+        # the nonce advance, then a creation and a mint per recipient
+        assert len(stxn.message.instructions) == 1 + 2 * len(recipients)
+        assert bytes(stxn.message.instructions[1].data) == bytes([1])
+        assert self.ledger_api.get_state.call_count == 0
+        signed = sTransaction.from_json(json.dumps(payer.sign_transaction(txn)))
+        assert len(bytes(signed)) <= 1232
+
+
+class TestMintToTemplate:
+    """Test building MintTo transactions from a compiled template."""
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup."""
+        from packages.dassy23.contracts.spl_token_program.contract import MintToTemplate, TokenProgram
+
+        cls.template_class = MintToTemplate
+        cls.builder = TokenProgram
+        cls.program = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+        cls.blockhash = "GfVcyD4kkTrj4bKc7WA9sZCin9JDbdT4Zkd3EittNR1W"
+        cls.payer = str(SolanaCrypto().public_key)
+        cls.mint = str(SolanaCrypto().public_key)
+
+    def _built(self, owner: str, amount: int, authority: str, nonce_address: Optional[str] = None) -> JSONLike:
+        """Build a MintTo transaction with the builder."""
+        ata = self.builder._ata_address(self.program, owner, self.mint)
+        instructions = self.builder._mint_to_instructions(
+            self.program, self.payer, owner, authority, self.mint, amount, ata, True)
+        if nonce_address is not None:
+            return self.builder._durable_transaction(
+                self.payer, instructions, nonce_address, None, self.blockhash)
+        ledger_api = mock.Mock()
+        ledger_api.add_nonce.side_effect = lambda tx: SolanaApi.add_nonce(
+            mock.Mock(_generate_tx_nonce=lambda: self.blockhash), tx)
+        return self.builder._build_transaction(ledger_api, self.payer, instructions)
+
+    @pytest.mark.parametrize("other_authority", [False, True])
+    @pytest.mark.parametrize("durable", [False, True])
+    def test_same_as_builder(self, other_authority: bool, durable: bool) -> None:
+        """Test the template builds the very transactions of the builder, wherever the destination key falls."""
+        authority = str(SolanaCrypto().public_key) if other_authority else self.payer
+        nonce_address = str(SolanaCrypto().public_key) if durable else None
+        template = self.template_class(self.program, self.payer, authority, self.mint, nonce_address)
+        for amount in range(40):
+            owner = str(SolanaCrypto().public_key)
+            ata = self.builder._ata_address(self.program, owner, self.mint)
+            assert template.build(bytes(ata), amount * 10 ** 12, self.blockhash) == self._built(
+                owner, amount * 10 ** 12, authority, nonce_address)
+        # one layout per position of the destination among the other writable accounts
+        assert len(template._layouts) <= (3 if durable else 2)
+
+    def test_mint_to_uses_template(self) -> None:
+        """Test `mint_to` builds from the template once the associated token account exists."""
+        ledger_api = mock.Mock(identifier=SolanaApi.identifier)
+        ledger_api.get_state.return_value = {"exists": True}
+        ledger_api._generate_tx_nonce.return_value = self.blockhash
+        owner = str(SolanaCrypto().public_key)
+        txn = self.builder.mint_to(
+            ledger_api, self.program, self.payer, owner, self.payer, self.mint, 7)
+        assert txn == self._built(owner, 7, self.payer)
+        ledger_api.add_nonce.assert_not_called()
+
+    def test_templates_bounded(self) -> None:
+        """Test the templates of the least recently used payers are dropped once the cache is full."""
+        from packages.dassy23.contracts.spl_token_program.contract import LRUCache
+
+        payers = [str(SolanaCrypto().public_key) for _ in range(3)]
+        with mock.patch.object(self.builder, "_mint_to_templates", LRUCache(2)):
+            first = self.builder._mint_to_template(self.program, payers[0], payers[0], self.mint, None, None)
+            self.builder._mint_to_template(self.program, payers[1], payers[1], self.mint, None, None)
+            assert self.builder._mint_to_template(
+                self.program, payers[0], payers[0], self.mint, None, None) is first
+            self.builder._mint_to_template(self.program, payers[2], payers[2], self.mint, None, None)
+            assert len(self.builder._mint_to_templates) == 2
+            # the second payer was the least recently used
+            assert self.builder._mint_to_template(
+                self.program, payers[0], payers[0], self.mint, None, None) is first
+            assert self.builder._mint_to_templates.get(
+                (self.program, payers[1], payers[1], self.mint, None, None)) is None
+
+
+class TestLookupTables:
+    """Test the address lookup tables, and the v0 transactions built with them."""
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup."""
+        from packages.dassy23.contracts.spl_token_program.contract import (
+            LOOKUP_TABLE_ACTIVE,
+            LOOKUP_TABLE_META_SIZE,
+            TokenProgram,
+        )
+
+        cls.contract = TokenProgram
+        cls.program = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+        cls.payer = SolanaCrypto()
+        cls.mint = str(SolanaCrypto().public_key)
+        cls.recipients = [[str(SolanaCrypto().public_key), amount] for amount in range(1, 11)]
+        cls.table = str(SolanaCrypto().public_key)
+        addresses = [cls.mint, "11111111111111111111111111111111"] + [
+            cls.contract._ata_address(cls.program, owner, cls.mint).to_base58().decode()
+            for owner, _ in cls.recipients
+        ]
+        data = (1).to_bytes(4, "little") + LOOKUP_TABLE_ACTIVE + bytes(LOOKUP_TABLE_META_SIZE - 12)
+        data += b"".join(bytes(PublicKey(address)) for address in addresses)
+        cls.addresses = addresses
+        cls.ledger_api = mock.Mock(identifier=SolanaApi.identifier)
+        cls.ledger_api.add_nonce.side_effect = lambda tx: tx
+        cls.ledger_api.api.get_account_info.return_value = mock.Mock(value=mock.Mock(data=data))
+        cls.contract._lookup_tables.clear()
+
+    def test_create_and_extend(self) -> None:
+        """Test the lookup table is created at the derived address, and extended a few addresses at a time."""
+        self.ledger_api.api.get_slot.return_value = mock.Mock(value=1234)
+        address = self.contract.get_lookup_table_address(self.ledger_api, None, self.payer.address)
+        assert address["recent_slot"] == 1234
+        txn = self.contract.create_lookup_table(
+            self.ledger_api, None, self.payer.address, self.payer.address, 1234, self.addresses[:2])
+        stxn = sTransaction.from_json(json.dumps(txn))
+        create, extend = stxn.message.instructions
+        assert str(stxn.message.account_keys[create.accounts[0]]) == address["address"]
+        assert bytes(create.data)[:12] == (0).to_bytes(4, "little") + (1234).to_bytes(8, "little")
+        assert bytes(extend.data)[4:12] == (2).to_bytes(8, "little")
+
+        with pytest.raises(ValueError):
+            self.contract.extend_lookup_table(
+                self.ledger_api, None, self.payer.address, self.payer.address, address["address"],
+                [str(SolanaCrypto().public_key) for _ in range(21)])
+        assert self.contract.get_lookup_table(self.ledger_api, None, self.table)[self.table] == self.addresses
+
+    def test_distribute_v0(self) -> None:
+        """Test a distribution is built as a smaller v0 transaction looking its accounts up in the table."""
+        kwargs = dict(
+            ledger_api=self.ledger_api,
+            contract_address=self.program,
+            payer_address=self.payer.address,
+            authority_address=self.payer.address,
+            mint_address=self.mint,
+            recipients=self.recipients,
+        )
+        legacy = self.contract.distribute(**kwargs)
+        versioned = self.contract.distribute(lookup_table_address=self.table, **kwargs)
+        assert isinstance(versioned["message"], list)
+        assert len(json.dumps(versioned)) < len(json.dumps(legacy))
+        assert self.ledger_api.api.get_account_info.call_count == 1
+        # the table is cached
+        self.contract.distribute(lookup_table_address=self.table, **kwargs)
+        assert self.ledger_api.api.get_account_info.call_count == 1
+
+    def test_simulate_v0(self) -> None:
+        """Test a v0 transaction is simulated as it is, its compute unit limit left alone."""
+        import base64
+
+        versioned = self.contract.distribute(
+            ledger_api=self.ledger_api,
+            contract_address=self.program,
+            payer_address=self.payer.address,
+            authority_address=self.payer.address,
+            mint_address=self.mint,
+            recipients=self.recipients,
+            lookup_table_address=self.table,
+        )
+        self.ledger_api.api._provider.make_request.return_value = TestDurableNonce._simulation(None, 3000)
+        results = self.contract.simulate_transactions(self.ledger_api, None, [versioned])["results"]
+        assert results[0]["transaction"] == versioned
+        request = self.ledger_api.api._provider.make_request.call_args[0][0]
+        sent = base64.b64decode(json.loads(request.to_json())["params"][0])
+        assert sent == bytes(parse_transaction(versioned))
+
+    def test_tables_bounded(self) -> None:
+        """Test the least recently used lookup tables are dropped once the cache is full."""
+        from packages.dassy23.contracts.spl_token_program.contract import LRUCache
+
+        tables = [str(SolanaCrypto().public_key) for _ in range(3)]
+        with mock.patch.object(self.contract, "_lookup_tables", LRUCache(2)):
+            for table in tables:
+                self.contract._lookup_table(self.ledger_api, table)
+            assert len(self.contract._lookup_tables) == 2
+            assert self.contract._lookup_tables.get(tables[0]) is None
+
+
+def test_parse_transaction() -> None:
+    """Test the JSON of the transactions solders writes, legacy and v0, is read back to the same transactions."""
+    from solders.address_lookup_table_account import AddressLookupTableAccount
+    from solders.hash import Hash
+    from solders.instruction import AccountMeta, Instruction
+    from solders.keypair import Keypair
+    from solders.message import Message, MessageV0
+    from solders.transaction import VersionedTransaction
+
+    payer = Keypair()
+    looked_up = [Keypair().pubkey() for _ in range(3)]
+    instruction = Instruction(
+        payer.pubkey(), bytes([1, 2, 3]), [AccountMeta(key, False, True) for key in looked_up])
+    legacy = sTransaction(
+        [payer], Message.new_with_blockhash([instruction], payer.pubkey(), Hash.default()), Hash.default())
+    table = AddressLookupTableAccount(Keypair().pubkey(), looked_up)
+    versioned = VersionedTransaction(
+        MessageV0.try_compile(payer.pubkey(), [instruction], [table], Hash.default()), [payer])
+    for transaction in (legacy, versioned):
+        txn = json.loads(transaction.to_json())
+        assert bytes(parse_transaction(txn)) == bytes(transaction)
+        assert transaction_signature(txn) == str(transaction.signatures[0])
+    assert not is_versioned_transaction(json.loads(legacy.to_json()))
+    assert is_versioned_transaction(json.loads(versioned.to_json()))
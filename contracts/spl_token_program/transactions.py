@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2022 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the reading of the JSON of the transactions the contract builds, legacy or versioned."""
+
+import json
+from typing import Any, Iterator, Union
+
+from aea.common import JSONLike
+from solders.transaction import Transaction as sTransaction, VersionedTransaction
+
+
+def is_versioned_transaction(txn: JSONLike) -> bool:
+    """
+    Check whether a transaction is a versioned one, e.g. a v0 one with address lookup tables.
+
+    :param txn: the transaction.
+    :return: whether its message is prefixed by its version.
+    """
+    return isinstance(txn.get("message"), list)
+
+
+def parse_transaction(txn: JSONLike) -> Union[sTransaction, VersionedTransaction]:
+    """
+    Parse a transaction, legacy or versioned.
+
+    solders cannot read back the JSON of a versioned transaction, whose message is prefixed by its
+    version, but that JSON mirrors its wire format, lengths included, so the bytes are read off it.
+
+    :param txn: the transaction.
+    :return: the solders transaction.
+    """
+    if not is_versioned_transaction(txn):
+        return sTransaction.from_json(json.dumps(txn))
+    return VersionedTransaction.from_bytes(bytes(_wire_format(txn)))
+
+
+def _wire_format(value: Any) -> Iterator[int]:
+    """Walk the bytes of the JSON of a solders object, in order."""
+    if isinstance(value, int):
+        yield value
+        return
+    for item in value.values() if isinstance(value, dict) else value:
+        yield from _wire_format(item)
+
+
+def transaction_signature(txn: JSONLike) -> str:
+    """
+    Get the signature, which is also the transaction digest, of a signed transaction.
+
+    :param txn: the signed transaction, legacy or versioned.
+    :return: the signature of its fee payer.
+    """
+    return str(parse_transaction(txn).signatures[0])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains an index of the token balances and supplies, kept up to date from the transaction receipts."""
+
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+def token_balance_changes(meta: Dict[str, Any]) -> List[Tuple[str, str, int, int]]:
+    """
+    Read the token balances a transaction changed off the meta of its receipt.
+
+    :param meta: the meta of the receipt, with its `preTokenBalances` and `postTokenBalances`
+    :return: the owner, the mint, the balance before and the balance after, of every token account
+    """
+    pre = {
+        balance["accountIndex"]: int(balance["uiTokenAmount"]["amount"])
+        for balance in meta.get("preTokenBalances") or []
+    }
+    return [
+        (
+            balance["owner"],
+            balance["mint"],
+            pre.get(balance["accountIndex"], 0),
+            int(balance["uiTokenAmount"]["amount"]),
+        )
+        for balance in meta.get("postTokenBalances") or []
+    ]
+
+
+class TokenBalances:
+    """
+    This class indexes the token balances by owner and mint, and the supply of the mints.
+
+    Every settled transaction moves the balances it touched by the difference of its pre and post
+    token balances, and the supply of a mint by their sum, so the index is read from memory without
+    any request. An owner the index has not seen yet is taken at its post balance, and a supply is
+    only known once it was read from the chain.
+
+    The index is checked against the chain every `check_interval` seconds. A read is as of its slot:
+    the receipts of later slots already applied are added on top of it, and the ones of earlier
+    slots which come in after it are left out, so that no transaction is counted twice or missed.
+    """
+
+    def __init__(self, check_interval: float = 600) -> None:
+        """Initialize the index."""
+        self.check_interval = check_interval
+        self._balances: Dict[Tuple[str, str], int] = {}
+        self._supplies: Dict[str, int] = {}
+        self._read_slots: Dict[Hashable, int] = {}
+        self._applied: List[Tuple[int, Hashable, int]] = []
+        self._oldest_read_slot: Optional[int] = None
+        self._checked_at = 0.0
+        self.receipts = 0
+        self.corrections = 0
+
+    def balance(self, owner: str, mint: str) -> Optional[int]:
+        """
+        Get the balance of an owner in a mint.
+
+        :param owner: the owner
+        :param mint: the mint
+        :return: the balance, or None if the index does not know it
+        """
+        return self._balances.get((owner, mint))
+
+    def supply(self, mint: str) -> Optional[int]:
+        """
+        Get the supply of a mint.
+
+        :param mint: the mint
+        :return: the supply, or None if the index does not know it
+        """
+        return self._supplies.get(mint)
+
+    def on_receipt(self, meta: Dict[str, Any], slot: int) -> Dict[str, int]:
+        """
+        Move the balances and the supplies by the token balances a settled transaction changed.
+
+        :param meta: the meta of the receipt
+        :param slot: the slot the transaction landed in
+        :return: the change of supply of every mint the transaction touched
+        """
+        supply_changes: Dict[str, int] = {}
+        for owner, mint, before, after in token_balance_changes(meta):
+            supply_changes[mint] = supply_changes.get(mint, 0) + after - before
+            key = (owner, mint)
+            if key not in self._balances:
+                self._balances[key] = after
+                self._read_slots[key] = slot
+            elif slot > self._read_slots.get(key, -1):
+                self._balances[key] += after - before
+                self._applied.append((slot, key, after - before))
+        for mint, change in supply_changes.items():
+            if mint in self._supplies and slot > self._read_slots.get(mint, -1):
+                self._supplies[mint] += change
+                self._applied.append((slot, mint, change))
+        self.receipts += 1
+        return supply_changes
+
+    def is_check_due(self, now: Optional[float] = None) -> bool:
+        """Check whether the index is due to be checked against the chain."""
+        now = time.time() if now is None else now
+        return now - self._checked_at >= self.check_interval
+
+    def checking(self, now: Optional[float] = None) -> None:
+        """Record that the index is being checked against the chain, forgetting the receipts older than the previous reads."""
+        self._checked_at = time.time() if now is None else now
+        if self._oldest_read_slot is not None:
+            self._applied = [applied for applied in self._applied if applied[0] > self._oldest_read_slot]
+            self._oldest_read_slot = None
+
+    def check_balances(self, owner: str, balances: Dict[str, int], slot: int) -> List[str]:
+        """
+        Correct the balances of an owner with the ones read from the chain.
+
+        :param owner: the owner
+        :param balances: the balances read from the chain, by mint
+        :param slot: the slot they were read at
+        :return: the mints whose balance had drifted
+        """
+        return [
+            mint
+            for mint, amount in balances.items()
+            if self._correct(self._balances, (owner, mint), amount, slot)
+        ]
+
+    def check_supply(self, mint: str, supply: int, slot: int) -> bool:
+        """
+        Correct the supply of a mint with the one read from the chain.
+
+        :param mint: the mint
+        :param supply: the supply read from the chain
+        :param slot: the slot it was read at
+        :return: whether the supply had drifted
+        """
+        return self._correct(self._supplies, mint, supply, slot)
+
+    def report(self) -> str:
+        """Get the size of the index and how often it drifted."""
+        return (
+            f"Indexed {len(self._balances)} token balances and {len(self._supplies)} supplies "
+            f"from {self.receipts} receipts, with {self.corrections} corrections."
+        )
+
+    def _correct(self, values: Dict[Any, int], key: Hashable, value: int, slot: int) -> bool:
+        """Set a value to the one read from the chain at a slot, plus the receipts of the later slots."""
+        if slot < self._read_slots.get(key, -1):
+            # a newer read is already in
+            return False
+        expected = value + sum(
+            change for applied_slot, applied_key, change in self._applied
+            if applied_key == key and applied_slot > slot
+        )
+        drifted = key in values and values[key] != expected
+        values[key] = expected
+        self._read_slots[key] = slot
+        self._oldest_read_slot = slot if self._oldest_read_slot is None else min(self._oldest_read_slot, slot)
+        self.corrections += int(drifted)
+        return drifted
@@ -18,12 +18,33 @@
 # ------------------------------------------------------------------------------
 
 """This package contains a scaffold of a behaviour."""
+import time
+
 from aea.skills.behaviours import TickerBehaviour
 
 from typing import cast
 from packages.dassy23.skills.spl_token_skill.dialogues import LedgerApiDialogues, ContractApiDialogues, ContractApiDialogue
+from packages.dassy23.skills.spl_token_skill.distribution import (
+    Distribution,
+    DistributionBatch,
+)
+from packages.dassy23.skills.spl_token_skill.fee_payers import FeePayerPool
+from packages.dassy23.skills.spl_token_skill.journal import (
+    MintJournal,
+    journal_entry_id,
+    transaction_signature,
+)
+from packages.dassy23.skills.spl_token_skill.mint_pool import MintPool, PresignedMint
+from packages.dassy23.skills.spl_token_skill.scheduler import (
+    MintScheduler,
+    MintSpec,
+    PlannedMint,
+)
 from packages.dassy23.skills.spl_token_skill.strategy import Strategy
-from aea_ledger_solana import PublicKey
+from packages.dassy23.skills.spl_token_skill.token_requests import (
+    TokenRequestBatch,
+    TokenRequests,
+)
 
 from aea.configurations.base import PublicId
 from packages.valory.protocols.ledger_api.message import LedgerApiMessage
@@ -42,69 +63,369 @@ class TokenProgramBehaviour(TickerBehaviour):
         self.service_interval = kwargs.pop('service_interval')
         super(TokenProgramBehaviour, self).__init__(
             tick_interval=self.service_interval, **kwargs)
+        self._journal_recovered = False
+        self._mints_scheduled = False
+
+    def _resume_unfinished_mints(self):
+        """
+        Resume tracking the mints a previous run left unfinished in the journal.
 
-    def _create_mint_if_doesnt_exists(self):
-        self.log(f"Querying contract to see if mint has already been created...")
+        The scheduler already has them in flight, as it rebuilt itself from the journal on setup.
+        """
+        journal = cast(MintJournal, self.context.journal)
+        for entry_id, status, signature, _ in journal.unfinished():
+            if signature is None:
+                # never signed, so it cannot have landed
+                journal.abandoned(entry_id)
+                continue
+            self.log(
+                f"Resuming receipt tracking of {signature} ({status.value} before restart)")
+            self.request_receipt(signature)
+        journal.flush()
+
+    def request_receipt(self, signature: str):
+        """Request the receipt of a sent transaction."""
+        strategy = cast(Strategy, self.context.strategy)
+        ledger_api_dialogues = cast(
+            LedgerApiDialogues, self.context.ledger_api_dialogues)
+        ledger_api_msg, _ = ledger_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
+            transaction_digest=LedgerApiMessage.TransactionDigest(
+                strategy.ledger_id, signature),
+        )
+        self.context.outbox.put_message(message=ledger_api_msg)
+
+    def _send_presigned_mint(self, planned: PlannedMint, presigned_mint: PresignedMint):
+        """Send a mint signed ahead of time on a durable nonce."""
+        journal = cast(MintJournal, self.context.journal)
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        entry_id = journal_entry_id(presigned_mint.contract_api_dialogue)
+        signature = transaction_signature(presigned_mint.signed_transaction)
+        scheduler.attach(planned, entry_id, can_expire=False)
+        journal.signed(entry_id, signature, scheduler.journal_data(entry_id))
+        journal.flush()
+        mint_pool.track(presigned_mint.nonce_address, signature)
+        self.log(f"Sending mint {planned.key} signed ahead of time")
+        self.context.handlers.signing_handler.send_signed_transaction(
+            presigned_mint.signed_transaction, presigned_mint.signing_dialogue)
+
+    def _refill_mint_pool(self):
+        """Read the nonce of every nonce account of the mint pool which needs a new signed mint, or whose mint got no receipt."""
+        mint_pool = cast(MintPool, self.context.mint_pool)
         contract_api_dialogues = cast(
             ContractApiDialogues, self.context.contract_api_dialogues)
-        strategy = cast(Strategy, self.context.strategy)
+        for nonce_account in mint_pool.accounts_to_query() + mint_pool.accounts_to_check():
+            contract_api_msg, _ = contract_api_dialogues.create(
+                counterparty=LEDGER_API_ADDRESS,
+                performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+                ledger_id="solana",
+                contract_id="dassy23/spl_token_program:0.1.0",
+                contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+                callable="get_nonce_info",
+                kwargs=ContractApiMessage.Kwargs(
+                    {"nonce_address": nonce_account.address}),
+            )
+            self.context.outbox.put_message(message=contract_api_msg)
 
+    def request_mint(self, planned: PlannedMint) -> str:
+        """Request the transaction of a planned mint, returning its journal identifier."""
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+        strategy = cast(Strategy, self.context.strategy)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        payer_address = fee_payers.choose()
         contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
             counterparty=LEDGER_API_ADDRESS,
-            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,  # type: ignore
             ledger_id="solana",
             contract_id="dassy23/spl_token_program:0.1.0",
             contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
-            callable="get_mint_info",
+            callable="mint_to",
             kwargs=ContractApiMessage.Kwargs(
                 {
-                    "mint_address": PublicKey.create_with_seed(PublicKey(self.context.agent_address), strategy.mint_seed, PublicKey("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")),
+                    "payer_address": payer_address,
+                    "destination_owner_address": planned.destination,
+                    "authority_address": self.context.agent_address,
+                    "mint_address": planned.mint_address,
+                    "amount": planned.amount,
                 }
             ),
         )
+        contract_api_dialogue.terms = strategy.get_deploy_terms()
+        scheduler.attach(planned, journal_entry_id(contract_api_dialogue))
+        fee_payers.attach(journal_entry_id(contract_api_dialogue), payer_address)
 
         self.context.outbox.put_message(message=contract_api_msg)
+        return journal_entry_id(contract_api_dialogue)
 
-    def setup(self) -> None:
-        """Implement the setup."""
-        self.log = self.context.logger.info
-        self.log(f"Token Minter started")
-
-        # raise NotImplementedError
+    def distribute(self):
+        """Request the transactions of the next batches of the distribution, as many as can be in flight."""
+        distribution = cast(Distribution, self.context.distribution)
+        batch = distribution.next_batch()
+        while batch is not None:
+            self.request_distribution(batch)
+            batch = distribution.next_batch()
 
-    def act(self) -> None:
-        """Implement the act."""
-        self.log = self.context.logger.info
+    def request_distribution(self, batch: DistributionBatch) -> str:
+        """Request the transaction of a batch of the distribution, returning its journal identifier."""
         contract_api_dialogues = cast(
             ContractApiDialogues, self.context.contract_api_dialogues)
         strategy = cast(Strategy, self.context.strategy)
-        mint_addresss = PublicKey.create_with_seed(PublicKey(self.context.agent_address), strategy.mint_seed, PublicKey(
-            "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")).to_base58().decode()
-        if strategy.mint_exists:
+        distribution = cast(Distribution, self.context.distribution)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        payer_address = fee_payers.choose()
+        kwargs = {
+            "payer_address": payer_address,
+            "authority_address": self.context.agent_address,
+            "mint_address": strategy.mint_address,
+            "recipients": [list(recipient) for recipient in batch.recipients],
+            "transfer": distribution.transfer,
+        }
+        if distribution.lookup_table is not None:
+            kwargs["lookup_table_address"] = distribution.lookup_table
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,  # type: ignore
+            ledger_id="solana",
+            contract_id="dassy23/spl_token_program:0.1.0",
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            callable="distribute",
+            kwargs=ContractApiMessage.Kwargs(kwargs),
+        )
+        contract_api_dialogue.terms = strategy.get_deploy_terms()
+        distribution.attach(batch, journal_entry_id(contract_api_dialogue))
+        fee_payers.attach(journal_entry_id(contract_api_dialogue), payer_address)
+        self.context.outbox.put_message(message=contract_api_msg)
+        return journal_entry_id(contract_api_dialogue)
+
+    def _tend_fee_payers(self):
+        """Top up the fee payers found short of lamports on the previous tick, and read the balances of the others."""
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        strategy = cast(Strategy, self.context.strategy)
+        recipients = fee_payers.top_ups_due()
+        if len(recipients) > 0:
+            self.log(
+                f"Topping up fee payers {[address for address, _ in recipients]}")
+            contract_api_dialogues = cast(
+                ContractApiDialogues, self.context.contract_api_dialogues)
             contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
                 counterparty=LEDGER_API_ADDRESS,
                 performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,  # type: ignore
                 ledger_id="solana",
                 contract_id="dassy23/spl_token_program:0.1.0",
                 contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
-                callable="mint_to",
+                callable="transfer_lamports",
                 kwargs=ContractApiMessage.Kwargs(
                     {
                         "payer_address": self.context.agent_address,
-                        "destination_owner_address": self.context.agent_address,
-                        "authority_address": self.context.agent_address,
-                        "mint_address": mint_addresss,
-                        "amount": strategy.mint_amount,
+                        "recipients": recipients,
                     }
                 ),
             )
             contract_api_dialogue.terms = strategy.get_deploy_terms()
+            fee_payers.topping_up(
+                journal_entry_id(contract_api_dialogue),
+                [address for address, _ in recipients])
+            self.context.outbox.put_message(message=contract_api_msg)
 
+        ledger_api_dialogues = cast(
+            LedgerApiDialogues, self.context.ledger_api_dialogues)
+        for address in fee_payers.payers_to_check():
+            ledger_api_msg, _ = ledger_api_dialogues.create(
+                counterparty=LEDGER_API_ADDRESS,
+                performative=LedgerApiMessage.Performative.GET_BALANCE,
+                ledger_id=strategy.ledger_id,
+                address=address,
+            )
+            self.context.outbox.put_message(message=ledger_api_msg)
+
+    def _check_token_balances(self):
+        """Read the balances of the agent and the supplies of its mints, to check the index of the strategy against them."""
+        strategy = cast(Strategy, self.context.strategy)
+        if not strategy.token_balances.is_check_due():
+            return
+        strategy.token_balances.checking()
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+        requests = [("get_balances", {"owner_address": self.context.agent_address})] + [
+            ("get_mint_info", {"mint_address": mint_address})
+            for mint_address in strategy.existing_mints
+        ]
+        for callable_name, kwargs in requests:
+            contract_api_msg, _ = contract_api_dialogues.create(
+                counterparty=LEDGER_API_ADDRESS,
+                performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+                ledger_id="solana",
+                contract_id="dassy23/spl_token_program:0.1.0",
+                contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+                callable=callable_name,
+                kwargs=ContractApiMessage.Kwargs(kwargs),
+            )
             self.context.outbox.put_message(message=contract_api_msg)
-        else:
-            self.log(f"Mint does not exist, creating it...")
-            self._create_mint_if_doesnt_exists()
+
+    def _create_mint_if_doesnt_exists(self, spec: MintSpec):
+        self.log(f"Querying contract to see if mint {spec.seed} has already been created...")
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            ledger_id="solana",
+            contract_id="dassy23/spl_token_program:0.1.0",
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            callable="get_mint_info",
+            kwargs=ContractApiMessage.Kwargs(
+                {
+                    "mint_address": spec.mint_address,
+                }
+            ),
+        )
+
+        self.context.outbox.put_message(message=contract_api_msg)
+
+    def mint_due(self):
+        """Plan the mints whose interval has started, to every recipient of each, and request their transactions."""
+        strategy = cast(Strategy, self.context.strategy)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        distribution = cast(Distribution, self.context.distribution)
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        if not self._mints_scheduled:
+            for spec in strategy.mint_specs:
+                scheduler.schedule(spec, spec.interval or self.service_interval)
+            self._mints_scheduled = True
+        now = time.time()
+        due = scheduler.next_due(now)
+        while due is not None:
+            spec, interval = due
+            if spec.mint_address not in strategy.existing_mints:
+                self.log(f"Mint {spec.seed} does not exist, creating it...")
+                self._create_mint_if_doesnt_exists(spec)
+            elif spec.mint_address != strategy.mint_address or not distribution.is_enabled:
+                for destination in spec.recipients:
+                    planned = scheduler.plan(
+                        spec.mint_address, destination, interval, spec.amount, now)
+                    if planned is None:
+                        continue
+                    # the mints signed ahead of time are all of the mint of the seed to the agent
+                    presigned_mint = mint_pool.take(planned.amount) if (
+                        spec.mint_address == strategy.mint_address
+                        and destination == self.context.agent_address) else None
+                    if presigned_mint is not None:
+                        self._send_presigned_mint(planned, presigned_mint)
+                    else:
+                        self.request_mint(planned)
+            due = scheduler.next_due(now)
+
+    def setup(self) -> None:
+        """Implement the setup."""
+        self.log = self.context.logger.info
+        self.log(f"Token Minter started")
+
+        # raise NotImplementedError
+
+    def act(self) -> None:
+        """Implement the act."""
+        self.log = self.context.logger.info
+        strategy = cast(Strategy, self.context.strategy)
+        journal = cast(MintJournal, self.context.journal)
+        if not self._journal_recovered:
+            self._resume_unfinished_mints()
+            self._journal_recovered = True
+        journal.flush()
+        # simulate and sign whatever is left over from the previous tick, even if the batch is not full
+        self.context.handlers.contract_handler.request_simulation()
+        self.context.handlers.contract_handler.request_batch_signing()
+        self._tend_fee_payers()
+        distribution = cast(Distribution, self.context.distribution)
+        if strategy.mint_exists and distribution.is_enabled:
+            if not distribution.is_done:
+                for signature in distribution.expire():
+                    self.log(f"Batch {signature} timed out, reading its receipt again")
+                    self.request_receipt(signature)
+                self.distribute()
+                self.log(distribution.report())
+        self.mint_due()
+        self._check_token_balances()
+        if strategy.mint_exists and not distribution.is_enabled:
+            self._refill_mint_pool()
 
     def teardown(self) -> None:
         """Implement the task teardown."""
-        # raise NotImplementedError
+        self.context.logger.info(
+            cast(Strategy, self.context.strategy).token_balances.report())
+
+
+class TokenRequestBehaviour(TickerBehaviour):
+    """This class mints the token requests other agents accepted, a batch of them per transaction."""
+
+    def __init__(self, **kwargs):
+        tick_interval = kwargs.pop('tick_interval', 1.0)
+        super(TokenRequestBehaviour, self).__init__(
+            tick_interval=tick_interval, **kwargs)
+
+    def setup(self) -> None:
+        """Implement the setup."""
+
+    def act(self) -> None:
+        """Give up on the batches in flight for too long, and flush the queue if it is due."""
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        expired, signatures = token_requests.expire()
+        for entry_id, batch in expired:
+            cast(FeePayerPool, self.context.fee_payers).release(entry_id)
+            self.context.handlers.fipa_handler.inform(
+                batch, {"status": "failed", "reason": "timed out"})
+        for signature in signatures:
+            self.context.logger.info(
+                f"Token requests of {signature} timed out, reading their receipt again.")
+            self.context.behaviours.scaffold.request_receipt(signature)
+        if token_requests.is_due():
+            self.flush()
+
+    def flush(self) -> None:
+        """Request the transactions of all the queued token requests."""
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        batches = token_requests.flush()
+        for batch in batches:
+            self.request_batch(batch)
+        self.context.logger.info(
+            f"Minting {sum(len(batch.requests) for batch in batches)} token requests in {len(batches)} transactions.")
+
+    def request_batch(self, batch: TokenRequestBatch) -> str:
+        """Request the transaction minting a batch of token requests, returning its journal identifier."""
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+        strategy = cast(Strategy, self.context.strategy)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        payer_address = fee_payers.choose()
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,  # type: ignore
+            ledger_id="solana",
+            contract_id="dassy23/spl_token_program:0.1.0",
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            callable="distribute",
+            kwargs=ContractApiMessage.Kwargs(
+                {
+                    "payer_address": payer_address,
+                    "authority_address": self.context.agent_address,
+                    "mint_address": strategy.mint_address,
+                    "recipients": [list(recipient) for recipient in batch.recipients],
+                    "transfer": False,
+                }
+            ),
+        )
+        contract_api_dialogue.terms = strategy.get_deploy_terms()
+        token_requests.attach(batch, journal_entry_id(contract_api_dialogue))
+        fee_payers.attach(journal_entry_id(contract_api_dialogue), payer_address)
+        self.context.outbox.put_message(message=contract_api_msg)
+        return journal_entry_id(contract_api_dialogue)
+
+    def teardown(self) -> None:
+        """Log the token requests served."""
+        self.context.logger.info(
+            cast(TokenRequests, self.context.token_requests).report())
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains a decision maker handler which also signs batches of transactions, versioned ones, and ones paid by a pool of fee payers."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from aea.common import JSONLike
+from aea.crypto.wallet import Wallet
+from aea.decision_maker.default import (
+    DecisionMakerHandler as BaseDecisionMakerHandler,
+)
+from aea.helpers.transaction.base import SignedTransaction
+from aea.identity.base import Identity
+from aea_ledger_solana import SolanaApi, SolanaCrypto
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+
+from packages.dassy23.contracts.spl_token_program.transactions import (
+    is_versioned_transaction,
+    parse_transaction,
+)
+from packages.dassy23.skills.spl_token_skill import PUBLIC_ID as SKILL_PUBLIC_ID
+from packages.open_aea.protocols.signing.dialogues import SigningDialogue
+from packages.open_aea.protocols.signing.message import SigningMessage
+
+
+class DecisionMakerHandler(BaseDecisionMakerHandler):
+    """
+    This class implements a decision maker which handles 'sign_transactions' requests and versioned Solana transactions.
+
+    The Solana keys listed under `fee_payer_key_paths` in the `config` of the handler also sign the
+    transactions which need them, i.e. the ones paid by a fee payer of the pool of the skill. They
+    only sign as the fee payer of a transaction, and only for the skills listed under
+    `fee_payer_skills`, by default this one.
+    """
+
+    def __init__(
+        self, identity: Identity, wallet: Wallet, config: Dict[str, Any]
+    ) -> None:
+        """
+        Initialize the decision maker.
+
+        :param identity: the identity
+        :param wallet: the wallet
+        :param config: the user defined configuration of the handler
+        """
+        super().__init__(identity, wallet, config)
+        self.fee_payers: Dict[Pubkey, Keypair] = {}
+        for path in config.get("fee_payer_key_paths") or []:
+            keypair = SolanaCrypto(private_key_path=path).entity.to_solders()
+            self.fee_payers[keypair.pubkey()] = keypair
+        self.fee_payer_skills = set(
+            config.get("fee_payer_skills") or [str(SKILL_PUBLIC_ID)]
+        )
+
+    def _handle_signing_message(self, signing_msg: SigningMessage) -> None:
+        """
+        Handle a signing message.
+
+        :param signing_msg: the transaction message
+        """
+        if signing_msg.performative != SigningMessage.Performative.SIGN_TRANSACTIONS:
+            super()._handle_signing_message(signing_msg)
+            return
+
+        signing_dialogue = self.signing_dialogues.update(signing_msg)
+        if signing_dialogue is None or not isinstance(
+            signing_dialogue, self.signing_dialogue_class
+        ):  # pragma: no cover
+            self.logger.error(
+                "[{}]: Could not construct signing dialogue. Aborting!".format(
+                    self.agent_name
+                )
+            )
+            return
+        self._handle_transactions_signing(signing_msg, signing_dialogue)
+
+    def _handle_transaction_signing(
+        self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Handle a transaction for signing.
+
+        :param signing_msg: the signing message
+        :param signing_dialogue: the signing dialogue
+        """
+        signed_tx = self._sign_transaction(
+            signing_msg.raw_transaction.ledger_id,
+            signing_msg.raw_transaction.body,
+            signing_msg.sender,
+        )
+        if signed_tx is None:
+            signing_msg_response = signing_dialogue.reply(
+                performative=SigningMessage.Performative.ERROR,
+                target_message=signing_msg,
+                error_code=SigningMessage.ErrorCode.UNSUCCESSFUL_TRANSACTION_SIGNING,
+            )
+        else:
+            signing_msg_response = signing_dialogue.reply(
+                performative=SigningMessage.Performative.SIGNED_TRANSACTION,
+                target_message=signing_msg,
+                signed_transaction=SignedTransaction(
+                    signing_msg.raw_transaction.ledger_id, signed_tx
+                ),
+            )
+        self.message_out_queue.put(signing_msg_response)
+
+    def _handle_transactions_signing(
+        self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Handle a batch of transactions for signing.
+
+        The batch is signed as a whole: if any transaction fails to sign, an error is returned for all of them.
+
+        :param signing_msg: the signing message
+        :param signing_dialogue: the signing dialogue
+        """
+        signed_transactions: List[SignedTransaction] = []
+        for raw_transaction in signing_msg.raw_transactions:
+            signed_tx = self._sign_transaction(
+                raw_transaction.ledger_id, raw_transaction.body, signing_msg.sender
+            )
+            if signed_tx is None:
+                signing_msg_response = signing_dialogue.reply(
+                    performative=SigningMessage.Performative.ERROR,
+                    target_message=signing_msg,
+                    error_code=SigningMessage.ErrorCode.UNSUCCESSFUL_TRANSACTION_SIGNING,
+                )
+                self.message_out_queue.put(signing_msg_response)
+                return
+            signed_transactions.append(
+                SignedTransaction(raw_transaction.ledger_id, signed_tx)
+            )
+
+        signing_msg_response = signing_dialogue.reply(
+            performative=SigningMessage.Performative.SIGNED_TRANSACTIONS,
+            target_message=signing_msg,
+            signed_transactions=SigningMessage.SignedTransactions(signed_transactions),
+        )
+        self.message_out_queue.put(signing_msg_response)
+
+    def _sign_transaction(
+        self, ledger_id: str, transaction: JSONLike, requester: str
+    ) -> Optional[JSONLike]:
+        """
+        Sign a transaction with the wallet, or with the keys it needs if it is a Solana one the wallet cannot sign alone.
+
+        The Solana crypto of the wallet only signs legacy transactions, with its own key. Versioned
+        transactions, and the ones which a key of the fee payers must sign too, are signed with all
+        the keys they need that the decision maker holds. A key of the fee payers only signs a
+        transaction it pays the fees of, requested by a skill of `fee_payer_skills`. The signatures
+        of the other signers, if any, are kept.
+
+        :param ledger_id: the ledger id
+        :param transaction: the transaction
+        :param requester: the skill which requested the signature
+        :return: the signed transaction, or None if it could not be signed
+        """
+        if ledger_id != SolanaApi.identifier:
+            return self.wallet.sign_transaction(ledger_id, transaction)
+        is_versioned = is_versioned_transaction(transaction)
+        if not is_versioned and not self.fee_payers:
+            return self.wallet.sign_transaction(ledger_id, transaction)
+        crypto = self.wallet.crypto_objects.get(ledger_id)
+        if crypto is None:
+            return None
+        try:
+            txn = parse_transaction(transaction)
+            signers = txn.message.account_keys[
+                : txn.message.header.num_required_signatures
+            ]
+            keypair = crypto.entity.to_solders()
+            keypairs = {keypair.pubkey(): keypair}
+            fee_payer = signers[0] if len(signers) > 0 else None
+            if requester in self.fee_payer_skills and fee_payer in self.fee_payers:
+                keypairs[fee_payer] = self.fee_payers[fee_payer]
+            if not is_versioned:
+                txn.partial_sign(
+                    [keypairs[signer] for signer in signers if signer in keypairs],
+                    txn.message.recent_blockhash,
+                )
+                return json.loads(txn.to_json())
+            message = bytes(txn.message)
+            signatures = [
+                keypairs[signer].sign_message(message)
+                if signer in keypairs
+                else existing
+                for signer, existing in zip(signers, txn.signatures)
+            ]
+            return json.loads(
+                VersionedTransaction.populate(txn.message, signatures).to_json()
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning(
+                f"[{self.agent_name}]: Could not sign the transaction: {e}"
+            )
+            return None
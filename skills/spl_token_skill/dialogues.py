@@ -23,7 +23,7 @@ This module contains the classes required for dialogue management.
 - Dialogues: The dialogues class keeps track of all dialogues.
 """
 
-from typing import Any, Optional, Type
+from typing import Any, Optional, Tuple, Type
 
 from aea.common import Address
 from aea.exceptions import enforce
@@ -246,7 +246,10 @@ class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
 class SigningDialogue(BaseSigningDialogue):
     """The dialogue class maintains state of a dialogue and manages it."""
 
-    __slots__ = ("_associated_contract_api_dialogue",)
+    __slots__ = (
+        "_associated_contract_api_dialogue",
+        "_associated_contract_api_dialogues",
+    )
 
     def __init__(
         self,
@@ -272,6 +275,9 @@ class SigningDialogue(BaseSigningDialogue):
         self._associated_contract_api_dialogue = (
             None
         )  # type: Optional[ContractApiDialogue]
+        self._associated_contract_api_dialogues = (
+            None
+        )  # type: Optional[Tuple[ContractApiDialogue, ...]]
 
     @property
     def associated_contract_api_dialogue(self) -> ContractApiDialogue:
@@ -291,6 +297,24 @@ class SigningDialogue(BaseSigningDialogue):
         )
         self._associated_contract_api_dialogue = associated_contract_api_dialogue
 
+    @property
+    def associated_contract_api_dialogues(self) -> Tuple[ContractApiDialogue, ...]:
+        """Get the contract api dialogues of a batch, in the order of its transactions."""
+        if self._associated_contract_api_dialogues is None:
+            raise ValueError("Associated contract api dialogues not set!")
+        return self._associated_contract_api_dialogues
+
+    @associated_contract_api_dialogues.setter
+    def associated_contract_api_dialogues(
+        self, associated_contract_api_dialogues: Tuple[ContractApiDialogue, ...]
+    ) -> None:
+        """Set the contract api dialogues of a batch."""
+        enforce(
+            self._associated_contract_api_dialogues is None,
+            "Associated contract api dialogues already set!",
+        )
+        self._associated_contract_api_dialogues = associated_contract_api_dialogues
+
 
 class SigningDialogues(Model, BaseSigningDialogues):
     """This class keeps track of all oef_search dialogues."""
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains a distribution of tokens to the recipients streamed from a file."""
+
+import csv
+import json
+import os
+import time
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Tuple, cast
+
+from aea.skills.base import Model
+from solders.pubkey import Pubkey
+
+
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+
+
+class DistributionBatch(NamedTuple):
+    """The recipients of a file paid in a single transaction."""
+
+    index: int
+    end_offset: int
+    recipients: List[Tuple[str, int]]
+    planned_at: float
+
+
+def parse_recipient(line: str, is_jsonl: bool) -> Tuple[str, int]:
+    """
+    Parse a recipient line of a distribution file.
+
+    :param line: a CSV line `owner,amount`, or a JSON line `{"owner": ..., "amount": ...}`
+    :param is_jsonl: whether the line is a JSON line
+    :return: the owner address and the amount
+    :raises ValueError: if the line is not a valid recipient
+    """
+    if is_jsonl:
+        record = json.loads(line)
+        owner, amount = record["owner"], record["amount"]
+    else:
+        owner, amount = next(csv.reader([line]))[:2]
+    owner = str(owner).strip()
+    amount = int(amount)
+    Pubkey.from_string(owner)
+    if amount <= 0:
+        raise ValueError(f"Amount {amount} is not positive.")
+    return owner, amount
+
+
+class Distribution(Model):
+    """
+    This class pays the recipients of a CSV or JSONL file, in batches of a few per transaction.
+
+    The file is read a line at a time, only as far as the batches in flight need, so its size does
+    not matter. At most `distribution_concurrency` batches are in flight. Batches can finish out of
+    order, so the checkpoint holds the offset of the file up to which every batch has finished, and
+    the signature of every batch signed past it. On restart the file is read again from that offset,
+    skipping the batches already signed, whose receipts are tracked again from the mint journal.
+    A batch only fails once its outcome is final, and its recipients are then appended to
+    `distribution_failures_path`, itself a JSONL file which can be distributed again.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the distribution."""
+        self.distribution_path = kwargs.pop("distribution_path", None)
+        self.mode = kwargs.pop("distribution_mode", "mint")
+        self.batch_size = kwargs.pop("distribution_batch_size", 8)
+        # the address lookup table the batches are built as v0 transactions with, if any
+        self.lookup_table = kwargs.pop("distribution_lookup_table", None)
+        self.concurrency = kwargs.pop("distribution_concurrency", 4)
+        self.timeout = kwargs.pop("distribution_timeout", 150)
+        self.checkpoint_path = kwargs.pop(
+            "distribution_checkpoint_path", "distribution_checkpoint.json"
+        )
+        self.failures_path = kwargs.pop(
+            "distribution_failures_path", "distribution_failures.jsonl"
+        )
+        self.is_done = False
+        self._file: Optional[IO[bytes]] = None
+        self._is_jsonl = False
+        self._offset = 0
+        self._index = 0
+        self._next_index = 0
+        self._in_flight: Dict[str, DistributionBatch] = {}
+        self._signatures: Dict[str, str] = {}
+        self._skipped: Dict[int, int] = {}
+        self._finished: Dict[int, int] = {}
+        self._started_at = time.time()
+        self.recipients = 0
+        self.transactions = 0
+        self.failed = 0
+        super().__init__(*args, **kwargs)
+
+    @property
+    def is_enabled(self) -> bool:
+        """Check whether the agent distributes from a file rather than minting to itself."""
+        return self.distribution_path is not None
+
+    @property
+    def transfer(self) -> bool:
+        """Check whether the tokens of the agent are transferred rather than minted."""
+        return self.mode == "transfer"
+
+    def setup(self) -> None:
+        """Open the recipient file at the checkpoint."""
+        if not self.is_enabled:
+            return
+        if self.mode not in ("mint", "transfer"):
+            raise ValueError(f"Unknown distribution mode {self.mode}.")
+        self._is_jsonl = self.distribution_path.endswith(JSONL_EXTENSIONS)
+        self._load_checkpoint()
+        self._file = open(self.distribution_path, "rb")  # pylint: disable=consider-using-with
+        self._file.seek(self._offset)
+        self.context.logger.info(
+            f"Distributing {self.distribution_path} from offset {self._offset}, "
+            f"{len(self._in_flight)} batches still in flight."
+        )
+
+    def teardown(self) -> None:
+        """Close the recipient file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def next_batch(self) -> Optional[DistributionBatch]:
+        """
+        Read the next batch of recipients, if there is room for it in flight.
+
+        :return: the batch, or None if the distribution is at its concurrency or at the end of the file
+        """
+        if len(self._in_flight) >= self.concurrency:
+            return None
+        while self._file is not None:
+            batch = self._read_batch()
+            if batch is None:
+                self._file.close()
+                self._file = None
+                self._check_done()
+            elif len(batch.recipients) == 0:
+                self._finish(batch)
+            else:
+                return batch
+        return None
+
+    def _read_batch(self) -> Optional[DistributionBatch]:
+        """Read the next `batch_size` lines of the file, or None at its end."""
+        file = cast(IO[bytes], self._file)
+        while self._next_index in self._skipped:
+            # signed or finished before the restart, so it must not be paid again
+            file.seek(self._skipped.pop(self._next_index))
+            self._next_index += 1
+        recipients: List[Tuple[str, int]] = []
+        lines = 0
+        while lines < self.batch_size:
+            is_first_line = file.tell() == 0
+            raw_line = file.readline()
+            if raw_line == b"":
+                break
+            line = raw_line.decode().strip()
+            if line == "":
+                continue
+            lines += 1
+            try:
+                recipients.append(parse_recipient(line, self._is_jsonl))
+            except (ValueError, KeyError, TypeError) as e:
+                # a CSV header is not a recipient
+                if not is_first_line or self._is_jsonl:
+                    self._record_failure({"line": line}, str(e))
+        if lines == 0:
+            return None
+        batch = DistributionBatch(
+            index=self._next_index,
+            end_offset=file.tell(),
+            recipients=recipients,
+            planned_at=time.time(),
+        )
+        self._next_index += 1
+        return batch
+
+    def attach(self, batch: DistributionBatch, entry_id: str) -> None:
+        """
+        Link a batch to the journal entry of its transaction.
+
+        :param batch: the batch
+        :param entry_id: the journal identifier of the transaction
+        """
+        self._in_flight[entry_id] = batch
+
+    def signed(self, entry_id: str, signature: str) -> None:
+        """
+        Record that the transaction of a batch is signed, before it is sent.
+
+        :param entry_id: the journal identifier of the transaction
+        :param signature: the transaction signature
+        """
+        if entry_id not in self._in_flight:
+            return
+        self._signatures[entry_id] = signature
+        self._save_checkpoint()
+
+    def complete(self, entry_id: str, is_successful: bool) -> None:
+        """
+        Record the outcome of the transaction of a batch.
+
+        :param entry_id: the journal identifier of the transaction
+        :param is_successful: whether the transaction was settled successfully
+        """
+        batch = self._in_flight.pop(entry_id, None)
+        if batch is None:
+            return
+        self._signatures.pop(entry_id, None)
+        self.transactions += 1
+        if is_successful:
+            self.recipients += len(batch.recipients)
+        else:
+            self._fail(batch, "transaction failed")
+        self._finish(batch)
+
+    def fail(self, entry_id: str, reason: str) -> None:
+        """
+        Give up on the transaction of a batch which could not be built or sent.
+
+        :param entry_id: the journal identifier of the transaction
+        :param reason: why it failed
+        """
+        batch = self._in_flight.pop(entry_id, None)
+        if batch is None:
+            return
+        self._signatures.pop(entry_id, None)
+        self._fail(batch, reason)
+        self._finish(batch)
+
+    def retry(self, entry_id: str) -> Optional[DistributionBatch]:
+        """
+        Take back a batch whose transaction expired without landing, to build it again.
+
+        :param entry_id: the journal identifier of the expired transaction
+        :return: the batch, or None if the entry is not a batch in flight
+        """
+        batch = self._in_flight.pop(entry_id, None)
+        if batch is None:
+            return None
+        if self._signatures.pop(entry_id, None) is not None:
+            self._save_checkpoint()
+        return batch._replace(planned_at=time.time())
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """
+        Check the batches in flight for longer than the timeout.
+
+        A batch which was never signed cannot land any more, as the blockhash it was built on has
+        expired, so it fails. A signed one may have landed, so it stays in flight until its receipt
+        tells: the receipt of its transaction is to be read again, and it is checked again after
+        another timeout.
+
+        :param now: the current time, defaults to the system clock
+        :return: the signatures of the signed batches whose receipts are to be read again
+        """
+        now = time.time() if now is None else now
+        signatures: List[str] = []
+        for entry_id, batch in list(self._in_flight.items()):
+            if now - batch.planned_at < self.timeout:
+                continue
+            signature = self._signatures.get(entry_id)
+            if signature is None:
+                self.fail(entry_id, "timed out")
+            else:
+                self._in_flight[entry_id] = batch._replace(planned_at=now)
+                signatures.append(signature)
+        return signatures
+
+    def report(self) -> str:
+        """Get the progress and the throughput of the distribution."""
+        elapsed = max(time.time() - self._started_at, 1e-9)
+        return (
+            f"Distributed to {self.recipients} recipients in {self.transactions} transactions "
+            f"({self.recipients / elapsed:.1f} recipients/s), {self.failed} failed, "
+            f"{len(self._in_flight)} batches in flight."
+        )
+
+    def _fail(self, batch: DistributionBatch, reason: str) -> None:
+        """Record the recipients of a failed batch."""
+        self.context.logger.warning(
+            f"Batch {batch.index} of {len(batch.recipients)} recipients failed: {reason}"
+        )
+        for owner, amount in batch.recipients:
+            self._record_failure({"owner": owner, "amount": amount}, reason)
+
+    def _record_failure(self, record: Dict[str, Any], reason: str) -> None:
+        """Append a failed recipient to the failures file."""
+        self.failed += 1
+        with open(self.failures_path, "a") as failures:
+            failures.write(json.dumps({**record, "reason": reason}) + "\n")
+
+    def _finish(self, batch: DistributionBatch) -> None:
+        """Move the checkpoint past every batch finished in order."""
+        self._finished[batch.index] = batch.end_offset
+        while self._index in self._finished:
+            self._offset = self._finished.pop(self._index)
+            self._index += 1
+        self._save_checkpoint()
+        self._check_done()
+
+    def _check_done(self) -> None:
+        """Report once every batch of the file has finished."""
+        if self.is_done or self._file is not None or len(self._in_flight) > 0:
+            return
+        self.is_done = True
+        self.context.logger.info(f"Distribution finished. {self.report()}")
+
+    def _load_checkpoint(self) -> None:
+        """Read the checkpoint, if a previous run left one."""
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint["path"] != self.distribution_path:
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_path} is of {checkpoint['path']}, not {self.distribution_path}."
+            )
+        # the batches are cut the same way as before, so that they can be skipped
+        self.batch_size = checkpoint["batch_size"]
+        self._offset = checkpoint["offset"]
+        self._index = self._next_index = checkpoint["index"]
+        self.recipients = checkpoint["recipients"]
+        self.transactions = checkpoint["transactions"]
+        self.failed = checkpoint["failed"]
+        for index, end_offset in checkpoint["finished"].items():
+            self._finished[int(index)] = end_offset
+            self._skipped[int(index)] = end_offset
+        for entry_id, (index, end_offset, recipients, signature) in checkpoint[
+            "signed"
+        ].items():
+            self._skipped[index] = end_offset
+            self._signatures[entry_id] = signature
+            self._in_flight[entry_id] = DistributionBatch(
+                index=index,
+                end_offset=end_offset,
+                recipients=[tuple(recipient) for recipient in recipients],
+                planned_at=time.time(),
+            )
+
+    def _save_checkpoint(self) -> None:
+        """Replace the checkpoint atomically."""
+        checkpoint = {
+            "path": self.distribution_path,
+            "batch_size": self.batch_size,
+            "offset": self._offset,
+            "index": self._index,
+            "recipients": self.recipients,
+            "transactions": self.transactions,
+            "failed": self.failed,
+            "finished": self._finished,
+            "signed": {
+                entry_id: [
+                    batch.index,
+                    batch.end_offset,
+                    batch.recipients,
+                    self._signatures[entry_id],
+                ]
+                for entry_id, batch in self._in_flight.items()
+                if entry_id in self._signatures
+            },
+        }
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(temporary_path, self.checkpoint_path)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains a pool of fee payers the transactions of the agent are spread over."""
+
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from aea.skills.base import Model
+
+
+class FeePayerSelection(Enum):
+    """How the fee payer of a transaction is chosen."""
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_IN_FLIGHT = "least_in_flight"
+
+
+class FeePayer:
+    """A fee payer of the pool, with the costs it was charged."""
+
+    __slots__ = ("address", "balance", "in_flight", "transactions", "fees", "topped_up")
+
+    def __init__(self, address: str) -> None:
+        """Initialize the fee payer."""
+        self.address = address
+        self.balance: Optional[int] = None
+        self.in_flight = 0
+        self.transactions = 0
+        self.fees = 0
+        self.topped_up = 0
+
+
+class FeePayerPool(Model):
+    """
+    This class spreads the fees of the transactions of the agent over a pool of fee payers.
+
+    Every transaction paid from a single account write-locks it, and they all fail together once its
+    balance runs out. The payers are chosen in turn, or by least transactions in flight, among the
+    ones whose balance is above `fee_payer_min_balance`; the agent stays the authority of the mint.
+    A payer whose balance falls below it is topped up by `fee_payer_top_up_amount` lamports from the
+    agent. The decision maker must hold the keys of the payers, under `fee_payer_key_paths`.
+    Without `fee_payer_addresses` the agent pays for everything, as before.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the pool."""
+        self.fee_payer_addresses: List[str] = kwargs.pop("fee_payer_addresses", None) or []
+        self.fee_payer_selection = FeePayerSelection(
+            kwargs.pop("fee_payer_selection", FeePayerSelection.ROUND_ROBIN.value))
+        self.fee_payer_min_balance = kwargs.pop("fee_payer_min_balance", 10000000)
+        self.fee_payer_top_up_amount = kwargs.pop("fee_payer_top_up_amount", 50000000)
+        self.fee_payer_in_flight_timeout = kwargs.pop("fee_payer_in_flight_timeout", 150)
+        self._payers: Dict[str, FeePayer] = {}
+        self._next = 0
+        self._in_flight: Dict[str, Tuple[str, float]] = {}
+        self._top_ups: Dict[str, Tuple[List[str], float]] = {}
+        super().__init__(*args, **kwargs)
+
+    @property
+    def is_enabled(self) -> bool:
+        """Check whether the fees are spread over a pool of payers."""
+        return len(self.fee_payer_addresses) > 0
+
+    def setup(self) -> None:
+        """Set the payers up, the agent alone if no pool is configured."""
+        addresses = self.fee_payer_addresses or [self.context.agent_address]
+        self._payers = {address: FeePayer(address) for address in addresses}
+
+    def teardown(self) -> None:
+        """Log the costs charged to every payer."""
+        if self.is_enabled:
+            self.context.logger.info(self.report())
+
+    def is_payer(self, address: str) -> bool:
+        """Check whether an address is a fee payer of the pool."""
+        return self.is_enabled and address in self._payers
+
+    def choose(self) -> str:
+        """
+        Choose the fee payer of the next transaction.
+
+        The payers whose balance is known to be too low are passed over, unless they all are.
+
+        :return: the address of the payer
+        """
+        self._drop_stale()
+        payers = list(self._payers.values())
+        funded = [
+            payer
+            for payer in payers
+            if payer.balance is None or payer.balance >= self.fee_payer_min_balance
+        ]
+        candidates = funded or payers
+        # rotate, so that ties are broken in turn as well
+        start = self._next % len(candidates)
+        candidates = candidates[start:] + candidates[:start]
+        self._next += 1
+        if self.fee_payer_selection is FeePayerSelection.LEAST_IN_FLIGHT:
+            return min(candidates, key=lambda payer: payer.in_flight).address
+        return candidates[0].address
+
+    def attach(self, entry_id: str, address: str) -> None:
+        """
+        Count a transaction as in flight for its fee payer.
+
+        :param entry_id: the journal identifier of the transaction
+        :param address: the address of the payer
+        """
+        payer = self._payers.get(address)
+        if payer is None:
+            return
+        payer.in_flight += 1
+        self._in_flight[entry_id] = (address, time.monotonic())
+
+    def release(self, entry_id: str, fee: Optional[int] = None) -> None:
+        """
+        Stop counting a transaction as in flight, charging its payer the fee if it landed.
+
+        :param entry_id: the journal identifier of the transaction
+        :param fee: the fee paid, in lamports, if the transaction landed
+        """
+        addresses, _ = self._top_ups.pop(entry_id, ([], 0.0))
+        for address in addresses:
+            payer = self._payers[address]
+            if fee is not None:
+                payer.topped_up += self.fee_payer_top_up_amount
+                payer.balance = None
+        address, _ = self._in_flight.pop(entry_id, (None, None))
+        if address is None:
+            return
+        payer = self._payers[address]
+        payer.in_flight -= 1
+        if fee is not None:
+            payer.transactions += 1
+            payer.fees += fee
+            if payer.balance is not None:
+                payer.balance -= fee
+
+    def on_balance(self, address: str, balance: int) -> None:
+        """
+        Update the balance of a fee payer.
+
+        :param address: the address of the payer
+        :param balance: its balance, in lamports
+        """
+        self._payers[address].balance = balance
+
+    def payers_to_check(self) -> List[str]:
+        """Get the payers whose balance must be read, i.e. all but the ones being topped up."""
+        if not self.is_enabled:
+            return []
+        self._drop_stale()
+        topping_up = {address for addresses, _ in self._top_ups.values() for address in addresses}
+        return [address for address in self._payers if address not in topping_up]
+
+    def top_ups_due(self) -> List[List[Any]]:
+        """
+        Get the payers to top up, as (address, lamports) pairs.
+
+        :return: the payers whose balance is below the minimum and which are not being topped up
+        """
+        if not self.is_enabled:
+            return []
+        checked = set(self.payers_to_check())
+        return [
+            [payer.address, self.fee_payer_top_up_amount]
+            for payer in self._payers.values()
+            if payer.address in checked
+            and payer.balance is not None
+            and payer.balance < self.fee_payer_min_balance
+        ]
+
+    def topping_up(self, entry_id: str, addresses: List[str]) -> None:
+        """
+        Wait for the transaction topping payers up to settle, before reading their balance again.
+
+        :param entry_id: the journal identifier of the transaction
+        :param addresses: the addresses of the payers
+        """
+        self._top_ups[entry_id] = (addresses, time.monotonic())
+
+    def report(self) -> str:
+        """Get the costs charged to every payer."""
+        return "Fee payers: " + ", ".join(
+            f"{payer.address} paid {payer.fees} lamports for {payer.transactions} transactions "
+            f"({payer.in_flight} in flight, topped up with {payer.topped_up})"
+            for payer in self._payers.values()
+        )
+
+    def _drop_stale(self) -> None:
+        """Stop waiting for the transactions in flight for longer than the timeout, whose outcome never came."""
+        deadline = time.monotonic() - self.fee_payer_in_flight_timeout
+        for entry_id, (_, since) in list(self._top_ups.items()):
+            if since < deadline:
+                del self._top_ups[entry_id]
+        for entry_id, (address, since) in list(self._in_flight.items()):
+            if since < deadline:
+                del self._in_flight[entry_id]
+                self._payers[address].in_flight -= 1
@@ -19,10 +19,14 @@
 
 """This package contains a scaffold of a handler."""
 
-from typing import Optional
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from typing import cast
 
 from aea.configurations.base import PublicId
+from aea.helpers.search.models import Description
+from aea.helpers.transaction.base import RawTransaction
 from aea.protocols.base import Message
 from aea.skills.base import Handler
 from packages.valory.protocols.contract_api.message import ContractApiMessage
@@ -33,21 +37,57 @@ from packages.dassy23.skills.spl_token_skill.dialogues import (
     LedgerApiDialogue,
     ContractApiDialogue,
     ContractApiDialogues,
+    FipaDialogue,
+    FipaDialogues,
     SigningDialogues,
     SigningDialogue
 )
+from packages.dassy23.skills.spl_token_skill.distribution import Distribution
+from packages.dassy23.skills.spl_token_skill.fee_payers import FeePayerPool
+from packages.dassy23.skills.spl_token_skill.journal import (
+    MintJournal,
+    journal_entry_id,
+    transaction_signature,
+)
+from packages.dassy23.skills.spl_token_skill.mint_pool import (
+    MintPool,
+    NonceAccountStatus,
+    PresignedMint,
+)
+from packages.dassy23.skills.spl_token_skill.scheduler import MintScheduler
+from packages.dassy23.skills.spl_token_skill.simulation import (
+    Simulation,
+    is_fee_payer_error,
+    is_repairable,
+)
 from packages.dassy23.skills.spl_token_skill.strategy import Strategy
+from packages.dassy23.skills.spl_token_skill.token_requests import (
+    TokenRequest,
+    TokenRequestBatch,
+    TokenRequests,
+)
+from packages.fetchai.protocols.fipa.message import FipaMessage
 
 from packages.open_aea.protocols.signing.message import SigningMessage
 
 from packages.valory.connections.ledger.connection import (
     PUBLIC_ID as LEDGER_CONNECTION_PUBLIC_ID,
 )
+from packages.valory.connections.ledger.receipts import (
+    OUTCOMES_BY_ERROR_CODE,
+    ReceiptOutcome,
+)
 from aea.crypto.ledger_apis import LedgerApis
 
 LEDGER_API_ADDRESS = str(LEDGER_CONNECTION_PUBLIC_ID)
 
 
+def is_presigned_mint(contract_api_dialogue: ContractApiDialogue) -> bool:
+    """Check whether a contract api dialogue builds a mint on a durable nonce for the mint pool."""
+    request = contract_api_dialogue.last_outgoing_message
+    return request.callable == "mint_to" and "nonce_address" in request.kwargs.body
+
+
 class TokenProgramHandler(Handler):
     """This class scaffolds a handler."""
 
@@ -74,7 +114,11 @@ class TokenProgramHandler(Handler):
         )
 
         if ledger_api_msg.performative is LedgerApiMessage.Performative.BALANCE:
-            if ledger_api_msg.balance != strategy.balance:
+            fee_payers = cast(FeePayerPool, self.context.fee_payers)
+            address = ledger_api_dialogue.last_outgoing_message.address
+            if fee_payers.is_payer(address):
+                fee_payers.on_balance(address, ledger_api_msg.balance)
+            elif ledger_api_msg.balance != strategy.balance:
                 strategy.balance = ledger_api_msg.balance
                 self.context.logger.info(f"Balance is {strategy.balance}")
         elif ledger_api_msg.performative is LedgerApiMessage.Performative.TRANSACTION_DIGEST:
@@ -86,9 +130,10 @@ class TokenProgramHandler(Handler):
         ):
             self._handle_transaction_receipt(
                 ledger_api_msg, ledger_api_dialogue)
-        else:
+        elif ledger_api_msg.performative is LedgerApiMessage.Performative.ERROR:
             self._handle_transaction_error(
                 ledger_api_msg, ledger_api_dialogue)
+        else:
             raise NotImplementedError
 
     def teardown(self) -> None:
@@ -99,25 +144,56 @@ class TokenProgramHandler(Handler):
         self, ledger_api_msg: LedgerApiMessage, ledger_api_dialogue: LedgerApiDialogue
     ) -> None:
         """
-        Handle a message of transaction_digest performative.
+        Handle a message of error performative.
+
+        The errors of the transactions which were sent, or could not be, are coded by outcome. A
+        failed transaction is final. One whose blockhash expired never landed, so it is built again
+        at once. One whose outcome is unknown may still land, so it is left to time out.
         :param ledger_api_message: the ledger api message
         :param ledger_api_dialogue: the ledger api dialogue
         """
-        self.context.logger.info(
-            "transaction was successfully submitted. Transaction digest={}".format(
-                ledger_api_msg.transaction_digest.body
-            )
-        )
-        ledger_api_dialogues = cast(
-            LedgerApiDialogues, self.context.ledger_api_dialogues
+        self.context.logger.warning(
+            f"Ledger api error {ledger_api_msg.code}: {ledger_api_msg.message}"
         )
-        msg, ledger_api_dialogue = ledger_api_dialogues.create(
-            counterparty=LEDGER_API_ADDRESS,
-            performative=LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
-            transaction_digest=ledger_api_msg.transaction_digest,
-        )
-        self.context.outbox.put_message(message=msg)
-        self.context.logger.info("requesting transaction receipt.")
+        outcome = OUTCOMES_BY_ERROR_CODE.get(ledger_api_msg.code)
+        if outcome is None or outcome is ReceiptOutcome.UNKNOWN:
+            return
+        data = json.loads(ledger_api_msg.data)
+        signature = data["signature"]
+        journal = cast(MintJournal, self.context.journal)
+        if data["retryable"]:
+            entry_id = journal.expired(signature)
+        else:
+            entry_id = journal.settled(signature, False)
+        cast(MintPool, self.context.mint_pool).on_receipt(signature)
+        strategy = cast(Strategy, self.context.strategy)
+        strategy.failed_txs += 1
+        strategy.transacting = False
+        if entry_id is None:
+            return
+        cast(FeePayerPool, self.context.fee_payers).release(entry_id)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        distribution = cast(Distribution, self.context.distribution)
+        if data["retryable"]:
+            planned = scheduler.retry(entry_id)
+            if planned is not None:
+                self.context.logger.info(f"Building mint {planned.key} again.")
+                self.context.behaviours.scaffold.request_mint(planned)
+            batch = distribution.retry(entry_id) if distribution.is_enabled else None
+            if batch is not None:
+                self.context.logger.info(f"Building batch {batch.index} again.")
+                self.context.behaviours.scaffold.request_distribution(batch)
+            token_batch = cast(TokenRequests, self.context.token_requests).retry(entry_id)
+            if token_batch is not None:
+                self.context.logger.info(
+                    f"Building the mint of {len(token_batch.requests)} token requests again.")
+                self.context.behaviours.token_requests.request_batch(token_batch)
+            return
+        scheduler.complete(entry_id, False)
+        self.context.handlers.fipa_handler.complete(entry_id, {"status": "failed", "transaction_digest": signature})
+        if distribution.is_enabled:
+            distribution.complete(entry_id, False)
+            self.context.behaviours.scaffold.distribute()
 
     def _handle_transaction_receipt(
         self, ledger_api_msg: LedgerApiMessage, ledger_api_dialogue: LedgerApiDialogue
@@ -131,8 +207,33 @@ class TokenProgramHandler(Handler):
             ledger_api_msg.transaction_receipt.ledger_id,
             ledger_api_msg.transaction_receipt.receipt,
         )
+        signature = ledger_api_dialogue.last_outgoing_message.transaction_digest.body
+        journal = cast(MintJournal, self.context.journal)
+        entry_id = journal.settled(signature, is_transaction_successful)
+        cast(MintPool, self.context.mint_pool).on_receipt(signature)
+        if entry_id is not None:
+            receipt = ledger_api_msg.transaction_receipt.receipt
+            cast(FeePayerPool, self.context.fee_payers).release(
+                entry_id, (receipt.get("meta") or {}).get("fee"))
+            scheduler = cast(MintScheduler, self.context.scheduler)
+            scheduler.complete(entry_id, is_transaction_successful)
+            self.context.handlers.fipa_handler.complete(entry_id, {
+                "status": "settled" if is_transaction_successful else "failed",
+                "transaction_digest": signature,
+            })
+            distribution = cast(Distribution, self.context.distribution)
+            if distribution.is_enabled:
+                distribution.complete(entry_id, is_transaction_successful)
+                # a batch left the window, so the next one can go
+                self.context.behaviours.scaffold.distribute()
         if is_transaction_successful:
             strategy.failed_txs = 0
+            if entry_id is not None:
+                receipt = ledger_api_msg.transaction_receipt.receipt
+                supply_changes = strategy.token_balances.on_receipt(receipt["meta"], receipt["slot"])
+                strategy.tokens_minted += sum(
+                    change for mint, change in supply_changes.items()
+                    if change > 0 and strategy.mint_spec(mint) is not None)
         else:
             strategy.failed_txs += 1
         strategy.transacting = False
@@ -156,6 +257,8 @@ class TokenProgramHandler(Handler):
                 ledger_api_msg.transaction_digest.body
             )
         )
+        journal = cast(MintJournal, self.context.journal)
+        journal.sent(ledger_api_msg.transaction_digest.body)
         ledger_api_dialogues = cast(
             LedgerApiDialogues, self.context.ledger_api_dialogues
         )
@@ -207,7 +310,15 @@ class ContractApiHandler(Handler):
         elif contract_api_msg.performative == ContractApiMessage.Performative.ERROR:
             self._handle_error(contract_api_msg, contract_api_dialogue)
         elif contract_api_msg.performative == ContractApiMessage.Performative.STATE:
-            self._handle_state_update(contract_api_msg, contract_api_dialogue)
+            if contract_api_dialogue.last_outgoing_message.callable == "get_nonce_info":
+                self._handle_nonce_info(contract_api_msg, contract_api_dialogue)
+            elif contract_api_dialogue.last_outgoing_message.callable == "simulate_transactions":
+                self._handle_simulation(contract_api_msg, contract_api_dialogue)
+            elif contract_api_dialogue.last_outgoing_message.callable == "get_balances":
+                self._handle_balances(contract_api_msg, contract_api_dialogue)
+            else:
+                self._handle_state_update(
+                    contract_api_msg, contract_api_dialogue)
         else:
             self._handle_state_update(contract_api_msg, contract_api_dialogue)
 
@@ -216,17 +327,59 @@ class ContractApiHandler(Handler):
         # raise NotImplementedError
 
     def _handle_error(self, contract_api_msg, contract_api_dialogue):
+        distribution = cast(Distribution, self.context.distribution)
+        if contract_api_dialogue.last_outgoing_message.callable == "simulate_transactions":
+            # the simulation is only a safeguard, so the transactions go on without it
+            self.context.logger.warning(
+                f"Could not simulate the transactions: {contract_api_msg.message}")
+            simulation = cast(Simulation, self.context.simulation)
+            for raw_transaction, dialogue in simulation.results_of(
+                    journal_entry_id(contract_api_dialogue)):
+                self._propose(raw_transaction, dialogue)
+            return
+        request = contract_api_dialogue.last_outgoing_message
+        if request.callable == "get_nonce_info":
+            # read again on the next tick
+            nonce_account = cast(MintPool, self.context.mint_pool).get_account(
+                request.kwargs.body["nonce_address"])
+            nonce_account.status = (
+                NonceAccountStatus.SPENT if nonce_account.status is NonceAccountStatus.CHECKING
+                else NonceAccountStatus.UNKNOWN)
+            return
+        if request.callable == "create_nonce_account" or is_presigned_mint(contract_api_dialogue):
+            # the nonce account is read and created or refilled again
+            cast(MintPool, self.context.mint_pool).get_account(
+                request.kwargs.body["nonce_address"]).status = NonceAccountStatus.UNKNOWN
+        entry_id = journal_entry_id(contract_api_dialogue)
+        cast(FeePayerPool, self.context.fee_payers).release(entry_id)
+        if request.callable == "distribute":
+            # a batch of token requests, or of the distribution
+            if cast(TokenRequests, self.context.token_requests).is_in_flight(entry_id):
+                self.context.handlers.fipa_handler.complete(
+                    entry_id, {"status": "failed", "reason": contract_api_msg.message})
+            elif distribution.is_enabled:
+                distribution.fail(entry_id, contract_api_msg.message)
+                self.context.behaviours.scaffold.distribute()
+            return
 
-        # state = contract_api_msg.state.body["result"]
-        print("error_state")
+        self.context.logger.warning(
+            f"Could not build the {request.callable} transaction: {contract_api_msg.message}")
+        if request.callable == "mint_to":
+            cast(MintJournal, self.context.journal).abandoned(entry_id)
+            cast(Strategy, self.context.strategy).failed_txs += 1
+            # planned again on the next tick
+            cast(MintScheduler, self.context.scheduler).complete(entry_id, False)
 
     def _handle_state_update(self, contract_api_msg, contract_api_dialogue):
         self.log = self.context.logger.info
         strategy = cast(Strategy, self.context.strategy)
         state = contract_api_msg.state.body
-        expected_mint = PublicKey.create_with_seed(PublicKey(
-            self.context.agent_address), strategy.mint_seed, PublicKey("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"))
-        mint_address = expected_mint.to_base58().decode()
+        mint_address = contract_api_dialogue.last_outgoing_message.kwargs.body["mint_address"]
+        spec = strategy.mint_spec(str(mint_address))
+        if spec is None:
+            self.context.logger.warning(f"Mint {mint_address} is not a mint of the agent, ignoring it.")
+            return
+        mint_address = spec.mint_address
 
         mint = state.get(mint_address, None)
 
@@ -234,9 +387,12 @@ class ContractApiHandler(Handler):
             if mint['mintAuthority'] == self.context.agent_address:
                 self.log(
                     f"Mint: {mint_address} exists with : {mint['supply']} supply")
-                strategy.mint_exists = True
+                strategy.on_mint_exists(mint_address)
+                if strategy.token_balances.check_supply(mint_address, int(mint['supply']), state["slot"]):
+                    self.context.logger.warning(
+                        f"Supply of {mint_address} drifted from the one indexed off the receipts, corrected it.")
             else:
-                raise ValueError()(
+                raise ValueError(
                     "Mint authority is not the agent address, try using a different seed to create mint")
         else:
             contract_api_dialogues = cast(
@@ -257,7 +413,7 @@ class ContractApiHandler(Handler):
                         "decimals": 0,
                         "mint_authority": self.context.agent_address,
                         "freeze_authority": self.context.agent_address,
-                        "seed": strategy.mint_seed,
+                        "seed": spec.seed,
                     }
                 ),
             )
@@ -265,14 +421,149 @@ class ContractApiHandler(Handler):
 
             self.context.outbox.put_message(message=contract_api_msg)
 
+    def _handle_balances(self, contract_api_msg, contract_api_dialogue):
+        """
+        Check the indexed balances of an owner against the ones read from the chain.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        strategy = cast(Strategy, self.context.strategy)
+        owner = contract_api_dialogue.last_outgoing_message.kwargs.body["owner_address"]
+        state = contract_api_msg.state.body
+        drifted = strategy.token_balances.check_balances(
+            owner,
+            {mint: balance["amount"] for mint, balance in state["balances"].items()},
+            state["slot"],
+        )
+        if len(drifted) > 0:
+            self.context.logger.warning(
+                f"Balances of {owner} in {drifted} drifted from the ones indexed off the receipts, corrected them.")
+
+    def _handle_nonce_info(self, contract_api_msg, contract_api_dialogue):
+        """
+        Refill a nonce account of the mint pool, creating the account first if it does not exist.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        strategy = cast(Strategy, self.context.strategy)
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        nonce_address = contract_api_dialogue.last_outgoing_message.kwargs.body["nonce_address"]
+        nonce_account = mint_pool.get_account(nonce_address)
+        nonce_info = contract_api_msg.state.body[nonce_address]
+        if nonce_account.status is NonceAccountStatus.CHECKING:
+            self._handle_spent_nonce(nonce_address, nonce_info)
+            return
+
+        if nonce_info is None:
+            self.context.logger.info(
+                f"Nonce account {nonce_address} does not exist, creating it...")
+            nonce_account.status = NonceAccountStatus.CREATING
+            callable_name = "create_nonce_account"
+            kwargs = {
+                "payer_address": self.context.agent_address,
+                "nonce_address": nonce_address,
+                "nonce_authority": self.context.agent_address,
+                "seed": nonce_account.seed,
+            }
+        else:
+            nonce_account.status = NonceAccountStatus.SIGNING
+            callable_name = "mint_to"
+            payer_address = fee_payers.choose()
+            kwargs = {
+                "payer_address": payer_address,
+                "destination_owner_address": self.context.agent_address,
+                "authority_address": self.context.agent_address,
+                "mint_address": strategy.mint_address,
+                "amount": strategy.mint_amount,
+                "nonce_address": nonce_address,
+                "nonce_authority": self.context.agent_address,
+                "nonce": nonce_info["blockhash"],
+            }
+
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,  # type: ignore
+            ledger_id="solana",
+            contract_id="dassy23/spl_token_program:0.1.0",
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            callable=callable_name,
+            kwargs=ContractApiMessage.Kwargs(kwargs),
+        )
+        contract_api_dialogue.terms = strategy.get_deploy_terms()
+        if callable_name == "mint_to":
+            fee_payers.attach(journal_entry_id(contract_api_dialogue), payer_address)
+        self.context.outbox.put_message(message=contract_api_msg)
+
+    def _handle_spent_nonce(self, nonce_address: str, nonce_info: Optional[Dict[str, Any]]) -> None:
+        """
+        Settle a mint on a durable nonce whose receipt never came, by whether its nonce advanced.
+
+        :param nonce_address: the nonce account the mint was signed on
+        :param nonce_info: the nonce account, None if it does not exist
+        """
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        signature = mint_pool.get_account(nonce_address).signature
+        if mint_pool.on_nonce(nonce_address, None if nonce_info is None else nonce_info["blockhash"]):
+            # the mint landed, so its receipt can be read
+            self.context.logger.info(
+                f"Nonce of {nonce_address} advanced, requesting the receipt of {signature} again.")
+            ledger_api_dialogues = cast(
+                LedgerApiDialogues, self.context.ledger_api_dialogues)
+            ledger_api_msg, _ = ledger_api_dialogues.create(
+                counterparty=LEDGER_API_ADDRESS,
+                performative=LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
+                transaction_digest=LedgerApiMessage.TransactionDigest(
+                    cast(Strategy, self.context.strategy).ledger_id, signature),
+            )
+            self.context.outbox.put_message(message=ledger_api_msg)
+            return
+
+        self.context.logger.warning(
+            f"Mint {signature} never landed, as the nonce of {nonce_address} did not advance, "
+            "putting it back in the pool.")
+        entry_id = cast(MintJournal, self.context.journal).expired(signature)
+        if entry_id is None:
+            return
+        cast(FeePayerPool, self.context.fee_payers).release(entry_id)
+        # planned again on the next tick, which sends the same mint again
+        cast(MintScheduler, self.context.scheduler).complete(entry_id, False)
+
     def _handle_raw_transaction(self, contract_api_msg, contract_api_dialogue):
+        request = contract_api_dialogue.last_outgoing_message
+        journal = cast(MintJournal, self.context.journal)
+        journal.built(
+            journal_entry_id(contract_api_dialogue),
+            {"callable": request.callable, "kwargs": request.kwargs.body},
+        )
+        simulation = cast(Simulation, self.context.simulation)
+        if simulation.is_enabled:
+            if simulation.add(contract_api_msg.raw_transaction, contract_api_dialogue):
+                self.request_simulation()
+            return
+        self._propose(contract_api_msg.raw_transaction, contract_api_dialogue)
+
+    def _propose(self, raw_transaction: RawTransaction, contract_api_dialogue: ContractApiDialogue) -> None:
+        """Propose a built transaction to the decision maker, on its own or with the next batch."""
+        strategy = cast(Strategy, self.context.strategy)
+        # mints for the pool are signed on their own, as they are kept instead of sent
+        if strategy.signing_batch_size > 1 and not is_presigned_mint(contract_api_dialogue):
+            strategy.pending_raw_transactions.append(
+                (raw_transaction, contract_api_dialogue))
+            if len(strategy.pending_raw_transactions) >= strategy.signing_batch_size:
+                self.request_batch_signing()
+            return
 
         signing_dialogues = cast(
             SigningDialogues, self.context.signing_dialogues)
         signing_msg, signing_dialogue = signing_dialogues.create(
             counterparty=self.context.decision_maker_address,
             performative=SigningMessage.Performative.SIGN_TRANSACTION,
-            raw_transaction=contract_api_msg.raw_transaction,
+            raw_transaction=raw_transaction,
             terms=contract_api_dialogue.terms,
 
         )
@@ -284,6 +575,141 @@ class ContractApiHandler(Handler):
             "proposing the transaction to the decision maker. Waiting for confirmation ..."
         )
 
+    def request_simulation(self) -> None:
+        """Simulate all the queued transactions in a single request."""
+        simulation = cast(Simulation, self.context.simulation)
+        pending = simulation.take()
+        if len(pending) == 0:
+            return
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues)
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            ledger_id="solana",
+            contract_id="dassy23/spl_token_program:0.1.0",
+            contract_address="TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+            callable="simulate_transactions",
+            kwargs=ContractApiMessage.Kwargs(
+                {
+                    "transactions": [raw_transaction.body for raw_transaction, _ in pending],
+                    "compute_unit_margin": simulation.compute_unit_margin,
+                }
+            ),
+        )
+        simulation.track(journal_entry_id(contract_api_dialogue), pending)
+        self.context.outbox.put_message(message=contract_api_msg)
+        self.context.logger.info(f"simulating {len(pending)} transactions.")
+
+    def _handle_simulation(self, contract_api_msg, contract_api_dialogue):
+        """
+        Propose the transactions which passed their simulation, with their compute unit limit, and drop or build again the others.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        simulation = cast(Simulation, self.context.simulation)
+        pending = simulation.results_of(journal_entry_id(contract_api_dialogue))
+        results = contract_api_msg.state.body["results"]
+        for (raw_transaction, dialogue), result in zip(pending, results):
+            if result["err"] is None:
+                simulation.on_pass(journal_entry_id(dialogue), result["units_consumed"])
+                self._propose(
+                    RawTransaction(raw_transaction.ledger_id, result["transaction"]), dialogue)
+            else:
+                self._handle_failed_simulation(dialogue, result["err"])
+
+    def _handle_failed_simulation(self, contract_api_dialogue: ContractApiDialogue, err: str) -> None:
+        """
+        Give up on a transaction which failed its simulation, building it again if the error may go away.
+
+        :param contract_api_dialogue: the dialogue the transaction was built in
+        :param err: the simulation error
+        """
+        entry_id = journal_entry_id(contract_api_dialogue)
+        request = contract_api_dialogue.last_outgoing_message
+        simulation = cast(Simulation, self.context.simulation)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        distribution = cast(Distribution, self.context.distribution)
+        cast(MintJournal, self.context.journal).abandoned(entry_id)
+        fee_payers.release(entry_id)
+        payer_address = request.kwargs.body.get("payer_address")
+        if is_fee_payer_error(err) and payer_address is not None and fee_payers.is_payer(payer_address):
+            # passed over until it is topped up
+            fee_payers.on_balance(payer_address, 0)
+        if is_presigned_mint(contract_api_dialogue):
+            # the nonce account is read and refilled again
+            cast(MintPool, self.context.mint_pool).get_account(
+                request.kwargs.body["nonce_address"]).status = NonceAccountStatus.UNKNOWN
+
+        if is_repairable(err) and simulation.can_repair(entry_id):
+            self.context.logger.info(
+                f"{request.callable} transaction failed its simulation ({err}), building it again.")
+            planned = scheduler.retry(entry_id)
+            if planned is not None:
+                simulation.on_repair(
+                    entry_id, self.context.behaviours.scaffold.request_mint(planned))
+                return
+            batch = distribution.retry(entry_id) if distribution.is_enabled else None
+            if batch is not None:
+                simulation.on_repair(
+                    entry_id, self.context.behaviours.scaffold.request_distribution(batch))
+                return
+            token_batch = cast(TokenRequests, self.context.token_requests).retry(entry_id)
+            if token_batch is not None:
+                simulation.on_repair(
+                    entry_id, self.context.behaviours.token_requests.request_batch(token_batch))
+                return
+
+        self.context.logger.warning(
+            f"{request.callable} transaction failed its simulation ({err}), dropping it.")
+        simulation.on_drop(entry_id)
+        strategy = cast(Strategy, self.context.strategy)
+        strategy.failed_txs += 1
+        scheduler.complete(entry_id, False)
+        self.context.handlers.fipa_handler.complete(
+            entry_id, {"status": "failed", "reason": f"simulation failed: {err}"})
+        if distribution.is_enabled:
+            distribution.fail(entry_id, f"simulation failed: {err}")
+            self.context.behaviours.scaffold.distribute()
+
+    def request_batch_signing(self) -> None:
+        """Propose all the buffered raw transactions to the decision maker in a single request."""
+        strategy = cast(Strategy, self.context.strategy)
+        if len(strategy.pending_raw_transactions) == 0:
+            return
+        pending = strategy.pending_raw_transactions
+        strategy.pending_raw_transactions = []
+
+        # a request has a single terms, so the transactions are batched by terms
+        batches: List[List[Tuple[RawTransaction, ContractApiDialogue]]] = []
+        for raw_transaction, contract_api_dialogue in pending:
+            batch = next(
+                (batch for batch in batches if batch[0][1].terms == contract_api_dialogue.terms), None)
+            if batch is None:
+                batches.append([(raw_transaction, contract_api_dialogue)])
+            else:
+                batch.append((raw_transaction, contract_api_dialogue))
+
+        signing_dialogues = cast(
+            SigningDialogues, self.context.signing_dialogues)
+        for batch in batches:
+            signing_msg, signing_dialogue = signing_dialogues.create(
+                counterparty=self.context.decision_maker_address,
+                performative=SigningMessage.Performative.SIGN_TRANSACTIONS,
+                raw_transactions=SigningMessage.RawTransactions(
+                    [raw_transaction for raw_transaction, _ in batch]),
+                terms=batch[0][1].terms,
+            )
+            signing_dialogue = cast(SigningDialogue, signing_dialogue)
+            signing_dialogue.associated_contract_api_dialogues = tuple(
+                contract_api_dialogue for _, contract_api_dialogue in batch)
+            self.context.decision_maker_message_queue.put_nowait(signing_msg)
+            self.context.logger.info(
+                f"proposing {len(batch)} transactions to the decision maker. Waiting for confirmation ..."
+            )
+
 
 class SigningHandler(Handler):
     """Implement the transaction handler."""
@@ -315,6 +741,8 @@ class SigningHandler(Handler):
         # handle message
         if signing_msg.performative is SigningMessage.Performative.SIGNED_TRANSACTION:
             self._handle_signed_transaction(signing_msg, signing_dialogue)
+        elif signing_msg.performative is SigningMessage.Performative.SIGNED_TRANSACTIONS:
+            self._handle_signed_transactions(signing_msg, signing_dialogue)
         elif signing_msg.performative is SigningMessage.Performative.ERROR:
             self._handle_error(signing_msg, signing_dialogue)
         else:
@@ -337,15 +765,295 @@ class SigningHandler(Handler):
         :return: None
         """
         self.context.logger.info("transaction signing was successful.")
+        contract_api_dialogue = signing_dialogue.associated_contract_api_dialogue
+        request_kwargs = contract_api_dialogue.last_outgoing_message.kwargs.body
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        if is_presigned_mint(contract_api_dialogue):
+            mint_pool.store(
+                PresignedMint(
+                    nonce_address=request_kwargs["nonce_address"],
+                    nonce=request_kwargs["nonce"],
+                    amount=request_kwargs["amount"],
+                    signed_transaction=signing_msg.signed_transaction,
+                    contract_api_dialogue=contract_api_dialogue,
+                    signing_dialogue=signing_dialogue,
+                )
+            )
+            self.context.logger.info(
+                f"mint signed ahead of time, {mint_pool.ready} ready in the pool.")
+            return
+
+        signature = transaction_signature(signing_msg.signed_transaction)
+        journal = cast(MintJournal, self.context.journal)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        journal.signed(
+            journal_entry_id(contract_api_dialogue),
+            signature,
+            scheduler.journal_data(journal_entry_id(contract_api_dialogue)),
+        )
+        cast(Distribution, self.context.distribution).signed(
+            journal_entry_id(contract_api_dialogue), signature)
+        cast(TokenRequests, self.context.token_requests).signed(
+            journal_entry_id(contract_api_dialogue), signature)
+        # the signature must be on disk before the transaction can land
+        journal.flush()
+        if "nonce_address" in request_kwargs:
+            mint_pool.track(request_kwargs["nonce_address"], signature)
+        self.send_signed_transaction(
+            signing_msg.signed_transaction, signing_dialogue)
+
+    def _handle_signed_transactions(
+        self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Handle a batch of signed transactions.
+        :param signing_msg: the signing message
+        :param signing_dialogue: the dialogue
+        :return: None
+        """
+        self.context.logger.info(
+            f"signing of {len(signing_msg.signed_transactions)} transactions was successful.")
+        journal = cast(MintJournal, self.context.journal)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        distribution = cast(Distribution, self.context.distribution)
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        mint_pool = cast(MintPool, self.context.mint_pool)
+        nonce_signatures = []
+        for signed_transaction, contract_api_dialogue in zip(
+                signing_msg.signed_transactions, signing_dialogue.associated_contract_api_dialogues):
+            signature = transaction_signature(signed_transaction)
+            journal.signed(
+                journal_entry_id(contract_api_dialogue),
+                signature,
+                scheduler.journal_data(journal_entry_id(contract_api_dialogue)),
+            )
+            distribution.signed(journal_entry_id(contract_api_dialogue), signature)
+            token_requests.signed(journal_entry_id(contract_api_dialogue), signature)
+            request_kwargs = contract_api_dialogue.last_outgoing_message.kwargs.body
+            if "nonce_address" in request_kwargs:
+                nonce_signatures.append((request_kwargs["nonce_address"], signature))
+        # one write for the whole batch, before any of it can land
+        journal.flush()
+        for nonce_address, signature in nonce_signatures:
+            mint_pool.track(nonce_address, signature)
+        for signed_transaction in signing_msg.signed_transactions:
+            self.send_signed_transaction(signed_transaction, signing_dialogue)
+
+    def _handle_error(
+        self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Give up on the transactions the decision maker could not sign, releasing what they held.
+
+        :param signing_msg: the signing message
+        :param signing_dialogue: the dialogue
+        :return: None
+        """
+        self.context.logger.warning(
+            f"transaction signing was not successful. Error_code={signing_msg.error_code}")
+        if signing_dialogue.last_outgoing_message.performative is SigningMessage.Performative.SIGN_TRANSACTIONS:
+            contract_api_dialogues = signing_dialogue.associated_contract_api_dialogues
+        else:
+            contract_api_dialogues = (signing_dialogue.associated_contract_api_dialogue,)
+        journal = cast(MintJournal, self.context.journal)
+        fee_payers = cast(FeePayerPool, self.context.fee_payers)
+        scheduler = cast(MintScheduler, self.context.scheduler)
+        distribution = cast(Distribution, self.context.distribution)
+        strategy = cast(Strategy, self.context.strategy)
+        reason = f"signing failed: {signing_msg.error_code}"
+        for contract_api_dialogue in contract_api_dialogues:
+            entry_id = journal_entry_id(contract_api_dialogue)
+            journal.abandoned(entry_id)
+            fee_payers.release(entry_id)
+            if is_presigned_mint(contract_api_dialogue):
+                # the nonce account is read and refilled again
+                cast(MintPool, self.context.mint_pool).get_account(
+                    contract_api_dialogue.last_outgoing_message.kwargs.body["nonce_address"]
+                ).status = NonceAccountStatus.UNKNOWN
+            strategy.failed_txs += 1
+            scheduler.complete(entry_id, False)
+            self.context.handlers.fipa_handler.complete(
+                entry_id, {"status": "failed", "reason": reason})
+            if distribution.is_enabled:
+                distribution.fail(entry_id, reason)
+        journal.flush()
+        strategy.transacting = False
+        if distribution.is_enabled:
+            self.context.behaviours.scaffold.distribute()
+
+    def _handle_invalid(
+        self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Handle a signing message of invalid performative.
+        :param signing_msg: the signing message
+        :param signing_dialogue: the dialogue
+        :return: None
+        """
+        self.context.logger.warning(
+            f"cannot handle signing message of performative={signing_msg.performative} "
+            f"in dialogue={signing_dialogue}.")
+
+    def _handle_unidentified_dialogue(self, signing_msg: SigningMessage) -> None:
+        """
+        Handle an unidentified dialogue.
+        :param signing_msg: the message
+        :return: None
+        """
+        self.context.logger.info(
+            f"received invalid signing message={signing_msg}, unidentified dialogue.")
+
+    def send_signed_transaction(
+        self, signed_transaction: SigningMessage.SignedTransaction, signing_dialogue: SigningDialogue
+    ) -> None:
+        """
+        Send a signed transaction to the ledger.
+        :param signed_transaction: the signed transaction
+        :param signing_dialogue: the dialogue
+        :return: None
+        """
         ledger_api_dialogues = cast(
             LedgerApiDialogues, self.context.ledger_api_dialogues
         )
         ledger_api_msg, ledger_api_dialogue = ledger_api_dialogues.create(
             counterparty=LEDGER_API_ADDRESS,
             performative=LedgerApiMessage.Performative.SEND_SIGNED_TRANSACTION,
-            signed_transaction=signing_msg.signed_transaction,
+            signed_transaction=signed_transaction,
         )
         ledger_api_dialogue = cast(LedgerApiDialogue, ledger_api_dialogue)
         ledger_api_dialogue.associated_signing_dialogue = signing_dialogue
         self.context.outbox.put_message(message=ledger_api_msg)
         self.context.logger.info("sending transaction to ledger.")
+
+
+class FipaHandler(Handler):
+    """This class serves the token requests of other agents: a call for proposal is answered with the amount the agent mints them."""
+
+    SUPPORTED_PROTOCOL = FipaMessage.protocol_id
+
+    def setup(self) -> None:
+        """Implement the setup."""
+
+    def handle(self, message: Message) -> None:
+        """
+        Implement the reaction to a message.
+
+        :param message: the message
+        """
+        fipa_msg = cast(FipaMessage, message)
+        fipa_dialogues = cast(FipaDialogues, self.context.fipa_dialogues)
+        fipa_dialogue = cast(Optional[FipaDialogue], fipa_dialogues.update(fipa_msg))
+        if fipa_dialogue is None:
+            self.context.logger.warning(
+                f"received invalid fipa message={fipa_msg}, unidentified dialogue.")
+            return
+
+        if fipa_msg.performative is FipaMessage.Performative.CFP:
+            self._handle_cfp(fipa_msg, fipa_dialogue)
+        elif fipa_msg.performative in (
+            FipaMessage.Performative.ACCEPT,
+            FipaMessage.Performative.ACCEPT_W_INFORM,
+        ):
+            self._handle_accept(fipa_msg, fipa_dialogue)
+        elif fipa_msg.performative is FipaMessage.Performative.DECLINE:
+            self.context.logger.info(
+                f"{fipa_msg.sender[-5:]} declined the proposal.")
+        else:
+            self.context.logger.warning(
+                f"cannot handle fipa message of performative={fipa_msg.performative}.")
+
+    def teardown(self) -> None:
+        """Implement the handler teardown."""
+
+    def _handle_cfp(self, fipa_msg: FipaMessage, fipa_dialogue: FipaDialogue) -> None:
+        """
+        Propose the amount asked for in a call for proposal, or decline it.
+
+        :param fipa_msg: the call for proposal
+        :param fipa_dialogue: the dialogue
+        """
+        strategy = cast(Strategy, self.context.strategy)
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        amount = token_requests.amount_for(fipa_msg.query) if strategy.mint_exists else None
+        if amount is None:
+            reply = fipa_dialogue.reply(
+                performative=FipaMessage.Performative.DECLINE,
+                target_message=fipa_msg,
+            )
+        else:
+            reply = fipa_dialogue.reply(
+                performative=FipaMessage.Performative.PROPOSE,
+                target_message=fipa_msg,
+                proposal=Description(
+                    {
+                        "ledger_id": strategy.ledger_id,
+                        "mint": strategy.mint_address,
+                        "amount": amount,
+                        "price": 0,
+                    }
+                ),
+            )
+        self.context.outbox.put_message(message=reply)
+
+    def _handle_accept(self, fipa_msg: FipaMessage, fipa_dialogue: FipaDialogue) -> None:
+        """
+        Queue an accepted proposal, to mint it with the other requests.
+
+        The tokens go to the `address` given with an accept with inform, or else to the agent which accepted.
+
+        :param fipa_msg: the accept
+        :param fipa_dialogue: the dialogue
+        """
+        proposal = fipa_dialogue.get_message_by_id(fipa_msg.target).proposal
+        owner = fipa_dialogue.dialogue_label.dialogue_opponent_addr
+        if fipa_msg.performative is FipaMessage.Performative.ACCEPT_W_INFORM:
+            owner = fipa_msg.info.get("address", owner)
+        try:
+            PublicKey(owner)
+        except ValueError:
+            self.context.logger.warning(
+                f"cannot mint to {owner}, which is not a Solana address.")
+            reply = fipa_dialogue.reply(
+                performative=FipaMessage.Performative.DECLINE,
+                target_message=fipa_msg,
+            )
+            self.context.outbox.put_message(message=reply)
+            return
+
+        reply = fipa_dialogue.reply(
+            performative=FipaMessage.Performative.MATCH_ACCEPT_W_INFORM,
+            target_message=fipa_msg,
+            info={"status": "queued"},
+        )
+        self.context.outbox.put_message(message=reply)
+        token_requests = cast(TokenRequests, self.context.token_requests)
+        is_due = token_requests.enqueue(
+            TokenRequest(fipa_dialogue, owner, proposal.values["amount"], time.time()))
+        if is_due:
+            self.context.behaviours.token_requests.flush()
+
+    def complete(self, entry_id: str, info: Dict[str, Any]) -> None:
+        """
+        Inform the agents of a batch of token requests of the outcome of its transaction.
+
+        :param entry_id: the journal identifier of the transaction
+        :param info: the outcome, under 'status', and the transaction digest or the reason of a failure
+        """
+        batch = cast(TokenRequests, self.context.token_requests).complete(entry_id)
+        if batch is not None:
+            self.inform(batch, info)
+
+    def inform(self, batch: TokenRequestBatch, info: Dict[str, Any]) -> None:
+        """
+        Inform the agents of a batch of token requests of its outcome.
+
+        :param batch: the batch
+        :param info: the outcome
+        """
+        for request in batch.requests:
+            reply = request.fipa_dialogue.reply(
+                performative=FipaMessage.Performative.INFORM,
+                target_message=request.fipa_dialogue.last_outgoing_message,
+                info={key: str(value) for key, value in info.items()},
+            )
+            self.context.outbox.put_message(message=reply)
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains a durable journal of the mint transactions lifecycle."""
+
+import json
+import os
+import sqlite3
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from aea.helpers.transaction.base import SignedTransaction
+from aea.skills.base import Model
+
+from packages.dassy23.contracts.spl_token_program.transactions import (
+    transaction_signature as signature_of,
+)
+from packages.dassy23.skills.spl_token_skill.dialogues import ContractApiDialogue
+
+
+class MintStatus(Enum):
+    """The lifecycle of a mint transaction."""
+
+    BUILT = "built"
+    SIGNED = "signed"
+    SENT = "sent"
+    SETTLED = "settled"
+    FAILED = "failed"
+    EXPIRED = "expired"
+    ABANDONED = "abandoned"
+
+
+FINAL_STATUSES = (
+    MintStatus.SETTLED,
+    MintStatus.FAILED,
+    MintStatus.EXPIRED,
+    MintStatus.ABANDONED,
+)
+
+
+def journal_entry_id(contract_api_dialogue: ContractApiDialogue) -> str:
+    """Get the journal identifier of the transaction built in a contract api dialogue."""
+    return contract_api_dialogue.dialogue_label.dialogue_reference[0]
+
+
+def transaction_signature(signed_transaction: SignedTransaction) -> str:
+    """Get the signature, which is also the transaction digest, of a signed transaction, legacy or versioned."""
+    return signature_of(signed_transaction.body)
+
+
+class MintJournal(Model):
+    """
+    This class keeps an append-only journal of the mint transactions in a local SQLite database.
+
+    Every lifecycle change is appended as a new row; the latest row of an entry is its current status.
+    Rows are buffered in memory and written in a single transaction once `journal_batch_size`
+    rows are pending or when `flush` is called. Handlers flush right before a signed transaction
+    leaves the agent, so a signature is always on disk before it can land on chain.
+
+    Along with the history, the same transaction keeps a table of the latest status of every entry
+    a restart still needs, so that a restart reads no more than that. An entry leaves it once it is
+    finished, except a settled one signed with data, which stays until a later entry of the same
+    "slot" of data settles, e.g. the next interval minted to the same destination.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the journal."""
+        self.journal_path = kwargs.pop("journal_path", "mint_journal.db")
+        self.journal_batch_size = kwargs.pop("journal_batch_size", 16)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pending_rows: List[
+            Tuple[str, str, Optional[str], Optional[str], float, Optional[str]]
+        ] = []
+        self._entry_id_by_signature: Dict[str, str] = {}
+        super().__init__(*args, **kwargs)
+
+    def setup(self) -> None:
+        """Open the journal, creating it if it does not exist."""
+        if self._connection is not None:
+            return
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.journal_path)
+        # WAL with normal synchronisation keeps a commit down to a single append
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS mint_journal ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "entry_id TEXT NOT NULL, "
+            "status TEXT NOT NULL, "
+            "signature TEXT, "
+            "data TEXT, "
+            "timestamp REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS mint_journal_entry_id ON mint_journal (entry_id)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS mint_latest ("
+            "entry_id TEXT PRIMARY KEY, "
+            "status TEXT NOT NULL, "
+            "signature TEXT, "
+            "data TEXT, "
+            "slot TEXT)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS mint_latest_slot ON mint_latest (slot)"
+        )
+        self._connection.commit()
+        self.context.logger.info(f"Mint journal opened at {self.journal_path}")
+
+    def teardown(self) -> None:
+        """Write the pending rows and close the journal."""
+        if self._connection is None:
+            return
+        self.flush()
+        self._connection.close()
+        self._connection = None
+
+    def built(self, entry_id: str, data: Dict[str, Any]) -> None:
+        """
+        Record that the transaction of a mint has been built.
+
+        :param entry_id: the identifier of the mint
+        :param data: the parameters the transaction was built with
+        """
+        self._append(entry_id, MintStatus.BUILT, data=json.dumps(data, default=str))
+
+    def signed(
+        self, entry_id: str, signature: str, data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Record that the transaction of a mint has been signed.
+
+        :param entry_id: the identifier of the mint
+        :param signature: the transaction signature
+        :param data: what a restart needs to know of the transaction, e.g. the mint it was planned for.
+            Once the entry settles, it supersedes the settled entries whose data has the same "slot".
+        """
+        self._entry_id_by_signature[signature] = entry_id
+        self._append(
+            entry_id,
+            MintStatus.SIGNED,
+            signature=signature,
+            data=None if data is None else json.dumps(data, default=str),
+            slot=None if data is None else data.get("slot"),
+        )
+
+    def sent(self, signature: str) -> None:
+        """
+        Record that a signed transaction has been accepted by the ledger.
+
+        :param signature: the transaction signature
+        """
+        self._append_by_signature(signature, MintStatus.SENT)
+
+    def settled(self, signature: str, is_successful: bool) -> Optional[str]:
+        """
+        Record the outcome of a sent transaction.
+
+        :param signature: the transaction signature
+        :param is_successful: whether the transaction was settled successfully
+        :return: the identifier of the mint, if the signature is in the journal
+        """
+        status = MintStatus.SETTLED if is_successful else MintStatus.FAILED
+        self._append_by_signature(signature, status)
+        return self._entry_id_by_signature.pop(signature, None)
+
+    def expired(self, signature: str) -> Optional[str]:
+        """
+        Record that a sent transaction can no longer land, as its blockhash has expired.
+
+        :param signature: the transaction signature
+        :return: the identifier of the mint, if the signature is in the journal
+        """
+        self._append_by_signature(signature, MintStatus.EXPIRED)
+        return self._entry_id_by_signature.pop(signature, None)
+
+    def abandoned(self, entry_id: str) -> None:
+        """
+        Record that a mint will not be tracked any further.
+
+        :param entry_id: the identifier of the mint
+        """
+        self._append(entry_id, MintStatus.ABANDONED)
+
+    def flush(self) -> None:
+        """Write all the pending rows in a single transaction."""
+        if self._connection is None or len(self._pending_rows) == 0:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO mint_journal (entry_id, status, signature, data, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [row[:5] for row in self._pending_rows],
+            )
+            for entry_id, status, signature, data, _, slot in self._pending_rows:
+                self._update_latest(entry_id, status, signature, data, slot)
+        self._pending_rows = []
+
+    def unfinished(
+        self,
+    ) -> List[Tuple[str, MintStatus, Optional[str], Optional[Dict[str, Any]]]]:
+        """
+        Get the entries that did not reach a final status.
+
+        :return: a list of (entry id, latest status, signature, data it was signed with) tuples
+        """
+        self.flush()
+        if self._connection is None:
+            return []
+        rows = self._connection.execute(
+            "SELECT entry_id, status, signature, data FROM mint_latest "
+            f"WHERE status NOT IN ({', '.join('?' * len(FINAL_STATUSES))}) ORDER BY rowid",
+            [status.value for status in FINAL_STATUSES],
+        ).fetchall()
+        unfinished = [
+            (entry_id, MintStatus(status), signature, None if data is None else json.loads(data))
+            for entry_id, status, signature, data in rows
+        ]
+        for entry_id, _, signature, _ in unfinished:
+            if signature is not None:
+                self._entry_id_by_signature[signature] = entry_id
+        return unfinished
+
+    def settled_data(self) -> List[Dict[str, Any]]:
+        """
+        Get the data the settled entries were signed with, e.g. the mints they were planned for.
+
+        :return: the data of every settled entry signed with some and not superseded, oldest first
+        """
+        self.flush()
+        if self._connection is None:
+            return []
+        rows = self._connection.execute(
+            "SELECT data FROM mint_latest WHERE status = ? AND data IS NOT NULL ORDER BY rowid",
+            (MintStatus.SETTLED.value,),
+        ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def _update_latest(
+        self,
+        entry_id: str,
+        status: str,
+        signature: Optional[str],
+        data: Optional[str],
+        slot: Optional[str],
+    ) -> None:
+        """Bring the latest status of an entry up to a row, dropping what a restart no longer needs."""
+        connection = cast(sqlite3.Connection, self._connection)
+        connection.execute(
+            "INSERT INTO mint_latest (entry_id, status, signature, data, slot) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (entry_id) DO UPDATE SET "
+            "status = excluded.status, "
+            "signature = COALESCE(excluded.signature, signature), "
+            "data = COALESCE(excluded.data, data), "
+            "slot = COALESCE(excluded.slot, slot)",
+            # only the data an entry was signed with is kept for a restart
+            (entry_id, status, signature, data if status == MintStatus.SIGNED.value else None, slot),
+        )
+        if status not in [final_status.value for final_status in FINAL_STATUSES]:
+            return
+        if status != MintStatus.SETTLED.value:
+            connection.execute("DELETE FROM mint_latest WHERE entry_id = ?", (entry_id,))
+            return
+        connection.execute(
+            "DELETE FROM mint_latest WHERE (entry_id = ? AND data IS NULL) OR (status = ? AND "
+            "slot = (SELECT slot FROM mint_latest WHERE entry_id = ?) AND entry_id != ?)",
+            (entry_id, MintStatus.SETTLED.value, entry_id, entry_id),
+        )
+
+    def _append_by_signature(self, signature: str, status: MintStatus) -> None:
+        """Append a row for the entry a signature belongs to."""
+        entry_id = self._entry_id_by_signature.get(signature)
+        if entry_id is None:
+            self.context.logger.warning(
+                f"Transaction {signature} is not in the mint journal."
+            )
+            return
+        self._append(entry_id, status, signature=signature)
+
+    def _append(
+        self,
+        entry_id: str,
+        status: MintStatus,
+        signature: Optional[str] = None,
+        data: Optional[str] = None,
+        slot: Optional[str] = None,
+    ) -> None:
+        """Buffer a row, writing the buffer out once it is full."""
+        self._pending_rows.append((entry_id, status.value, signature, data, time.time(), slot))
+        if len(self._pending_rows) >= self.journal_batch_size:
+            self.flush()
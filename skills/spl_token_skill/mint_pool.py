@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains a pool of mint transactions signed ahead of time on durable nonces."""
+
+import time
+from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from aea.helpers.transaction.base import SignedTransaction
+from aea.skills.base import Model
+from aea_ledger_solana import PublicKey
+
+from packages.dassy23.skills.spl_token_skill.dialogues import (
+    ContractApiDialogue,
+    SigningDialogue,
+)
+
+
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+
+
+class NonceAccountStatus(Enum):
+    """The state of a nonce account of the pool."""
+
+    UNKNOWN = "unknown"
+    QUERYING = "querying"
+    CREATING = "creating"
+    SIGNING = "signing"
+    READY = "ready"
+    SPENT = "spent"
+    CHECKING = "checking"
+
+
+class PresignedMint(NamedTuple):
+    """A mint transaction signed on a durable nonce, ready to be sent."""
+
+    nonce_address: str
+    nonce: str
+    amount: int
+    signed_transaction: SignedTransaction
+    contract_api_dialogue: ContractApiDialogue
+    signing_dialogue: SigningDialogue
+
+
+class NonceAccount:
+    """A durable nonce account of the pool."""
+
+    __slots__ = ("address", "seed", "status", "signature", "presigned_mint", "sent_at")
+
+    def __init__(self, address: str, seed: str) -> None:
+        """Initialize the nonce account."""
+        self.address = address
+        self.seed = seed
+        self.status = NonceAccountStatus.UNKNOWN
+        self.signature: Optional[str] = None
+        self.presigned_mint: Optional[PresignedMint] = None
+        self.sent_at: Optional[float] = None
+
+
+class MintPool(Model):
+    """
+    This class keeps one pre-signed mint transaction per durable nonce account.
+
+    A transaction built on a durable nonce stays valid until the nonce is advanced, which the
+    transaction itself does as its first instruction. So each nonce account holds at most one
+    signed mint; once it settles the nonce has moved on and the account is refilled.
+
+    A mint on a durable nonce never expires, so a sent one whose receipt did not come within
+    `spent_nonce_timeout` seconds is checked against its nonce account. If the nonce has not
+    advanced, the mint never landed: it goes back to the pool, ahead of the others, to be sent
+    again as it is, so that it cannot land twice.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the pool."""
+        self.nonce_accounts = kwargs.pop("nonce_accounts", 0)
+        self.nonce_seed = kwargs.pop("nonce_seed", "nonce")
+        self.spent_nonce_timeout = kwargs.pop("spent_nonce_timeout", 120)
+        self._accounts: Dict[str, NonceAccount] = {}
+        super().__init__(*args, **kwargs)
+
+    @property
+    def is_enabled(self) -> bool:
+        """Check whether mints are signed ahead of time."""
+        return self.nonce_accounts > 0
+
+    def setup(self) -> None:
+        """Derive the addresses of the nonce accounts of the agent."""
+        for index in range(self.nonce_accounts):
+            seed = f"{self.nonce_seed}{index}"
+            address = (
+                PublicKey.create_with_seed(
+                    PublicKey(self.context.agent_address),
+                    seed,
+                    PublicKey(SYSTEM_PROGRAM_ID),
+                )
+                .to_base58()
+                .decode()
+            )
+            self._accounts[address] = NonceAccount(address, seed)
+
+    def get_account(self, nonce_address: str) -> NonceAccount:
+        """Get a nonce account of the pool by address."""
+        return self._accounts[nonce_address]
+
+    def accounts_to_query(self) -> List[NonceAccount]:
+        """
+        Get the accounts whose nonce must be read before they can be refilled.
+
+        The accounts are marked as being queried.
+
+        :return: the nonce accounts
+        """
+        accounts = [
+            account
+            for account in self._accounts.values()
+            if account.status is NonceAccountStatus.UNKNOWN
+        ]
+        for account in accounts:
+            account.status = NonceAccountStatus.QUERYING
+        return accounts
+
+    def store(self, presigned_mint: PresignedMint) -> None:
+        """
+        Keep a signed mint until it is needed.
+
+        :param presigned_mint: the signed mint
+        """
+        account = self._accounts[presigned_mint.nonce_address]
+        account.presigned_mint = presigned_mint
+        account.status = NonceAccountStatus.READY
+
+    def take(self, amount: int) -> Optional[PresignedMint]:
+        """
+        Take a signed mint of a given amount out of the pool, the ones sent before which never landed first.
+
+        :param amount: the amount to mint
+        :return: the signed mint, or None if none is ready for that amount
+        """
+        accounts = sorted(
+            self._accounts.values(), key=lambda account: account.sent_at is None)
+        for account in accounts:
+            if (
+                account.status is NonceAccountStatus.READY
+                and account.presigned_mint is not None
+                and account.presigned_mint.amount == amount
+            ):
+                account.status = NonceAccountStatus.SPENT
+                return account.presigned_mint
+        return None
+
+    def track(self, nonce_address: str, signature: str, now: Optional[float] = None) -> None:
+        """
+        Wait for the receipt of a transaction which uses a nonce account.
+
+        :param nonce_address: the nonce account
+        :param signature: the transaction signature
+        :param now: the time the transaction is sent, defaults to the system clock
+        """
+        account = self._accounts[nonce_address]
+        account.signature = signature
+        account.sent_at = time.time() if now is None else now
+
+    def on_receipt(self, signature: str) -> None:
+        """
+        Release the nonce account a settled transaction used, so it is refilled.
+
+        :param signature: the transaction signature
+        """
+        for account in self._accounts.values():
+            if account.signature == signature:
+                account.signature = None
+                account.presigned_mint = None
+                account.sent_at = None
+                account.status = NonceAccountStatus.UNKNOWN
+                return
+
+    def accounts_to_check(self, now: Optional[float] = None) -> List[NonceAccount]:
+        """
+        Get the accounts whose mint was sent too long ago without a receipt, to read whether their nonce advanced.
+
+        The accounts are marked as being checked.
+
+        :param now: the current time, defaults to the system clock
+        :return: the nonce accounts
+        """
+        now = time.time() if now is None else now
+        accounts = [
+            account
+            for account in self._accounts.values()
+            if account.status is NonceAccountStatus.SPENT
+            and account.presigned_mint is not None
+            and account.sent_at is not None
+            and now - account.sent_at >= self.spent_nonce_timeout
+        ]
+        for account in accounts:
+            account.status = NonceAccountStatus.CHECKING
+        return accounts
+
+    def on_nonce(self, nonce_address: str, nonce: Optional[str], now: Optional[float] = None) -> bool:
+        """
+        Settle the check of an account whose mint was sent without a receipt.
+
+        If the nonce advanced, the mint landed, and the account waits for its receipt again. If not,
+        the mint never landed, and it goes back to the pool to be sent again.
+
+        :param nonce_address: the nonce account
+        :param nonce: the nonce the account holds now, None if it does not exist
+        :param now: the current time, defaults to the system clock
+        :return: whether the mint landed
+        """
+        account = self._accounts[nonce_address]
+        has_landed = account.presigned_mint is None or nonce != account.presigned_mint.nonce
+        if has_landed:
+            account.status = NonceAccountStatus.SPENT
+            account.sent_at = time.time() if now is None else now
+        else:
+            account.status = NonceAccountStatus.READY
+            account.signature = None
+        return has_landed
+
+    @property
+    def ready(self) -> int:
+        """Get the number of signed mints ready to be sent."""
+        return len(
+            [
+                account
+                for account in self._accounts.values()
+                if account.status is NonceAccountStatus.READY
+            ]
+        )
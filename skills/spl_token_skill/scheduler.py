@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains a scheduler which plans each mint exactly once."""
+
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, cast
+
+from aea.skills.base import Model
+
+from packages.dassy23.skills.spl_token_skill.journal import MintJournal
+
+
+class MintSpec(NamedTuple):
+    """A mint of the agent, with the schedule it is minted on."""
+
+    seed: str
+    mint_address: str
+    amount: int
+    interval: Optional[float]
+    recipients: Tuple[str, ...]
+
+
+class PlannedMint(NamedTuple):
+    """A mint planned for one service interval."""
+
+    key: str
+    mint_address: str
+    destination: str
+    interval: int
+    amount: int
+    planned_at: float
+
+
+class MintScheduler(Model):
+    """
+    This class decides whether a tick should mint, and how much.
+
+    Every planned mint gets a deterministic key made of the mint, the destination and the
+    index of the service interval it belongs to. While a mint to a destination is in flight,
+    no other mint to it is planned. An interval is only marked as minted once its transaction
+    settles, so a failed mint is planned again on the next tick.
+
+    The mints of the agent are kept in a priority queue of the time their next interval starts,
+    so a tick only looks at the mints which are due, however many there are. At most
+    `max_in_flight_mints` mints are in flight at once, over all of them (0 for no limit).
+
+    The minted intervals and the mints in flight are rebuilt from the journal on setup, so that a
+    restart plans none of them again.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the scheduler."""
+        self.coalesce_missed_ticks = kwargs.pop("coalesce_missed_ticks", False)
+        self.in_flight_timeout = kwargs.pop("in_flight_timeout", 150)
+        self.suppressed = 0
+        self._last_minted_interval: Dict[Tuple[str, str], int] = {}
+        self._in_flight: Dict[Tuple[str, str], PlannedMint] = {}
+        self._planned_by_entry_id: Dict[str, PlannedMint] = {}
+        # the other way round, so that a mint is released without a scan of all the entries
+        self._entry_ids_by_target: Dict[Tuple[str, str], List[str]] = {}
+        self.max_in_flight_mints = kwargs.pop("max_in_flight_mints", 0)
+        self._due: List[Tuple[float, int, MintSpec, float]] = []
+        self._sequence = itertools.count()
+        super().__init__(*args, **kwargs)
+
+    def setup(self) -> None:
+        """Rebuild the minted intervals and the mints in flight from the journal."""
+        journal = cast(MintJournal, self.context.journal)
+        # the models are not set up in any set order
+        journal.setup()
+        for data in journal.settled_data():
+            planned = self.from_journal_data(data)
+            if planned is not None:
+                self.minted(planned)
+        for entry_id, _, signature, data in journal.unfinished():
+            planned = self.from_journal_data(data)
+            if signature is not None and planned is not None:
+                self.attach(planned, entry_id, can_expire=planned.planned_at != float("inf"))
+        if len(self._in_flight) > 0:
+            self.context.logger.info(
+                f"Mints {[planned.key for planned in self._in_flight.values()]} are still in flight.")
+
+    def schedule(self, spec: MintSpec, interval: float, now: Optional[float] = None) -> None:
+        """
+        Add a mint to the schedule, due right away.
+
+        :param spec: the mint
+        :param interval: the length of its intervals in seconds
+        :param now: the current time, defaults to the system clock
+        """
+        now = time.time() if now is None else now
+        heapq.heappush(self._due, (now, next(self._sequence), spec, interval))
+
+    def next_due(self, now: Optional[float] = None) -> Optional[Tuple[MintSpec, float]]:
+        """
+        Take the next mint whose interval has started, scheduling its next interval.
+
+        :param now: the current time, defaults to the system clock
+        :return: the mint and the length of its intervals, or None if none is due or too many
+            mints are in flight
+        """
+        now = time.time() if now is None else now
+        if len(self._due) == 0 or self._due[0][0] > now or self.is_at_capacity:
+            return None
+        _, _, spec, interval = self._due[0]
+        heapq.heapreplace(
+            self._due, ((now // interval + 1) * interval, next(self._sequence), spec, interval))
+        return spec, interval
+
+    @property
+    def is_at_capacity(self) -> bool:
+        """Check whether as many mints as allowed are in flight."""
+        return 0 < self.max_in_flight_mints <= len(self._in_flight)
+
+    def plan(
+        self,
+        mint_address: str,
+        destination: str,
+        service_interval: float,
+        mint_amount: int,
+        now: Optional[float] = None,
+    ) -> Optional[PlannedMint]:
+        """
+        Plan the mint due at a given time.
+
+        :param mint_address: the mint to mint from
+        :param destination: the owner of the receiving token account
+        :param service_interval: the length of an interval in seconds
+        :param mint_amount: the amount minted per interval
+        :param now: the current time, defaults to the system clock
+        :return: the planned mint, or None if nothing should be minted
+        """
+        now = time.time() if now is None else now
+        target = (mint_address, destination)
+        interval = int(now // service_interval)
+
+        in_flight = self._in_flight.get(target)
+        if in_flight is not None:
+            if now - in_flight.planned_at < self.in_flight_timeout:
+                self.suppressed += 1
+                self.context.logger.info(
+                    f"Mint {in_flight.key} is still in flight, skipping interval {interval}."
+                )
+                return None
+            # its blockhash has expired by now, so it can no longer land
+            self.context.logger.warning(
+                f"Mint {in_flight.key} timed out, planning it again."
+            )
+            self._release(in_flight)
+
+        last_minted = self._last_minted_interval.get(target)
+        if last_minted is not None and interval <= last_minted:
+            self.suppressed += 1
+            return None
+
+        intervals = 1
+        if self.coalesce_missed_ticks and last_minted is not None:
+            intervals = interval - last_minted
+
+        planned = PlannedMint(
+            key=f"{mint_address}:{destination}:{interval}",
+            mint_address=mint_address,
+            destination=destination,
+            interval=interval,
+            amount=mint_amount * intervals,
+            planned_at=now,
+        )
+        self._in_flight[target] = planned
+        return planned
+
+    def attach(
+        self, planned: PlannedMint, entry_id: str, can_expire: bool = True
+    ) -> None:
+        """
+        Link a planned mint to the journal entry of its transaction.
+
+        :param planned: the planned mint
+        :param entry_id: the journal identifier of the mint transaction
+        :param can_expire: whether the transaction expires with its blockhash. Mints on a durable
+            nonce never time out, as they could still land after any timeout.
+        """
+        if not can_expire:
+            planned = planned._replace(planned_at=float("inf"))
+        target = (planned.mint_address, planned.destination)
+        self._in_flight[target] = planned
+        self._planned_by_entry_id[entry_id] = planned
+        self._entry_ids_by_target.setdefault(target, []).append(entry_id)
+
+    def journal_data(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get what the journal keeps of the planned mint of a transaction, for a restart to pick it up.
+
+        :param entry_id: the journal identifier of the mint transaction
+        :return: the data to sign the journal entry with, or None if the entry is not a planned mint
+        """
+        planned = self._planned_by_entry_id.get(entry_id)
+        if planned is None:
+            return None
+        # a restart needs the last minted interval of a destination only
+        return {
+            "planned": planned._asdict(),
+            "slot": f"{planned.mint_address}:{planned.destination}",
+        }
+
+    @staticmethod
+    def from_journal_data(data: Optional[Dict[str, Any]]) -> Optional[PlannedMint]:
+        """
+        Get the planned mint a journal entry was signed with.
+
+        :param data: the data of the journal entry
+        :return: the planned mint, or None if the entry is not a planned mint
+        """
+        if data is None or "planned" not in data:
+            return None
+        return PlannedMint(**data["planned"])
+
+    def minted(self, planned: PlannedMint) -> None:
+        """
+        Mark the interval of a planned mint as minted, so it is not planned again.
+
+        :param planned: the planned mint, whose transaction settled
+        """
+        target = (planned.mint_address, planned.destination)
+        self._last_minted_interval[target] = max(
+            planned.interval, self._last_minted_interval.get(target, planned.interval)
+        )
+
+    def complete(self, entry_id: str, is_successful: bool) -> None:
+        """
+        Mark the mint of a journal entry as finished.
+
+        :param entry_id: the journal identifier of the mint transaction
+        :param is_successful: whether the mint transaction was settled successfully
+        """
+        planned = self._planned_by_entry_id.get(entry_id)
+        if planned is None:
+            return
+        self._release(planned)
+        if is_successful:
+            self.minted(planned)
+
+    def retry(self, entry_id: str) -> Optional[PlannedMint]:
+        """
+        Take back the planned mint of a transaction which expired without landing, to build it again.
+
+        The mint stays in flight, so that no other mint to its destination is planned meanwhile.
+
+        :param entry_id: the journal identifier of the expired mint transaction
+        :return: the planned mint, or None if the entry is not a planned mint
+        """
+        planned = self._planned_by_entry_id.get(entry_id)
+        if planned is None:
+            return None
+        self._release(planned)
+        planned = planned._replace(planned_at=time.time())
+        self._in_flight[(planned.mint_address, planned.destination)] = planned
+        return planned
+
+    def _release(self, planned: PlannedMint) -> None:
+        """Stop tracking a planned mint as in flight."""
+        target = (planned.mint_address, planned.destination)
+        if self._in_flight.get(target) is planned:
+            del self._in_flight[target]
+        entry_ids = self._entry_ids_by_target.get(target, [])
+        for entry_id in [
+            entry_id for entry_id in entry_ids if self._planned_by_entry_id.get(entry_id) is planned
+        ]:
+            del self._planned_by_entry_id[entry_id]
+            entry_ids.remove(entry_id)
+        if len(entry_ids) == 0:
+            self._entry_ids_by_target.pop(target, None)
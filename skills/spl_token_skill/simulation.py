@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains the pre-flight simulation stage of the transactions, between building and signing them."""
+
+from typing import Any, Dict, List, Tuple
+
+from aea.helpers.transaction.base import RawTransaction
+from aea.skills.base import Model
+
+from packages.dassy23.skills.spl_token_skill.dialogues import ContractApiDialogue
+
+
+# the errors a transaction built again, on a new blockhash or with another fee payer, may not run into
+REPAIRABLE_ERRORS = ("BlockhashNotFound", "InsufficientFundsForFee", "AccountNotFound")
+FEE_PAYER_ERRORS = ("InsufficientFundsForFee", "AccountNotFound")
+
+PendingTransaction = Tuple[RawTransaction, ContractApiDialogue]
+
+
+def is_repairable(err: str) -> bool:
+    """Check whether a simulation error may go away once the transaction is built again."""
+    return any(error in err for error in REPAIRABLE_ERRORS)
+
+
+def is_fee_payer_error(err: str) -> bool:
+    """Check whether a simulation error is down to the fee payer."""
+    return any(error in err for error in FEE_PAYER_ERRORS)
+
+
+class Simulation(Model):
+    """
+    This class collects the built transactions to simulate them in batches before they are signed.
+
+    A transaction which fails its simulation would only be found out after being sent and waited
+    for. So it is dropped instead, or built again, at most `simulation_max_repairs` times, if the
+    error may go away on a new blockhash or with another fee payer. The ones which pass are signed
+    with a compute unit limit of the units they consumed times `compute_unit_margin`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the simulation stage."""
+        self.simulation_enabled = kwargs.pop("simulation_enabled", False)
+        self.simulation_batch_size = kwargs.pop("simulation_batch_size", 8)
+        self.simulation_max_repairs = kwargs.pop("simulation_max_repairs", 1)
+        self.compute_unit_margin = kwargs.pop("compute_unit_margin", 1.1)
+        self._pending: List[PendingTransaction] = []
+        self._in_flight: Dict[str, List[PendingTransaction]] = {}
+        self._repairs: Dict[str, int] = {}
+        self.simulated = 0
+        self.passed = 0
+        self.dropped = 0
+        self.repaired = 0
+        self.units_consumed = 0
+        super().__init__(*args, **kwargs)
+
+    @property
+    def is_enabled(self) -> bool:
+        """Check whether the transactions are simulated before they are signed."""
+        return self.simulation_enabled
+
+    def add(self, raw_transaction: RawTransaction, contract_api_dialogue: ContractApiDialogue) -> bool:
+        """
+        Queue a built transaction for the next simulation.
+
+        :param raw_transaction: the transaction
+        :param contract_api_dialogue: the dialogue it was built in
+        :return: whether a full batch is waiting
+        """
+        self._pending.append((raw_transaction, contract_api_dialogue))
+        return len(self._pending) >= self.simulation_batch_size
+
+    def take(self) -> List[PendingTransaction]:
+        """Take the queued transactions out, to simulate them."""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def track(self, entry_id: str, pending: List[PendingTransaction]) -> None:
+        """
+        Keep the transactions being simulated until the results come in.
+
+        :param entry_id: the identifier of the simulation request
+        :param pending: the transactions, in the order they are simulated in
+        """
+        self._in_flight[entry_id] = pending
+
+    def results_of(self, entry_id: str) -> List[PendingTransaction]:
+        """Get the transactions a simulation request was made for."""
+        return self._in_flight.pop(entry_id, [])
+
+    def on_pass(self, entry_id: str, units_consumed: int) -> None:
+        """
+        Record that a transaction passed its simulation.
+
+        :param entry_id: the journal identifier of the transaction
+        :param units_consumed: the compute units it consumed
+        """
+        self._repairs.pop(entry_id, None)
+        self.simulated += 1
+        self.passed += 1
+        self.units_consumed += units_consumed or 0
+
+    def can_repair(self, entry_id: str) -> bool:
+        """Check whether a transaction which failed its simulation may still be built again."""
+        return self._repairs.get(entry_id, 0) < self.simulation_max_repairs
+
+    def on_repair(self, entry_id: str, new_entry_id: str) -> None:
+        """
+        Record that a transaction which failed its simulation is built again.
+
+        :param entry_id: the journal identifier of the failed transaction
+        :param new_entry_id: the journal identifier of the new one
+        """
+        self._repairs[new_entry_id] = self._repairs.pop(entry_id, 0) + 1
+        self.simulated += 1
+        self.repaired += 1
+
+    def on_drop(self, entry_id: str) -> None:
+        """
+        Record that a transaction which failed its simulation is given up on.
+
+        :param entry_id: the journal identifier of the transaction
+        """
+        self._repairs.pop(entry_id, None)
+        self.simulated += 1
+        self.dropped += 1
+
+    def report(self) -> str:
+        """Get the outcomes of the simulations."""
+        average = self.units_consumed / self.passed if self.passed > 0 else 0
+        return (
+            f"Simulated {self.simulated} transactions: {self.passed} passed "
+            f"(using {average:.0f} compute units on average), {self.repaired} built again "
+            f"and {self.dropped} dropped before being signed."
+        )
+
+    def teardown(self) -> None:
+        """Log the outcomes of the simulations."""
+        if self.is_enabled:
+            self.context.logger.info(self.report())
@@ -19,8 +19,14 @@
 
 """This package contains a scaffold of a model."""
 
+from typing import Dict, List, Optional
+
 from aea.skills.base import Model
 from aea.helpers.transaction.base import Terms
+from aea_ledger_solana import PublicKey
+
+from packages.dassy23.skills.spl_token_skill.balances import TokenBalances
+from packages.dassy23.skills.spl_token_skill.scheduler import MintSpec
 from enum import Enum
 
 
@@ -33,6 +39,13 @@ class Strategy(Model):
         self.mint_exists = False
         self.mint_seed = kwargs.pop("mint_seed")
         self.mint_amount = kwargs.pop("mint_amount", 1)
+        self.mints = kwargs.pop("mints", None) or []
+        self.existing_mints = set()
+        self._mint_specs: Optional[List[MintSpec]] = None
+        self._mint_specs_by_address: Dict[str, MintSpec] = {}
+        self.signing_batch_size = kwargs.pop("signing_batch_size", 1)
+        self.token_balances = TokenBalances(kwargs.pop("balance_check_interval", 600))
+        self.pending_raw_transactions = []
         self.tokens_minted = 0
         self.transacting = False
         self.failed_txs = 0
@@ -46,6 +59,45 @@ class Strategy(Model):
         self.log(f"Agent Address {self.context.agent_address}")
         return super().setup()
 
+    @property
+    def mint_address(self) -> str:
+        """Get the address of the mint the agent derives from its address and the mint seed."""
+        return self.mint_specs[0].mint_address
+
+    @property
+    def mint_specs(self) -> List[MintSpec]:
+        """Get the mints of the agent: the one of the mint seed first, then the ones listed under `mints`."""
+        if self._mint_specs is None:
+            self._mint_specs = [
+                MintSpec(
+                    seed=mint["seed"],
+                    mint_address=self.derive_mint_address(mint["seed"]),
+                    amount=mint.get("amount", self.mint_amount),
+                    interval=mint.get("interval"),
+                    recipients=tuple(mint.get("recipients") or [self.context.agent_address]),
+                )
+                for mint in [{"seed": self.mint_seed}] + self.mints
+            ]
+        return self._mint_specs
+
+    def mint_spec(self, mint_address: str) -> Optional[MintSpec]:
+        """Get the mint of the agent at an address, if any."""
+        if len(self._mint_specs_by_address) == 0:
+            self._mint_specs_by_address = {spec.mint_address: spec for spec in self.mint_specs}
+        return self._mint_specs_by_address.get(mint_address)
+
+    def derive_mint_address(self, seed: str) -> str:
+        """Get the address of the mint the agent derives from its address and a seed."""
+        return PublicKey.create_with_seed(
+            PublicKey(self.context.agent_address), seed, PublicKey(
+                "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")).to_base58().decode()
+
+    def on_mint_exists(self, mint_address: str) -> None:
+        """Record that a mint of the agent exists, so that it is minted from."""
+        self.existing_mints.add(mint_address)
+        if mint_address == self.mint_address:
+            self.mint_exists = True
+
     def get_deploy_terms(self) -> Terms:
         """
         Get deploy terms of deployment.
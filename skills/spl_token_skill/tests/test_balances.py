@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the index of the token balances."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from packages.dassy23.skills.spl_token_skill.balances import TokenBalances, token_balance_changes
+
+
+MINT = "mint"
+OWNER = "owner"
+OTHER = "other"
+
+
+def meta(*changes: Tuple[str, Optional[int], int]) -> Dict[str, Any]:
+    """Make the meta of a receipt, out of the owner and the balances before and after of every token account."""
+
+    def token_balances(index_amounts: List[Tuple[int, str, int]]) -> List[Dict[str, Any]]:
+        return [
+            {"accountIndex": index, "owner": owner, "mint": MINT, "uiTokenAmount": {"amount": str(amount)}}
+            for index, owner, amount in index_amounts
+        ]
+
+    return {
+        "preTokenBalances": token_balances([
+            (index, owner, before) for index, (owner, before, _) in enumerate(changes) if before is not None]),
+        "postTokenBalances": token_balances([
+            (index, owner, after) for index, (owner, _, after) in enumerate(changes)]),
+    }
+
+
+def test_token_balance_changes() -> None:
+    """Test a token account created by the transaction starts from nothing."""
+    assert token_balance_changes(meta((OWNER, 3, 8), (OTHER, None, 2))) == [
+        (OWNER, MINT, 3, 8), (OTHER, MINT, 0, 2)]
+    assert token_balance_changes({"preTokenBalances": None, "postTokenBalances": None}) == []
+
+
+def test_on_receipt() -> None:
+    """Test the balances move by the receipts, and the supply only once it was read."""
+    balances = TokenBalances()
+    # a mint of 5 to an owner who held 3
+    assert balances.on_receipt(meta((OWNER, 3, 8)), slot=10) == {MINT: 5}
+    assert balances.balance(OWNER, MINT) == 8
+    assert balances.supply(MINT) is None
+    # a transfer of 2 to another owner, whose account it creates
+    assert balances.on_receipt(meta((OWNER, 8, 6), (OTHER, None, 2)), slot=11) == {MINT: 0}
+    assert (balances.balance(OWNER, MINT), balances.balance(OTHER, MINT)) == (6, 2)
+    assert balances.receipts == 2
+
+
+def test_check_as_of_slot() -> None:
+    """Test a read from the chain keeps the receipts of the later slots, and the earlier ones coming after it are left out."""
+    balances = TokenBalances()
+    balances.on_receipt(meta((OWNER, 0, 5)), slot=10)
+    assert not balances.check_supply(MINT, 100, slot=12)
+    # the receipts of slots 13 and 11 come in out of order
+    balances.on_receipt(meta((OWNER, 6, 10)), slot=13)
+    assert (balances.balance(OWNER, MINT), balances.supply(MINT)) == (9, 104)
+    # landed before the read, so the read already counts it
+    balances.on_receipt(meta((OWNER, 5, 6)), slot=11)
+    assert (balances.balance(OWNER, MINT), balances.supply(MINT)) == (10, 104)
+    # the chain at slot 12, with the mint of slot 13 on top of it
+    assert balances.check_balances(OWNER, {MINT: 6}, slot=12) == []
+    assert balances.check_balances(OWNER, {MINT: 7}, slot=12) == [MINT]
+    assert balances.balance(OWNER, MINT) == 11
+    assert balances.corrections == 1
+    # an older read is left out
+    assert not balances.check_supply(MINT, 0, slot=11)
+    assert balances.supply(MINT) == 104
+
+
+def test_check_interval() -> None:
+    """Test the index is checked every interval, forgetting the receipts the reads already count."""
+    balances = TokenBalances(check_interval=600)
+    assert balances.is_check_due(now=600)
+    balances.checking(now=600)
+    assert not balances.is_check_due(now=1199)
+    assert balances.is_check_due(now=1200)
+    balances.on_receipt(meta((OWNER, 0, 5)), slot=10)
+    balances.on_receipt(meta((OWNER, 5, 7)), slot=11)
+    balances.check_balances(OWNER, {MINT: 5}, slot=10)
+    balances.checking(now=1200)
+    assert balances._applied == [(11, (OWNER, MINT), 2)]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the decision maker of the skill."""
+
+import json
+import tempfile
+from pathlib import Path
+from typing import List
+
+import pytest
+from aea.crypto.wallet import Wallet
+from aea.identity.base import Identity
+from aea_ledger_solana import SolanaCrypto
+from solders.hash import Hash
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+
+from packages.dassy23.skills.spl_token_skill.decision_maker import DecisionMakerHandler
+
+
+SKILL = "dassy23/spl_token_skill:0.1.0"
+
+
+class TestFeePayerCoSigning:
+    """Test the keys of the fee payers only sign as fee payers, for the skills allowed to use them."""
+
+    def setup(self) -> None:
+        """Set up a decision maker holding the key of the agent and of a fee payer."""
+        self.tmp = Path(tempfile.mkdtemp())
+        agent, payer = SolanaCrypto(), SolanaCrypto()
+        (self.tmp / "agent.txt").write_text(agent.private_key)
+        (self.tmp / "payer.txt").write_text(payer.private_key)
+        wallet = Wallet({"solana": str(self.tmp / "agent.txt")})
+        identity = Identity(
+            "agent", addresses=wallet.addresses, public_keys=wallet.public_keys,
+            default_address_key="solana")
+        self.handler = DecisionMakerHandler(
+            identity, wallet, {"fee_payer_key_paths": [str(self.tmp / "payer.txt")]})
+        self.agent = agent.entity.to_solders().pubkey()
+        self.payer = payer.entity.to_solders().pubkey()
+
+    def _signed(self, fee_payer: Pubkey, sender: Pubkey, requester: str) -> List[bool]:
+        """Sign a transfer from a sender, paid by a fee payer, and tell which signatures were made."""
+        message = Message.new_with_blockhash(
+            [transfer(TransferParams(from_pubkey=sender, to_pubkey=self.agent, lamports=1))],
+            fee_payer,
+            Hash.default(),
+        )
+        signed = self.handler._sign_transaction(
+            "solana", json.loads(Transaction.new_unsigned(message).to_json()), requester)
+        return [
+            signature != Signature.default()
+            for signature in Transaction.from_json(json.dumps(signed)).signatures]
+
+    @pytest.mark.parametrize("requester, fee_payer_signs", [(SKILL, True), ("other/skill:0.1.0", False)])
+    def test_paid_by_a_fee_payer(self, requester: str, fee_payer_signs: bool) -> None:
+        """Test a fee payer signs the transactions it pays for the skills allowed to use it only."""
+        assert self._signed(self.payer, self.agent, requester) == [fee_payer_signs, True]
+
+    def test_fee_payer_as_another_signer(self) -> None:
+        """Test a fee payer never signs a transaction it does not pay, e.g. one moving its lamports."""
+        assert self._signed(self.agent, self.payer, SKILL) == [True, False]
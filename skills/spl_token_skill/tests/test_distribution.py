@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the distribution of tokens from a file."""
+
+import json
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from aea_ledger_solana import SolanaCrypto
+
+from packages.dassy23.skills.spl_token_skill.distribution import Distribution
+
+
+OWNERS = [SolanaCrypto().address for _ in range(5)]
+
+
+def make_distribution(tmp_path: Path, **kwargs) -> Distribution:
+    """Open a distribution of a CSV file of five recipients, in batches of two."""
+    path = tmp_path / "recipients.csv"
+    if not path.exists():
+        path.write_text(
+            "owner,amount\n" + "".join(f"{owner},{index + 1}\n" for index, owner in enumerate(OWNERS)))
+    distribution = Distribution(
+        name="distribution",
+        skill_context=mock.MagicMock(),
+        distribution_path=str(path),
+        distribution_batch_size=2,
+        distribution_checkpoint_path=str(tmp_path / "checkpoint.json"),
+        distribution_failures_path=str(tmp_path / "failures.jsonl"),
+        **kwargs,
+    )
+    distribution.setup()
+    return distribution
+
+
+def failures(tmp_path: Path) -> List[dict]:
+    """Read the failed recipients."""
+    path = tmp_path / "failures.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_checkpoint_and_resume(tmp_path: Path) -> None:
+    """Test a restart neither pays again the batches finished or signed, nor skips the others."""
+    distribution = make_distribution(tmp_path)
+    batches = [distribution.next_batch() for _ in range(3)]
+    # the header is not a recipient
+    assert [len(batch.recipients) for batch in batches] == [1, 2, 2]
+    for index, batch in enumerate(batches):
+        distribution.attach(batch, f"entry-{index}")
+    distribution.signed("entry-1", "sig-1")
+    distribution.complete("entry-2", True)
+    distribution.teardown()
+
+    distribution = make_distribution(tmp_path)
+    # the batch signed before the restart is still in flight, waiting for its receipt
+    assert distribution.recipients == 2
+    batch = distribution.next_batch()
+    assert batch.recipients == batches[0].recipients
+    distribution.attach(batch, "entry-3")
+    assert distribution.next_batch() is None
+    distribution.complete("entry-1", True)
+    assert not distribution.is_done
+    distribution.complete("entry-3", True)
+    assert distribution.recipients == 5
+    assert distribution.is_done
+    distribution.teardown()
+
+
+def test_expiry(tmp_path: Path) -> None:
+    """Test a batch which timed out fails if it was never signed, and waits for its receipt otherwise."""
+    distribution = make_distribution(tmp_path, distribution_timeout=60)
+    unsigned, signed = distribution.next_batch(), distribution.next_batch()
+    distribution.attach(unsigned, "unsigned")
+    distribution.attach(signed, "signed")
+    distribution.signed("signed", "sig")
+    now = signed.planned_at + 60
+    assert distribution.expire(now=now) == ["sig"]
+    assert [failure["owner"] for failure in failures(tmp_path)] == [OWNERS[0]]
+    # checked again only after another timeout
+    assert distribution.expire(now=now + 59) == []
+    assert distribution.expire(now=now + 60) == ["sig"]
+    # it landed after all
+    distribution.complete("signed", True)
+    assert distribution.recipients == 2
+    assert distribution.failed == 1
+    distribution.teardown()
+
+
+def test_retry_after_expiry(tmp_path: Path) -> None:
+    """Test a signed batch which never landed is built again rather than failed."""
+    distribution = make_distribution(tmp_path, distribution_timeout=60)
+    batch = distribution.next_batch()
+    distribution.attach(batch, "first")
+    distribution.signed("first", "sig")
+    distribution.expire(now=batch.planned_at + 60)
+    retried = distribution.retry("first")
+    assert retried.recipients == batch.recipients
+    assert failures(tmp_path) == []
+    distribution.attach(retried, "second")
+    distribution.complete("second", True)
+    assert distribution.recipients == 1
+    distribution.teardown()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the pool of fee payers."""
+
+from typing import Any
+from unittest import mock
+
+from packages.dassy23.skills.spl_token_skill.fee_payers import FeePayerPool
+
+
+PAYERS = ["payer-a", "payer-b"]
+
+
+def make_pool(**kwargs: Any) -> FeePayerPool:
+    """Make a pool of two payers."""
+    pool = FeePayerPool(
+        name="fee_payers",
+        skill_context=mock.MagicMock(),
+        fee_payer_addresses=PAYERS,
+        fee_payer_min_balance=100,
+        fee_payer_top_up_amount=1000,
+        **kwargs,
+    )
+    pool.setup()
+    return pool
+
+
+def test_release() -> None:
+    """Test a payer is charged the fee of a transaction which landed only, and is released either way."""
+    pool = make_pool(fee_payer_selection="least_in_flight")
+    pool.on_balance("payer-a", 500)
+    pool.attach("landed", "payer-a")
+    pool.attach("failed", "payer-a")
+    assert pool.choose() == "payer-b"
+    pool.release("landed", 50)
+    pool.release("failed")
+    # released once only
+    pool.release("failed")
+    payer = pool._payers["payer-a"]
+    assert (payer.in_flight, payer.transactions, payer.fees, payer.balance) == (0, 1, 50, 450)
+
+
+def test_top_up_thresholds() -> None:
+    """Test a payer below the minimum balance is passed over and topped up once, and read again once topped up."""
+    pool = make_pool()
+    pool.on_balance("payer-a", 99)
+    pool.on_balance("payer-b", 100)
+    assert pool.top_ups_due() == [["payer-a", 1000]]
+    assert {pool.choose() for _ in range(4)} == {"payer-b"}
+
+    pool.topping_up("top-up", ["payer-a"])
+    assert pool.top_ups_due() == []
+    assert pool.payers_to_check() == ["payer-b"]
+    pool.release("top-up", 5000)
+    payer = pool._payers["payer-a"]
+    assert (payer.topped_up, payer.balance) == (1000, None)
+    assert pool.payers_to_check() == PAYERS
+    # the payer is chosen again until its new balance is read
+    assert {pool.choose() for _ in range(4)} == set(PAYERS)
+
+
+def test_failed_top_up() -> None:
+    """Test a payer whose top up failed is topped up again."""
+    pool = make_pool()
+    pool.on_balance("payer-a", 99)
+    pool.topping_up("top-up", ["payer-a"])
+    pool.release("top-up")
+    assert pool._payers["payer-a"].topped_up == 0
+    assert pool.top_ups_due() == [["payer-a", 1000]]
+
+
+def test_stale_in_flight() -> None:
+    """Test the transactions whose outcome never came stop counting as in flight after the timeout."""
+    pool = make_pool(fee_payer_in_flight_timeout=30)
+    with mock.patch("time.monotonic", return_value=100):
+        pool.attach("lost", "payer-a")
+        pool.topping_up("lost-top-up", ["payer-b"])
+    with mock.patch("time.monotonic", return_value=130):
+        assert pool.payers_to_check() == ["payer-a"]
+        assert pool._payers["payer-a"].in_flight == 1
+    with mock.patch("time.monotonic", return_value=131):
+        assert pool.payers_to_check() == PAYERS
+        assert pool._payers["payer-a"].in_flight == 0
+    pool.release("lost", 5000)
+    assert pool._payers["payer-a"].fees == 0
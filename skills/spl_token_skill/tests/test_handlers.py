@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the handlers of the skill."""
+
+import json
+from typing import Any, Dict
+from unittest import mock
+
+from aea.helpers.transaction.base import RawTransaction, SignedTransaction
+from aea_ledger_solana import SolanaCrypto
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+
+from packages.dassy23.skills.spl_token_skill.handlers import (
+    ContractApiHandler,
+    SigningHandler,
+)
+from packages.dassy23.skills.spl_token_skill.mint_pool import MintPool, NonceAccountStatus
+from packages.dassy23.skills.spl_token_skill.scheduler import MintScheduler
+
+
+def signed_transaction() -> SignedTransaction:
+    """Make a signed transaction."""
+    payer = Keypair()
+    message = Message.new_with_blockhash(
+        [transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=payer.pubkey(), lamports=1))],
+        payer.pubkey(),
+        Hash.default(),
+    )
+    return SignedTransaction("solana", json.loads(Transaction([payer], message, Hash.default()).to_json()))
+
+
+def contract_api_dialogue(entry_id: str, callable_name: str, kwargs: Dict[str, Any]) -> mock.Mock:
+    """Make the dialogue a transaction was built in."""
+    dialogue = mock.Mock(terms="terms")
+    dialogue.dialogue_label.dialogue_reference = (entry_id, "")
+    dialogue.last_outgoing_message.callable = callable_name
+    dialogue.last_outgoing_message.kwargs.body = kwargs
+    return dialogue
+
+
+class TestNonceAccounts:
+    """Test the nonce accounts of the mint pool go through the handlers with batched signing."""
+
+    def setup(self) -> None:
+        """Set up the handlers on a pool of one nonce account, signing in batches of two."""
+        self.context = mock.MagicMock(agent_address=SolanaCrypto().address)
+        self.context.strategy.signing_batch_size = 2
+        self.context.strategy.pending_raw_transactions = []
+        self.context.signing_dialogues.create.return_value = (mock.Mock(), mock.Mock())
+        self.context.ledger_api_dialogues.create.return_value = (mock.Mock(), mock.Mock())
+        self.context.mint_pool = MintPool(
+            name="mint_pool", skill_context=self.context, nonce_accounts=1)
+        self.context.mint_pool.setup()
+        self.account = self.context.mint_pool.accounts_to_query()[0]
+        self.account.status = NonceAccountStatus.CREATING
+        self.contract_handler = ContractApiHandler(
+            name="contract_handler", skill_context=self.context)
+        self.signing_handler = SigningHandler(name="signing_handler", skill_context=self.context)
+        self.create_dialogue = contract_api_dialogue(
+            "create", "create_nonce_account", {"nonce_address": self.account.address})
+
+    def test_batched_creation_settles(self) -> None:
+        """Test a nonce account created in a batch is refilled once the receipt of its creation comes."""
+        dialogues = (
+            self.create_dialogue,
+            contract_api_dialogue("mint", "mint_to", {"mint_address": "mint"}),
+        )
+        for dialogue in dialogues:
+            self.contract_handler._propose(RawTransaction("solana", {}), dialogue)
+        assert self.context.decision_maker_message_queue.put_nowait.call_count == 1
+
+        signed_transactions = [signed_transaction(), signed_transaction()]
+        signing_msg = mock.Mock(signed_transactions=signed_transactions)
+        signing_dialogue = mock.Mock(associated_contract_api_dialogues=dialogues)
+        self.signing_handler._handle_signed_transactions(signing_msg, signing_dialogue)
+        signature = str(Transaction.from_json(json.dumps(signed_transactions[0].body)).signatures[0])
+        assert self.account.signature == signature
+
+        self.context.mint_pool.on_receipt(signature)
+        assert self.context.mint_pool.accounts_to_query() == [self.account]
+
+    def test_build_error(self) -> None:
+        """Test a nonce account whose transaction could not be built is read again."""
+        self.contract_handler._handle_error(mock.Mock(message="error"), self.create_dialogue)
+        assert self.context.mint_pool.accounts_to_query() == [self.account]
+
+
+def test_mint_build_error() -> None:
+    """Test a mint whose transaction could not be built is given up on, and planned again on the next tick."""
+    context = mock.MagicMock()
+    context.strategy.failed_txs = 0
+    context.scheduler = MintScheduler(name="scheduler", skill_context=context)
+    context.scheduler.attach(context.scheduler.plan("mint", "owner", 10, 5, now=100), "mint")
+    handler = ContractApiHandler(name="contract_handler", skill_context=context)
+    handler._handle_error(
+        mock.Mock(message="error"), contract_api_dialogue("mint", "mint_to", {"mint_address": "mint"}))
+    context.journal.abandoned.assert_called_once_with("mint")
+    context.fee_payers.release.assert_called_once_with("mint")
+    assert context.strategy.failed_txs == 1
+    assert context.scheduler.plan("mint", "owner", 10, 5, now=101).interval == 10
+
+
+def test_distribute_build_error() -> None:
+    """Test a batch whose transaction could not be built fails in the model which owns it only."""
+    context = mock.MagicMock()
+    context.token_requests.is_in_flight.side_effect = lambda entry_id: entry_id == "token-requests"
+    handler = ContractApiHandler(name="contract_handler", skill_context=context)
+    for entry_id in ("token-requests", "distribution"):
+        handler._handle_error(
+            mock.Mock(message="error"), contract_api_dialogue(entry_id, "distribute", {}))
+    context.handlers.fipa_handler.complete.assert_called_once_with(
+        "token-requests", {"status": "failed", "reason": "error"})
+    context.distribution.fail.assert_called_once_with("distribution", "error")
+
+
+def test_state_of_unknown_mint() -> None:
+    """Test the state of a mint the agent does not mint is left out."""
+    context = mock.MagicMock()
+    context.strategy.mint_spec.return_value = None
+    handler = ContractApiHandler(name="contract_handler", skill_context=context)
+    handler._handle_state_update(
+        mock.Mock(state=mock.Mock(body={})), contract_api_dialogue("state", "get_mint_info", {"mint_address": "mint"}))
+    context.logger.warning.assert_called_once()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the mint journal."""
+
+from pathlib import Path
+from unittest import mock
+
+from packages.dassy23.skills.spl_token_skill.journal import MintJournal, MintStatus
+from packages.dassy23.skills.spl_token_skill.scheduler import MintScheduler
+
+
+MINT = "mint"
+OWNER = "owner"
+
+
+def make_journal(path: Path) -> MintJournal:
+    """Open a journal."""
+    journal = MintJournal(
+        name="journal", skill_context=mock.MagicMock(), journal_path=str(path), journal_batch_size=100)
+    journal.setup()
+    return journal
+
+
+def make_scheduler() -> MintScheduler:
+    """Make a scheduler."""
+    return MintScheduler(name="scheduler", skill_context=mock.MagicMock(), in_flight_timeout=150)
+
+
+def test_crash_recovery(tmp_path: Path) -> None:
+    """Test a restart finds the unfinished entries, the mints they were planned for and the minted intervals."""
+    path = tmp_path / "journal.db"
+    journal, scheduler = make_journal(path), make_scheduler()
+    settled = scheduler.plan(MINT, OWNER, 10, 5, now=100)
+    scheduler.attach(settled, "settled")
+    journal.built("settled", {"callable": "mint_to"})
+    journal.signed("settled", "sig-settled", scheduler.journal_data("settled"))
+    journal.sent("sig-settled")
+    journal.settled("sig-settled", True)
+    scheduler.complete("settled", True)
+    in_flight = scheduler.plan(MINT, OWNER, 10, 5, now=110)
+    scheduler.attach(in_flight, "in-flight")
+    journal.built("in-flight", {"callable": "mint_to"})
+    journal.signed("in-flight", "sig-in-flight", scheduler.journal_data("in-flight"))
+    journal.flush()
+    journal.sent("sig-in-flight")
+    journal.built("unsigned", {"callable": "mint_to"})
+    # the agent dies: the rows which were not flushed are lost
+    journal._connection.close()
+
+    journal, scheduler = make_journal(path), make_scheduler()
+    unfinished = journal.unfinished()
+    assert [(entry_id, status, signature) for entry_id, status, signature, _ in unfinished] == [
+        ("in-flight", MintStatus.SIGNED, "sig-in-flight")]
+    assert scheduler.from_journal_data(unfinished[0][3]) == in_flight
+    assert [scheduler.from_journal_data(data) for data in journal.settled_data()] == [settled]
+
+    for data in journal.settled_data():
+        scheduler.minted(scheduler.from_journal_data(data))
+    scheduler.attach(scheduler.from_journal_data(unfinished[0][3]), "in-flight")
+    # still in flight, so not planned again until its receipt comes
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=120) is None
+    assert journal.settled("sig-in-flight", True) == "in-flight"
+    scheduler.complete("in-flight", True)
+    # its interval is minted, the next one is not
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=115) is None
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=120).interval == 12
+    journal.teardown()
+
+
+def test_batched_writes(tmp_path: Path) -> None:
+    """Test the rows are written once a batch is full, or on flush, in a single transaction."""
+    path = tmp_path / "journal.db"
+    journal = MintJournal(
+        name="journal", skill_context=mock.MagicMock(), journal_path=str(path), journal_batch_size=3)
+    journal.setup()
+
+    def rows() -> int:
+        return journal._connection.execute("SELECT COUNT(*) FROM mint_journal").fetchone()[0]
+
+    journal.built("a", {})
+    journal.built("b", {})
+    assert rows() == 0
+    journal.built("c", {})
+    assert rows() == 3
+    journal.abandoned("a")
+    journal.flush()
+    assert rows() == 4
+    assert [entry_id for entry_id, *_ in journal.unfinished()] == ["b", "c"]
+    journal.teardown()
+
+
+def test_compaction(tmp_path: Path) -> None:
+    """Test a restart reads the unfinished entries and the last settled mint of each destination only."""
+    journal, scheduler = make_journal(tmp_path / "journal.db"), make_scheduler()
+    for now, entry_id in ((100, "first"), (110, "second"), (120, "other")):
+        planned = scheduler.plan(MINT, OWNER if entry_id != "other" else "other", 10, 5, now=now)
+        scheduler.attach(planned, entry_id)
+        journal.built(entry_id, {"callable": "mint_to"})
+        journal.signed(entry_id, f"sig-{entry_id}", scheduler.journal_data(entry_id))
+        journal.settled(f"sig-{entry_id}", True)
+        scheduler.complete(entry_id, True)
+    journal.built("failed", {"callable": "mint_to"})
+    journal.signed("failed", "sig-failed")
+    journal.settled("sig-failed", False)
+    journal.built("distribution", {"callable": "distribute"})
+    journal.signed("distribution", "sig-distribution")
+    journal.settled("sig-distribution", True)
+    journal.built("in-flight", {"callable": "mint_to"})
+
+    assert [scheduler.from_journal_data(data).key for data in journal.settled_data()] == [
+        f"{MINT}:{OWNER}:11", f"{MINT}:other:12"]
+    assert [entry_id for entry_id, *_ in journal.unfinished()] == ["in-flight"]
+    latest = journal._connection.execute("SELECT entry_id FROM mint_latest ORDER BY rowid").fetchall()
+    assert latest == [("second",), ("other",), ("in-flight",)]
+    # the history is kept whole
+    assert journal._connection.execute("SELECT COUNT(*) FROM mint_journal").fetchone()[0] == 16
+    journal.teardown()
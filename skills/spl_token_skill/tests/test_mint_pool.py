@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the pool of mints signed ahead of time."""
+
+from unittest import mock
+
+from aea_ledger_solana import SolanaCrypto
+
+from packages.dassy23.skills.spl_token_skill.mint_pool import (
+    MintPool,
+    NonceAccountStatus,
+    PresignedMint,
+)
+
+
+class TestMintPool:
+    """Test the pool of mints signed ahead of time on durable nonces."""
+
+    def setup(self) -> None:
+        """Set up a pool of two nonce accounts."""
+        context = mock.MagicMock(agent_address=SolanaCrypto().address)
+        self.pool = MintPool(
+            name="mint_pool", skill_context=context, nonce_accounts=2, spent_nonce_timeout=60)
+        self.pool.setup()
+        self.addresses = [account.address for account in self.pool.accounts_to_query()]
+
+    def _store(self, address: str, nonce: str, amount: int = 5) -> PresignedMint:
+        """Store a mint signed on the nonce of an account."""
+        presigned_mint = PresignedMint(
+            address, nonce, amount, mock.Mock(), mock.Mock(), mock.Mock())
+        self.pool.store(presigned_mint)
+        return presigned_mint
+
+    def test_take_and_refill(self) -> None:
+        """Test a mint is taken by amount, and its account refilled once its receipt comes."""
+        assert len(self.addresses) == 2
+        assert self.pool.accounts_to_query() == []
+        presigned_mint = self._store(self.addresses[0], "nonce-1")
+        assert self.pool.ready == 1
+        assert self.pool.take(6) is None
+        assert self.pool.take(5) is presigned_mint
+        assert self.pool.take(5) is None
+        self.pool.track(self.addresses[0], "sig", now=100)
+        self.pool.on_receipt("sig")
+        assert [account.address for account in self.pool.accounts_to_query()] == [self.addresses[0]]
+
+    def test_spent_nonce_not_advanced(self) -> None:
+        """Test a mint whose receipt never came and whose nonce did not advance goes back first in the pool."""
+        sent = self._store(self.addresses[1], "nonce-2")
+        assert self.pool.take(5) is sent
+        self.pool.track(self.addresses[1], "sig", now=100)
+        self._store(self.addresses[0], "nonce-1")
+        account = self.pool.get_account(self.addresses[1])
+        assert self.pool.accounts_to_check(now=159) == []
+        assert self.pool.accounts_to_check(now=160) == [account]
+        assert account.status is NonceAccountStatus.CHECKING
+        assert not self.pool.on_nonce(self.addresses[1], "nonce-2")
+        assert account.status is NonceAccountStatus.READY
+        assert account.signature is None
+        # the mint sent before is taken first, to be sent again as it is
+        assert self.pool.take(5) is sent
+
+    def test_spent_nonce_advanced(self) -> None:
+        """Test a mint whose nonce advanced waits for its receipt again, and is checked again if it does not come."""
+        self._store(self.addresses[0], "nonce-1")
+        self.pool.take(5)
+        self.pool.track(self.addresses[0], "sig", now=100)
+        account = self.pool.accounts_to_check(now=200)[0]
+        assert self.pool.on_nonce(account.address, "nonce-next", now=200)
+        assert account.status is NonceAccountStatus.SPENT
+        assert account.signature == "sig"
+        assert self.pool.accounts_to_check(now=259) == []
+        assert self.pool.accounts_to_check(now=260) == [account]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the mint scheduler."""
+
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from packages.dassy23.skills.spl_token_skill.journal import MintJournal
+from packages.dassy23.skills.spl_token_skill.scheduler import MintScheduler, MintSpec
+
+
+MINT = "mint"
+OWNER = "owner"
+
+
+def make_scheduler(**kwargs: Any) -> MintScheduler:
+    """Make a scheduler."""
+    return MintScheduler(name="scheduler", skill_context=mock.MagicMock(), **kwargs)
+
+
+def test_interval_dedup() -> None:
+    """Test an interval is minted once, and planned again only if its mint failed."""
+    scheduler = make_scheduler()
+    planned = scheduler.plan(MINT, OWNER, 10, 5, now=100)
+    assert planned.key == f"{MINT}:{OWNER}:10"
+    scheduler.attach(planned, "first")
+    # in flight
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=101) is None
+    scheduler.complete("first", False)
+    retried = scheduler.plan(MINT, OWNER, 10, 5, now=102)
+    assert retried.key == planned.key
+    scheduler.attach(retried, "second")
+    scheduler.complete("second", True)
+    # minted
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=105) is None
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=110).interval == 11
+    # another destination has its own intervals
+    assert scheduler.plan(MINT, "other", 10, 5, now=105).interval == 10
+    assert scheduler.suppressed == 2
+    # nothing is left of the released mints
+    assert scheduler._planned_by_entry_id == {}
+    assert scheduler._entry_ids_by_target == {}
+
+
+def test_in_flight_timeout() -> None:
+    """Test a mint in flight for longer than the timeout is planned again, unless it is on a durable nonce."""
+    scheduler = make_scheduler(in_flight_timeout=30)
+    scheduler.attach(scheduler.plan(MINT, OWNER, 10, 5, now=100), "expiring")
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=129) is None
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=130).interval == 13
+
+    scheduler.attach(scheduler.plan(MINT, "other", 10, 5, now=100), "durable", can_expire=False)
+    assert scheduler.plan(MINT, "other", 10, 5, now=10000) is None
+
+
+def test_coalesce_missed_ticks() -> None:
+    """Test the missed intervals are minted together when coalescing."""
+    scheduler = make_scheduler(coalesce_missed_ticks=True)
+    planned = scheduler.plan(MINT, OWNER, 10, 5, now=100)
+    scheduler.attach(planned, "first")
+    scheduler.complete("first", True)
+    # intervals 11 to 14
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=140).amount == 20
+
+
+def test_schedule_many_mints() -> None:
+    """Test the mints are due by the start of their next interval, and held back while too many are in flight."""
+    scheduler = make_scheduler(max_in_flight_mints=1)
+    fast = MintSpec("fast", "fast-mint", 5, 10, (OWNER,))
+    slow = MintSpec("slow", "slow-mint", 5, 60, (OWNER,))
+    scheduler.schedule(fast, 10, now=100)
+    scheduler.schedule(slow, 60, now=100)
+    assert scheduler.next_due(now=100) == (fast, 10)
+    assert scheduler.next_due(now=100) == (slow, 60)
+    assert scheduler.next_due(now=109) is None
+    assert scheduler.next_due(now=110) == (fast, 10)
+
+    scheduler.attach(scheduler.plan("fast-mint", OWNER, 10, 5, now=110), "fast")
+    assert scheduler.is_at_capacity
+    assert scheduler.next_due(now=120) is None
+    scheduler.complete("fast", True)
+    # the intervals start on the clock, so the slow mint is due again at 120, then at 180
+    assert scheduler.next_due(now=120) == (slow, 60)
+    assert scheduler.next_due(now=120) == (fast, 10)
+    assert scheduler.next_due(now=130) == (fast, 10)
+    assert scheduler.next_due(now=139) is None
+    # a late tick takes a mint once, however many of its intervals started
+    assert scheduler.next_due(now=180) == (fast, 10)
+    assert scheduler.next_due(now=180) == (slow, 60)
+    assert scheduler.next_due(now=180) is None
+
+
+def test_setup_from_journal(tmp_path: Path) -> None:
+    """Test a restarted scheduler knows the minted intervals and the mints in flight from the journal."""
+    context = mock.MagicMock()
+    context.journal = MintJournal(
+        name="journal", skill_context=context, journal_path=str(tmp_path / "journal.db"))
+    journal = context.journal
+    scheduler = MintScheduler(name="scheduler", skill_context=context)
+    scheduler.setup()
+    for entry_id, destination, is_settled in (("a", OWNER, True), ("b", "other", False)):
+        planned = scheduler.plan(MINT, destination, 10, 5, now=100)
+        scheduler.attach(planned, entry_id)
+        journal.signed(entry_id, f"sig-{entry_id}", scheduler.journal_data(entry_id))
+        if is_settled:
+            journal.settled(f"sig-{entry_id}", True)
+    journal.teardown()
+
+    context.journal = MintJournal(
+        name="journal", skill_context=context, journal_path=str(tmp_path / "journal.db"))
+    scheduler = MintScheduler(name="scheduler", skill_context=context)
+    scheduler.setup()
+    # minted before the restart
+    assert scheduler.plan(MINT, OWNER, 10, 5, now=105) is None
+    # still in flight, until its receipt comes
+    assert scheduler.plan(MINT, "other", 10, 5, now=105) is None
+    scheduler.complete("b", True)
+    assert scheduler.plan(MINT, "other", 10, 5, now=105) is None
+    assert scheduler.plan(MINT, "other", 10, 5, now=110).interval == 11
+    context.journal.teardown()
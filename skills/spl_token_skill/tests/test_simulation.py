@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the simulation stage of the transactions."""
+
+from unittest import mock
+
+import pytest
+
+from packages.dassy23.skills.spl_token_skill.simulation import (
+    Simulation,
+    is_fee_payer_error,
+    is_repairable,
+)
+
+
+@pytest.mark.parametrize(
+    "err, repairable, fee_payer",
+    [
+        ("BlockhashNotFound", True, False),
+        ("{'InsufficientFundsForFee': None}", True, True),
+        ("AccountNotFound", True, True),
+        ("{'InstructionError': [0, {'Custom': 1}]}", False, False),
+    ],
+)
+def test_errors(err: str, repairable: bool, fee_payer: bool) -> None:
+    """Test the errors a transaction built again may not run into."""
+    assert is_repairable(err) is repairable
+    assert is_fee_payer_error(err) is fee_payer
+
+
+def test_batches_and_repairs() -> None:
+    """Test the transactions are simulated in batches, and built again a bounded number of times."""
+    simulation = Simulation(
+        name="simulation", skill_context=mock.MagicMock(), simulation_batch_size=2,
+        simulation_max_repairs=1)
+    first, second = (mock.Mock(), mock.Mock()), (mock.Mock(), mock.Mock())
+    assert not simulation.add(*first)
+    assert simulation.add(*second)
+    pending = simulation.take()
+    assert pending == [first, second]
+    assert simulation.take() == []
+    simulation.track("request", pending)
+    assert simulation.results_of("request") == pending
+    assert simulation.results_of("request") == []
+
+    simulation.on_pass("passed", 1000)
+    assert simulation.can_repair("failed")
+    simulation.on_repair("failed", "built-again")
+    assert not simulation.can_repair("built-again")
+    simulation.on_drop("built-again")
+    assert simulation.can_repair("built-again")
+    assert (simulation.simulated, simulation.passed, simulation.repaired, simulation.dropped) == (3, 1, 1, 1)
+    assert simulation.units_consumed == 1000
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the queue of token requests."""
+
+import time
+from typing import Any
+from unittest import mock
+
+import pytest
+from aea.helpers.search.models import Constraint, ConstraintType, Query
+
+from packages.dassy23.skills.spl_token_skill.token_requests import TokenRequest, TokenRequests
+
+
+def make_requests(**kwargs: Any) -> TokenRequests:
+    """Make a queue of token requests."""
+    return TokenRequests(
+        name="token_requests",
+        skill_context=mock.MagicMock(),
+        token_request_batch_size=2,
+        token_request_flush_size=4,
+        token_request_flush_interval=2.0,
+        **kwargs,
+    )
+
+
+def request(owner: str, amount: int, queued_at: float = 100.0) -> TokenRequest:
+    """Make a token request."""
+    return TokenRequest(mock.Mock(), owner, amount, queued_at)
+
+
+@pytest.mark.parametrize("value, amount", [(5, 5), (100, 100), (0, None), (101, None), ("5", 1)])
+def test_amount_for(value: Any, amount: Any) -> None:
+    """Test the amount asked for is served up to the maximum, and the default one when none is asked for."""
+    query = Query([Constraint("amount", ConstraintType("==", value))])
+    assert make_requests().amount_for(query) == amount
+
+
+def test_flush_when_due() -> None:
+    """Test the queue is due once it is full, or once its oldest request has waited long enough."""
+    requests = make_requests()
+    assert not requests.is_due()
+    now = time.time()
+    for index in range(3):
+        assert not requests.enqueue(request(f"owner-{index}", 1, queued_at=now))
+    assert not requests.is_due(now=now + 1)
+    assert requests.is_due(now=now + 2)
+    assert requests.enqueue(request("owner-3", 1, queued_at=now))
+
+
+def test_batching() -> None:
+    """Test the requests are added up by owner and split into batches of owners."""
+    requests = make_requests()
+    for owner, amount in (("a", 1), ("b", 2), ("a", 3), ("c", 4)):
+        requests.enqueue(request(owner, amount))
+    batches = requests.flush()
+    assert [batch.recipients for batch in batches] == [[("a", 4), ("b", 2)], [("c", 4)]]
+    assert [len(batch.requests) for batch in batches] == [3, 1]
+    assert requests.flush() == []
+
+
+def test_retry_and_expiry() -> None:
+    """Test a batch which never landed is taken back once, and one in flight too long is given up on unless it was signed."""
+    requests = make_requests(token_request_timeout=60)
+    requests.enqueue(request("a", 1))
+    requests.enqueue(request("b", 1))
+    requests.enqueue(request("c", 1))
+    first, second = requests.flush()
+    with mock.patch("time.time", return_value=100):
+        requests.attach(first, "first")
+        requests.attach(second, "second")
+    assert requests.retry("first") is first
+    assert requests.retry("first") is None
+    with mock.patch("time.time", return_value=150):
+        requests.attach(first, "first-again")
+    requests.signed("first-again", "sig")
+    assert requests.expire(now=159) == ([], [])
+    # the unsigned batch cannot land any more, the signed one waits for its receipt
+    assert requests.expire(now=160) == ([("second", second)], [])
+    assert not requests.is_in_flight("second")
+    assert requests.expire(now=210) == ([], ["sig"])
+    assert requests.expire(now=269) == ([], [])
+    assert requests.expire(now=270) == ([], ["sig"])
+    assert requests.complete("first-again") is first
+    assert requests.transactions == 1
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 dassy23
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains the queue of the token requests of other agents, minted to them in batches."""
+
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from aea.helpers.search.models import Query
+from aea.skills.base import Model
+
+from packages.dassy23.skills.spl_token_skill.dialogues import FipaDialogue
+
+
+AMOUNT_ATTRIBUTE = "amount"
+
+
+class TokenRequest(NamedTuple):
+    """An accepted request of an agent for tokens."""
+
+    fipa_dialogue: FipaDialogue
+    owner: str
+    amount: int
+    queued_at: float
+
+
+class TokenRequestBatch(NamedTuple):
+    """The token requests minted in a single transaction, with the recipients they add up to."""
+
+    requests: List[TokenRequest]
+    recipients: List[Tuple[str, int]]
+
+
+def requested_amount(query: Query) -> Optional[int]:
+    """
+    Get the amount asked for in the query of a call for proposal, if any.
+
+    :param query: the query, with a constraint on the `amount` attribute
+    :return: the amount, or None if the query does not constrain it to a value
+    """
+    for constraint in query.constraints:
+        if getattr(constraint, "attribute_name", None) == AMOUNT_ATTRIBUTE:
+            value = constraint.constraint_type.value
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    return None
+
+
+class TokenRequests(Model):
+    """
+    This class queues the token requests which other agents accepted, to mint them in batches.
+
+    Every accept would otherwise take a transaction of its own. The queue is flushed once
+    `token_request_flush_size` requests are waiting, or the oldest one has waited for
+    `token_request_flush_interval` seconds. The requests of a flush are added up by owner, and minted
+    to `token_request_batch_size` owners per transaction.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the token requests."""
+        self.default_amount = kwargs.pop("token_request_amount", 1)
+        self.max_amount = kwargs.pop("token_request_max_amount", 100)
+        self.batch_size = kwargs.pop("token_request_batch_size", 8)
+        self.flush_size = kwargs.pop("token_request_flush_size", 64)
+        self.flush_interval = kwargs.pop("token_request_flush_interval", 2.0)
+        self.timeout = kwargs.pop("token_request_timeout", 150)
+        self._queue: List[TokenRequest] = []
+        self._in_flight: Dict[str, Tuple[TokenRequestBatch, float]] = {}
+        self._signatures: Dict[str, str] = {}
+        self.requests = 0
+        self.transactions = 0
+        super().__init__(*args, **kwargs)
+
+    def amount_for(self, query: Query) -> Optional[int]:
+        """
+        Get the amount to propose for a call for proposal.
+
+        :param query: the query of the call for proposal
+        :return: the amount, or None if the amount asked for cannot be served
+        """
+        amount = requested_amount(query)
+        if amount is None:
+            return self.default_amount
+        if amount <= 0 or amount > self.max_amount:
+            return None
+        return amount
+
+    def enqueue(self, request: TokenRequest) -> bool:
+        """
+        Queue an accepted request.
+
+        :param request: the request
+        :return: whether the queue is due to be flushed
+        """
+        self._queue.append(request)
+        self.requests += 1
+        return self.is_due()
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        """Check whether the queue is full enough, or old enough, to be flushed."""
+        if len(self._queue) == 0:
+            return False
+        now = time.time() if now is None else now
+        return (
+            len(self._queue) >= self.flush_size
+            or now - self._queue[0].queued_at >= self.flush_interval
+        )
+
+    def flush(self) -> List[TokenRequestBatch]:
+        """
+        Take the queued requests out, added up by owner and split into batches.
+
+        :return: the batches to mint
+        """
+        queue, self._queue = self._queue, []
+        by_owner: Dict[str, List[TokenRequest]] = {}
+        for request in queue:
+            by_owner.setdefault(request.owner, []).append(request)
+        owners = list(by_owner)
+        batches = []
+        for start in range(0, len(owners), self.batch_size):
+            batch_owners = owners[start:start + self.batch_size]
+            batches.append(
+                TokenRequestBatch(
+                    requests=[request for owner in batch_owners for request in by_owner[owner]],
+                    recipients=[
+                        (owner, sum(request.amount for request in by_owner[owner]))
+                        for owner in batch_owners
+                    ],
+                )
+            )
+        return batches
+
+    def attach(self, batch: TokenRequestBatch, entry_id: str) -> None:
+        """
+        Track the transaction of a batch.
+
+        :param batch: the batch
+        :param entry_id: the journal identifier of the transaction
+        """
+        self._in_flight[entry_id] = (batch, time.time())
+
+    def is_in_flight(self, entry_id: str) -> bool:
+        """Check whether a transaction is the one of a batch of token requests in flight."""
+        return entry_id in self._in_flight
+
+    def signed(self, entry_id: str, signature: str) -> None:
+        """
+        Record that the transaction of a batch is signed, before it is sent.
+
+        :param entry_id: the journal identifier of the transaction
+        :param signature: the transaction signature
+        """
+        if entry_id in self._in_flight:
+            self._signatures[entry_id] = signature
+
+    def complete(self, entry_id: str) -> Optional[TokenRequestBatch]:
+        """
+        Stop tracking the transaction of a batch, which settled or failed.
+
+        :param entry_id: the journal identifier of the transaction
+        :return: the batch, or None if the entry is not a batch of token requests
+        """
+        batch, _ = self._in_flight.pop(entry_id, (None, 0.0))
+        self._signatures.pop(entry_id, None)
+        if batch is not None:
+            self.transactions += 1
+        return batch
+
+    def retry(self, entry_id: str) -> Optional[TokenRequestBatch]:
+        """
+        Take back a batch whose transaction never landed, to build it again.
+
+        :param entry_id: the journal identifier of the transaction
+        :return: the batch, or None if the entry is not a batch of token requests
+        """
+        batch, _ = self._in_flight.pop(entry_id, (None, 0.0))
+        self._signatures.pop(entry_id, None)
+        return batch
+
+    def expire(
+        self, now: Optional[float] = None
+    ) -> Tuple[List[Tuple[str, TokenRequestBatch]], List[str]]:
+        """
+        Check the batches in flight for longer than the timeout.
+
+        A batch which was never signed cannot land any more, as the blockhash it was built on has
+        expired, so it is given up on. A signed one may have landed, so it stays in flight until its
+        receipt tells: the receipt of its transaction is to be read again, and it is checked again
+        after another timeout.
+
+        :param now: the current time, defaults to the system clock
+        :return: the batches given up on, by journal identifier, and the signatures of the signed
+            batches whose receipts are to be read again
+        """
+        now = time.time() if now is None else now
+        expired: List[Tuple[str, TokenRequestBatch]] = []
+        signatures: List[str] = []
+        for entry_id, (batch, since) in list(self._in_flight.items()):
+            if now - since < self.timeout:
+                continue
+            signature = self._signatures.get(entry_id)
+            if signature is None:
+                del self._in_flight[entry_id]
+                expired.append((entry_id, batch))
+            else:
+                self._in_flight[entry_id] = (batch, now)
+                signatures.append(signature)
+        return expired, signatures
+
+    def report(self) -> str:
+        """Get the number of requests served and of transactions they took."""
+        return (
+            f"Served {self.requests} token requests in {self.transactions} transactions, "
+            f"{len(self._queue)} queued and {len(self._in_flight)} batches in flight."
+        )